@@ -0,0 +1,271 @@
+"""Benchmark del pipeline de Changelogger sobre repositorios Git sintéticos.
+
+Construye un repositorio local con ``git fast-import`` (número de commits,
+archivos por commit, proporción de renombrados y binarios, tamaño de los
+cambios) y mide las funciones reales del pipeline: ``list_recent_commits``,
+``get_commits_in_range``, ``analyze_commit_changes``, ``analyze_range_changes``,
+``generate_diff``, ``iter_diff_chunks``, ``format_changelog`` y
+``create_output_files``. La fase de IA usa el backend ``fake`` de
+``changelogger.llm_backends``, sin red: por HTTP en localhost (backend
+``compatible``, por defecto) o en proceso (``--ai-backend fake``). El resultado se emite en JSON para comparar
+versiones.
+
+Uso:
+    python benchmarks/pipeline.py --commits 500 --files-per-commit 5 --output bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from changelogger import __version__
+from changelogger.ai_analyzer import analyze_changes_with_gpt
+from changelogger.file_operations import create_output_files, ensure_output_structure, iter_diff_file
+from changelogger.git_operations import (
+    analyze_commit_changes,
+    analyze_range_changes,
+    generate_diff,
+    get_commit_record,
+    get_commits_in_range,
+    get_commits_numstat,
+    get_range_numstat,
+    iter_diff_chunks,
+    list_recent_commits,
+)
+from changelogger.llm_backends import FakeBackend, start_fake_server
+from changelogger.markdown_formatter import format_changelog
+from changelogger.pipeline import consolidate_files_by_status
+from changelogger.utils import ensure_gitpython
+
+
+def build_synthetic_repo(
+    path: str,
+    commits: int,
+    files_per_commit: int,
+    rename_ratio: float,
+    binary_ratio: float,
+    lines_per_change: int,
+    seed: int,
+) -> None:
+    """Crea un repositorio con ``git fast-import`` según los parámetros dados."""
+    rnd = random.Random(seed)
+    subprocess.run(["git", "init", "-q", path], check=True)
+
+    archivos: List[str] = []
+    contador = 0
+    stream: List[bytes] = []
+
+    def blob(data: bytes) -> bytes:
+        return b"data %d\n" % len(data) + data + b"\n"
+
+    for n in range(commits):
+        marca_tiempo = 1_600_000_000 + n * 60
+        mensaje = f"feat: cambio sintético {n}".encode("utf-8")
+        stream.append(b"commit refs/heads/main\n")
+        stream.append(b"author Bench <bench@example.com> %d +0000\n" % marca_tiempo)
+        stream.append(b"committer Bench <bench@example.com> %d +0000\n" % marca_tiempo)
+        stream.append(b"data %d\n" % len(mensaje) + mensaje + b"\n")
+
+        tocados = set()
+        for _ in range(files_per_commit):
+            if archivos and rnd.random() < rename_ratio:
+                origen = rnd.choice(archivos)
+                if origen in tocados:
+                    continue
+                contador += 1
+                destino = f"src/mod{contador % 50}/renombrado_{contador}.txt"
+                stream.append(f"R {origen} {destino}\n".encode("utf-8"))
+                archivos[archivos.index(origen)] = destino
+                tocados.update({origen, destino})
+                continue
+
+            if archivos and rnd.random() < 0.6:
+                ruta = rnd.choice(archivos)
+                if ruta in tocados:
+                    continue
+            else:
+                contador += 1
+                es_binario = rnd.random() < binary_ratio
+                ruta = f"src/mod{contador % 50}/archivo_{contador}.{'bin' if es_binario else 'txt'}"
+                archivos.append(ruta)
+            tocados.add(ruta)
+
+            if ruta.endswith(".bin"):
+                data = bytes(rnd.getrandbits(8) for _ in range(lines_per_change * 16)) + b"\0"
+            else:
+                data = "".join(
+                    f"línea {n}-{i} {rnd.random():.6f}\n" for i in range(lines_per_change)
+                ).encode("utf-8")
+            stream.append(f"M 100644 inline {ruta}\n".encode("utf-8"))
+            stream.append(blob(data))
+        stream.append(b"\n")
+
+    subprocess.run(
+        ["git", "fast-import", "--quiet"], cwd=path, input=b"".join(stream), check=True
+    )
+    subprocess.run(["git", "checkout", "-q", "main"], cwd=path, check=True)
+
+
+def timed(resultados: Dict[str, float], nombre: str, func: Callable):
+    """Ejecuta ``func`` y guarda su duración en ``resultados``."""
+    inicio = time.perf_counter()
+    valor = func()
+    resultados[nombre] = round(time.perf_counter() - inicio, 4)
+    return valor
+
+
+def run_pipeline(
+    repo_path: str, out_dir: str, ai_latency: Optional[float], ai_workers: int
+) -> Tuple[Dict[str, float], Dict[str, int]]:
+    """Mide cada etapa del pipeline real sobre el repositorio sintético.
+
+    Retorna (tiempos por etapa en segundos, tamaños del rango procesado).
+    """
+    git = ensure_gitpython()
+    repo = git.Repo(repo_path)
+    t: Dict[str, float] = {}
+
+    recientes = timed(t, "list_recent_commits", lambda: list_recent_commits(repo, max_commits=50))
+    origen = get_commit_record(repo, "main~%d" % (int(repo.git.rev_list("--count", "main")) - 1))
+    destino = get_commit_record(repo, "main")
+    rango = timed(t, "get_commits_in_range", lambda: get_commits_in_range(repo, origen, destino))
+
+    timed(t, "analyze_commit_changes", lambda: [analyze_commit_changes(repo, c) for c in rango])
+    por_commit = timed(t, "analyze_range_changes", lambda: analyze_range_changes(repo, rango))
+    por_estado = consolidate_files_by_status(por_commit)
+
+    timed(t, "generate_diff", lambda: len(generate_diff(repo, origen, destino)))
+    # Modo --stats-only: solo líneas por archivo, sin el patch.
+    timed(t, "get_range_numstat", lambda: get_range_numstat(repo, origen, destino))
+    timed(t, "get_commits_numstat", lambda: get_commits_numstat(repo, rango))
+    diff_dir, md_dir = ensure_output_structure(out_dir)
+    diff_tmp = os.path.join(diff_dir, "bench.diff")
+    timed(t, "iter_diff_chunks", lambda: sum(len(c) for c in iter_diff_chunks(repo, origen, destino)))
+
+    ai = None
+    if ai_latency is not None:
+        with open(diff_tmp, "w", encoding="utf-8", newline="\n") as f:
+            for chunk in iter_diff_chunks(repo, origen, destino):
+                f.write(chunk)
+        resumen = "\n".join(f"- {c.hexsha[:7]} | {c.summary}" for c in rango)
+        ai = timed(
+            t,
+            "ai_analysis",
+            lambda: analyze_changes_with_gpt(iter_diff_file(diff_tmp), resumen, por_estado, workers=ai_workers),
+        )
+
+    markdown = timed(
+        t,
+        "format_changelog",
+        lambda: format_changelog(origen, destino, por_estado, rango, por_commit, ai_analysis=ai),
+    )
+    timed(
+        t,
+        "create_output_files",
+        lambda: create_output_files(
+            diff_dir,
+            md_dir,
+            origen.hexsha,
+            destino.hexsha,
+            destino.summary,
+            datetime.fromtimestamp(destino.committed_date),
+            iter_diff_chunks(repo, origen, destino),
+            markdown,
+        ),
+    )
+    repo.close()
+    return t, {"commits_listed": len(recientes), "commits_in_range": len(rango), "files": sum(len(v) for v in por_estado.values())}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commits", type=int, default=200)
+    parser.add_argument("--files-per-commit", type=int, default=5)
+    parser.add_argument("--rename-ratio", type=float, default=0.1)
+    parser.add_argument("--binary-ratio", type=float, default=0.05)
+    parser.add_argument("--lines-per-change", type=int, default=40, help="tamaño del diff por archivo tocado")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1, help="repeticiones; se informa la mediana")
+    parser.add_argument("--ai-backend", choices=["compatible", "fake"], default="compatible")
+    parser.add_argument("--ai-latency", type=float, default=0.05, help="latencia (s) simulada por petición")
+    parser.add_argument("--ai-tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--ai-error-rate", type=float, default=0.0)
+    parser.add_argument("--ai-workers", type=int, default=4)
+    parser.add_argument("--no-ai", action="store_true", help="omitir la fase de IA")
+    parser.add_argument("--output", default=None, help="archivo JSON de salida (stdout si se omite)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="changelogger-bench-") as tmp:
+        repo_path = os.path.join(tmp, "repo")
+        inicio = time.perf_counter()
+        build_synthetic_repo(
+            repo_path,
+            args.commits,
+            args.files_per_commit,
+            args.rename_ratio,
+            args.binary_ratio,
+            args.lines_per_change,
+            args.seed,
+        )
+        construccion = round(time.perf_counter() - inicio, 4)
+
+        server = None
+        if not args.no_ai:
+            os.environ["CHANGELOGGER_LLM_BACKEND"] = args.ai_backend
+            os.environ["CHANGELOGGER_FAKE_LLM_LATENCY"] = str(args.ai_latency)
+            os.environ["CHANGELOGGER_FAKE_LLM_TOKENS_PER_SECOND"] = str(args.ai_tokens_per_second)
+            os.environ["CHANGELOGGER_FAKE_LLM_ERROR_RATE"] = str(args.ai_error_rate)
+            if args.ai_backend == "compatible":
+                server = start_fake_server(
+                    FakeBackend(args.ai_latency, args.ai_tokens_per_second, args.ai_error_rate)
+                )
+                os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+        try:
+            ejecuciones = [
+                run_pipeline(
+                    repo_path,
+                    os.path.join(tmp, f"out{i}"),
+                    None if args.no_ai else args.ai_latency,
+                    args.ai_workers,
+                )
+                for i in range(args.repeat)
+            ]
+        finally:
+            if server is not None:
+                server.shutdown()
+
+    tiempos = [e[0] for e in ejecuciones]
+    mediana = {k: sorted(e[k] for e in tiempos)[len(tiempos) // 2] for k in tiempos[0]}
+    git_version = subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip()
+    informe = {
+        "changelogger_version": __version__,
+        "python": platform.python_version(),
+        "git": git_version,
+        "params": {k: v for k, v in vars(args).items() if k != "output"},
+        "repo_build_seconds": construccion,
+        "sizes": ejecuciones[0][1],
+        "timings": mediana,
+        "runs": tiempos,
+    }
+
+    salida = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(salida + "\n")
+    else:
+        print(salida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Benchmark de arranque del CLI basado en ``python -X importtime``.
+
+Comprueba que importar ``changelogger.__main__`` no carga dependencias pesadas
+(GitPython, openai, python-dotenv, prompt_toolkit) y que el tiempo de
+importación y el de ``changelogger --help`` no superan los umbrales dados.
+Termina con código 1 si detecta una regresión.
+
+Uso:
+    python benchmarks/startup.py [--max-import-ms 150] [--max-help-ms 500] [--json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ENTRY_MODULE = "changelogger.__main__"
+
+# Módulos que solo deben cargarse cuando se ejecuta la fase que los necesita.
+HEAVY_MODULES = ("git", "openai", "dotenv", "prompt_toolkit", "httpx", "pydantic")
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)\s*$")
+
+
+def measure_importtime() -> Tuple[int, List[Tuple[str, int, int]]]:
+    """Importa el punto de entrada con ``-X importtime`` y retorna (total_us, módulos)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {ENTRY_MODULE}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modulos: List[Tuple[str, int, int]] = []
+    total = 0
+    for linea in proc.stderr.splitlines():
+        m = _IMPORTTIME_RE.match(linea)
+        if not m:
+            continue
+        propio, acumulado, nombre = int(m.group(1)), int(m.group(2)), m.group(3)
+        modulos.append((nombre, propio, acumulado))
+        if nombre == ENTRY_MODULE:
+            total = acumulado
+    return total, modulos
+
+
+def measure_help(runs: int) -> float:
+    """Mediana (ms) del tiempo de reloj de ``python -m changelogger --help``."""
+    tiempos: List[float] = []
+    for _ in range(runs):
+        inicio = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "changelogger", "--help"],
+            capture_output=True,
+            check=True,
+        )
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def run(max_import_ms: float, max_help_ms: float, runs: int) -> Dict:
+    """Ejecuta las mediciones y retorna el informe con los fallos detectados."""
+    total_us, modulos = measure_importtime()
+    cargados = sorted(
+        {nombre for nombre, _, _ in modulos if nombre.split(".")[0] in HEAVY_MODULES}
+    )
+    top = sorted(
+        (m for m in modulos if m[0].startswith("changelogger")), key=lambda m: -m[2]
+    )
+    help_ms = measure_help(runs)
+
+    fallos: List[str] = []
+    if cargados:
+        fallos.append(f"dependencias pesadas importadas al arrancar: {', '.join(cargados)}")
+    if total_us / 1000 > max_import_ms:
+        fallos.append(f"importación de {ENTRY_MODULE}: {total_us / 1000:.1f} ms > {max_import_ms} ms")
+    if help_ms > max_help_ms:
+        fallos.append(f"changelogger --help: {help_ms:.1f} ms > {max_help_ms} ms")
+
+    return {
+        "import_ms": round(total_us / 1000, 2),
+        "help_ms": round(help_ms, 2),
+        "heavy_modules_loaded": cargados,
+        "changelogger_modules": [
+            {"module": nombre, "self_ms": round(p / 1000, 2), "cumulative_ms": round(a / 1000, 2)}
+            for nombre, p, a in top
+        ],
+        "failures": fallos,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-import-ms", type=float, default=150.0)
+    parser.add_argument("--max-help-ms", type=float, default=500.0)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="emitir el informe en JSON")
+    args = parser.parse_args()
+
+    informe = run(args.max_import_ms, args.max_help_ms, args.runs)
+
+    if args.json:
+        print(json.dumps(informe, indent=2, ensure_ascii=False))
+    else:
+        print(f"Importación de {ENTRY_MODULE}: {informe['import_ms']} ms")
+        print(f"changelogger --help (mediana de {args.runs}): {informe['help_ms']} ms")
+        for m in informe["changelogger_modules"]:
+            print(f"  {m['module']:<32} {m['cumulative_ms']:>8} ms")
+        for fallo in informe["failures"]:
+            print(f"REGRESIÓN: {fallo}")
+
+    raise SystemExit(1 if informe["failures"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,127 +2,371 @@
 
 from __future__ import annotations
 
-from datetime import datetime
+import argparse
+import logging
+import sys
+from typing import List, Optional
 
-from .ai_analyzer import analyze_changes_with_gpt
+from .artifact_store import gc_diff_store, get_gc_limits, is_store_enabled
+from .batch import DEFAULT_JOBS, resolve_ranges, run_batch
+from .commit_index import CommitIndex
 from .file_operations import (
-    create_output_files,
     ensure_output_structure,
+    get_ndjson_path,
     get_repository_working_path,
+    iter_diff_file,
     print_output_summary,
 )
-from .git_operations import (
-    analyze_commit_changes,
-    classify_files_by_status,
-    detect_repository,
-    generate_diff,
-    get_commits_in_range,
-    list_recent_commits,
-)
-from .markdown_formatter import format_changelog, format_commit_selection_summary
-from .ui_interface import confirm_action, select_commit
+from .git_operations import build_pathspecs, detect_repository, get_commit_record
+from .markdown_formatter import format_commit_selection_summary
+from .pipeline import RunOptions, generate_changelog
+from .prefetch import CommitPrefetcher, get_prefetch_max_commits
+from .profiling import phase, require_serial_phases, start_profiling
+from .ui_interface import confirm_action, pick_commit
 from .utils import ensure_gitpython
 
 
-def main() -> None:
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parsea los argumentos de línea de comandos."""
+    parser = argparse.ArgumentParser(
+        prog="changelogger",
+        description="Genera un diff y un resumen Markdown de los commits desde un origen hasta HEAD.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="no leer ni escribir las cachés (commits y respuestas de IA) de .changelogger/.cache",
+    )
+    parser.add_argument(
+        "--ai-workers",
+        type=int,
+        default=None,
+        metavar="N",
+        help="fragmentos del diff analizados en paralelo por la IA (por defecto OPENAI_WORKERS o 4)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="procesar solo los commits nuevos desde la última ejecución con el mismo origen",
+    )
+    parser.add_argument(
+        "--stats-only",
+        action="store_true",
+        help="solo archivos y líneas añadidas/eliminadas (--numstat): sin .diff ni análisis de IA",
+    )
+    parser.add_argument(
+        "--path",
+        dest="paths",
+        action="append",
+        default=[],
+        metavar="PATRÓN",
+        help="limitar el changelog a las rutas que encajan (glob, repetible; '!' delante excluye)",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="PATRÓN",
+        help="excluir las rutas que encajan (glob, repetible; equivale a --path '!PATRÓN')",
+    )
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="escribir también un export NDJSON (un registro JSON por commit) junto a cada .md",
+    )
+    parser.add_argument(
+        "--ndjson-stdout",
+        action="store_true",
+        help="modo batch: solo emitir por stdout el NDJSON de cada rango, en streaming y sin IA",
+    )
+    parser.add_argument(
+        "--compress-diffs",
+        action="store_true",
+        default=None,
+        help="guardar los diffs comprimidos y deduplicados por archivo en .changelogger/.diff/.store "
+        "(por defecto CHANGELOGGER_DIFF_STORE)",
+    )
+    parser.add_argument(
+        "--cat-diff",
+        default=None,
+        metavar="RUTA",
+        help="escribir por stdout el diff completo de un .diff (también si es una referencia al almacén) y salir",
+    )
+    parser.add_argument(
+        "--gc",
+        action="store_true",
+        help="aplicar la retención a .changelogger/.diff, borrar los parches sin referencias y salir",
+    )
+    parser.add_argument(
+        "--gc-max-mb",
+        type=int,
+        default=None,
+        metavar="N",
+        help="con --gc: tamaño máximo de .diff + almacén en MB (por defecto CHANGELOGGER_DIFF_MAX_MB; 0 = sin límite)",
+    )
+    parser.add_argument(
+        "--gc-keep-days",
+        type=int,
+        default=None,
+        metavar="N",
+        help="con --gc: borrar los .diff con más de N días (por defecto CHANGELOGGER_DIFF_KEEP_DAYS; 0 = sin límite)",
+    )
+    parser.add_argument(
+        "--range",
+        dest="ranges",
+        action="append",
+        default=[],
+        metavar="ORIGEN..DESTINO",
+        help=(
+            "modo batch: rango a procesar sin interacción (repetible; 'ORIGEN' equivale a ORIGEN..HEAD; "
+            "ORIGEN puede ser 'tag:PATRÓN' o 'since:AAAA-MM-DD')"
+        ),
+    )
+    parser.add_argument(
+        "--since",
+        action="append",
+        default=[],
+        metavar="FECHA",
+        help="modo batch: cambios desde FECHA (AAAA-MM-DD[ HH:MM]) hasta HEAD; equivale a --range since:FECHA",
+    )
+    parser.add_argument(
+        "--last-tags",
+        type=int,
+        default=None,
+        metavar="N",
+        help="modo batch: un changelog por cada par de etiquetas consecutivas entre las últimas N",
+    )
+    parser.add_argument(
+        "--repo",
+        dest="repos",
+        action="append",
+        default=[],
+        metavar="RUTA",
+        help="modo multi-repositorio: repositorio o glob de repositorios (repetible; usa --range/--last-tags)",
+    )
+    parser.add_argument(
+        "--repos-file",
+        default=None,
+        metavar="RUTA",
+        help="modo multi-repositorio: archivo con una línea 'RUTA_O_GLOB [RANGO ...]' por repositorio",
+    )
+    parser.add_argument(
+        "--index-output",
+        default="changelogger-index.md",
+        metavar="RUTA",
+        help="modo multi-repositorio: ruta del índice Markdown agregado (por defecto changelogger-index.md)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        metavar="N",
+        help=f"modo batch/multi-repositorio: rangos o repositorios procesados en paralelo (por defecto {DEFAULT_JOBS})",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="mostrar mensajes de depuración (por stderr)",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="text",
+        choices=["text", "json"],
+        default=None,
+        help="informe de tiempos y memoria por fase al terminar (text por defecto, o json)",
+    )
+    parser.add_argument(
+        "--profile-output",
+        default=None,
+        metavar="RUTA",
+        help="escribir el informe de --profile en un archivo en lugar de stderr",
+    )
+    parser.add_argument(
+        "--cprofile",
+        default=None,
+        metavar="RUTA",
+        help="guardar un perfil cProfile (.pstats) de toda la ejecución",
+    )
+    parser.add_argument(
+        "--tracemalloc",
+        default=None,
+        metavar="RUTA",
+        help="trazar memoria por fase y guardar una instantánea de tracemalloc",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
     """Punto de entrada principal del comando changelogger."""
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.WARNING,
+        format="%(message)s",
+        stream=sys.stderr,
+    )
+
+    profiler = None
+    if args.profile or args.tracemalloc:
+        profiler = start_profiling(trace_memory=bool(args.tracemalloc))
+
+    perfil_cpu = None
+    if args.cprofile:
+        import cProfile
+        perfil_cpu = cProfile.Profile()
+        perfil_cpu.enable()
+        # cProfile solo ve el hilo principal: las fases no se reparten en hilos
+        require_serial_phases()
+
+    try:
+        run(args)
+    finally:
+        if perfil_cpu is not None:
+            perfil_cpu.disable()
+            perfil_cpu.dump_stats(args.cprofile)
+        if profiler is not None:
+            if args.tracemalloc:
+                profiler.dump_tracemalloc(args.tracemalloc)
+            if args.profile:
+                informe = profiler.format(args.profile)
+                if args.profile_output:
+                    with open(args.profile_output, "w", encoding="utf-8") as f:
+                        f.write(informe + "\n")
+                else:
+                    print(informe, file=sys.stderr)
+
+
+def run_gc(repo, max_mb: Optional[int] = None, keep_days: Optional[int] = None) -> None:
+    """Retención del almacén de diffs del repositorio (``--gc``)."""
+    max_bytes, dias = get_gc_limits()
+    if max_mb is not None:
+        max_bytes = max_mb * 1024 * 1024 if max_mb else None
+    if keep_days is not None:
+        dias = keep_days or None
+    diff_dir, _ = ensure_output_structure(get_repository_working_path(repo))
+    resultado = gc_diff_store(diff_dir, max_bytes=max_bytes, keep_days=dias)
+    print(
+        f"🧹 Diffs borrados: {resultado['diffs_removed']}, parches borrados: {resultado['blobs_removed']}, "
+        f"liberados {resultado['bytes_freed'] / 1024 / 1024:.1f} MB "
+        f"(ocupado: {resultado['bytes_after'] / 1024 / 1024:.1f} MB)"
+    )
+
+
+def run(args: argparse.Namespace) -> None:
+    """Ejecuta el flujo interactivo o batch según los argumentos."""
     ensure_gitpython()
-    
-    # Detectar repositorio y obtener commits
-    repo = detect_repository()
-    commits = list_recent_commits(repo, max_commits=50)
-    
-    if not commits:
-        print("No hay commits en este repositorio.")
+    rangos_cli = list(args.ranges) + [f"since:{fecha}" for fecha in args.since]
+    batch = bool(rangos_cli or args.last_tags)
+    options = RunOptions(
+        use_cache=not args.no_cache,
+        ai_workers=args.ai_workers,
+        incremental=args.incremental,
+        stream_ai=not batch,
+        stats_only=args.stats_only,
+        paths=tuple(args.paths) + tuple(f"!{p}" for p in args.exclude),
+        ndjson=args.ndjson,
+        compress_diffs=is_store_enabled() if args.compress_diffs is None else args.compress_diffs,
+    )
+
+    if args.cat_diff:
+        for chunk in iter_diff_file(args.cat_diff):
+            sys.stdout.write(chunk)
         raise SystemExit(0)
+    
+    if args.ndjson_stdout and (not batch or args.repos or args.repos_file):
+        print("Error: --ndjson-stdout requiere --range o --last-tags en un solo repositorio.")
+        raise SystemExit(1)
 
-    # Selección interactiva de commit
-    indice = select_commit(commits, per_page=10)
-    commit_origen = commits[indice]
-    commit_destino = repo.head.commit
+    # Modo multi-repositorio: un pool de procesos para Git y un cliente de IA compartido
+    if args.repos or args.repos_file:
+        from .multi_repo import build_repo_jobs, run_multi_repo
 
-    # Mostrar resumen de selección
-    summary_lines = format_commit_selection_summary(commit_origen, commit_destino)
-    print("\n".join(summary_lines))
+        trabajos = build_repo_jobs(args.repos, args.repos_file, rangos_cli, args.last_tags)
+        sin_rango = [t.path for t in trabajos if not t.range_specs and not t.last_tags]
+        if sin_rango:
+            print(f"Error: sin rango para {', '.join(sin_rango)}. Usa --range, --last-tags o rangos en --repos-file.")
+            raise SystemExit(1)
+        if not trabajos:
+            print("No hay repositorios que procesar.")
+            raise SystemExit(0)
+        fallidos = run_multi_repo(trabajos, options, workers=args.jobs, index_path=args.index_output)
+        raise SystemExit(1 if fallidos else 0)
 
-    # Confirmación del usuario
-    if not confirm_action("¿Continuar generando diff y markdown para este rango?"):
-        print("Operación cancelada.")
+    # Detectar repositorio
+    with phase("repo_detection"):
+        repo = detect_repository()
+
+    if args.gc:
+        run_gc(repo, args.gc_max_mb, args.gc_keep_days)
         raise SystemExit(0)
 
-    print("🤖 Analizando cambios con IA...")
-    
-    # Preparar estructura de salida
-    base_repo = get_repository_working_path(repo)
-    diff_dir, md_dir = ensure_output_structure(base_repo)
-
-    # Generar contenido
-    diff_texto = generate_diff(repo, commit_origen, commit_destino)
-    commits_rango = get_commits_in_range(repo, commit_origen, commit_destino)
-
-    # Analizar archivos por commit PRIMERO (para obtener todos los archivos)
-    archivos_por_commit = {}
-    for commit in commits_rango:
-        archivos_por_commit[commit.hexsha] = analyze_commit_changes(repo, commit)
-
-    # Consolidar todos los archivos de todos los commits
-    todos_creados: set[str] = set()
-    todos_modificados: set[str] = set()
-    todos_eliminados: set[str] = set()
-
-    for commit_files in archivos_por_commit.values():
-        for file_type, path in commit_files:
-            if file_type == "Creado":
-                todos_creados.add(path)
-            elif file_type == "Modificado":
-                todos_modificados.add(path)
-            elif file_type == "Eliminado":
-                todos_eliminados.add(path)
-
-    # Crear diccionario consolidado para el Markdown
-    archivos_por_estado = {
-        "creados": sorted(todos_creados),
-        "modificados": sorted(todos_modificados),
-        "eliminados": sorted(todos_eliminados),
-    }
-
-    # Preparar resumen de commits para análisis de IA
-    commits_summary = "\n".join([
-        f"- {c.hexsha[:7]} | {c.summary}" 
-        for c in commits_rango
-    ])
-
-    # Analizar cambios con ChatGPT
-    ai_analysis = analyze_changes_with_gpt(
-        diff_texto, 
-        commits_summary, 
-        archivos_por_estado
-    )
-
-    # Generar Markdown con análisis de IA
-    markdown = format_changelog(
-        commit_origen,
-        commit_destino,
-        archivos_por_estado,
-        commits_rango,
-        archivos_por_commit,
-        ai_analysis=ai_analysis,
-    )
-
-    # Crear archivos de salida
-    diff_path, md_path = create_output_files(
-        diff_dir,
-        md_dir,
-        commit_origen.hexsha,
-        commit_destino.hexsha,
-        commit_destino.summary,
-        datetime.fromtimestamp(commit_destino.committed_date),
-        diff_texto,
-        markdown,
-    )
+    # Modo batch: sin selección ni confirmación interactivas
+    if batch:
+        rangos = resolve_ranges(repo, rangos_cli, args.last_tags, options.use_cache)
+        if not rangos:
+            print("No hay rangos que procesar.")
+            raise SystemExit(0)
+        if args.ndjson_stdout:
+            from .ndjson_export import export_ranges
+
+            fallidos = export_ranges(repo, rangos, sys.stdout, options.paths, with_stats=args.stats_only)
+            raise SystemExit(1 if fallidos else 0)
+        fallidos = run_batch(repo, rangos, options, jobs=args.jobs)
+        raise SystemExit(1 if fallidos else 0)
+
+    # Historial completo cargado en segundo plano; la primera página llega enseguida
+    pathspecs = build_pathspecs(options.paths)
+    with phase("commit_listing"):
+        historial = CommitIndex(repo, "HEAD", pathspecs).start()
+        historial.wait_for(1)
+    commit_destino = get_commit_record(repo, "HEAD")
+
+    # Mientras se elige y se confirma, precalcular los candidatos que se muestran
+    prefetcher = None
+    max_prefetch = get_prefetch_max_commits()
+    if max_prefetch and commit_destino is not None:
+        prefetcher = CommitPrefetcher(
+            repo,
+            historial,
+            commit_destino,
+            pathspecs,
+            with_stats=args.stats_only,
+            use_cache=options.use_cache,
+            max_commits=max_prefetch,
+        ).start()
+
+    prefetched = None
+    try:
+        # Selección interactiva de commit
+        try:
+            posicion = pick_commit(historial, per_page=10, on_view=prefetcher.focus if prefetcher else None)
+        finally:
+            historial.close()
+        if prefetcher is not None:
+            prefetcher.focus([posicion], posicion)
+        commit_origen = get_commit_record(repo, historial.get(posicion).hexsha)
+
+        # Mostrar resumen de selección
+        summary_lines = format_commit_selection_summary(commit_origen, commit_destino)
+        print("\n".join(summary_lines))
+
+        # Confirmación del usuario
+        if not confirm_action("¿Continuar generando diff y markdown para este rango?"):
+            print("Operación cancelada.")
+            raise SystemExit(0)
+    finally:
+        if prefetcher is not None:
+            prefetched = prefetcher.stop()
+
+    if not args.stats_only:
+        print("🤖 Analizando cambios con IA...")
+
+    # Generar diff, análisis y Markdown del rango
+    diff_path, md_path = generate_changelog(repo, commit_origen, commit_destino, options, prefetched)
 
     # Mostrar resumen final
-    print_output_summary(diff_path, md_path)
+    print_output_summary(diff_path, md_path, get_ndjson_path(md_path) if args.ndjson else None)
 
 
 if __name__ == "__main__":
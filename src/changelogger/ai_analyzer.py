@@ -2,17 +2,35 @@
 
 from __future__ import annotations
 
+import logging
 import os
 import textwrap
-from typing import Dict, List
-
-try:
-    import openai
-except ModuleNotFoundError:
-    openai = None
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
 
+from .ai_cache import AIResponseCache, build_request_key
+from .ai_client import AIClient, create_ai_client
+from .diff_condenser import condense_diff
+from .llm_backends import LLMBackendError, check_backend, load_backend_name
+from .profiling import record_ai_request
 from .utils import ensure_gitpython
 
+logger = logging.getLogger(__name__)
+
+# Presupuesto aproximado de tokens de diff por fragmento (fase map).
+DEFAULT_CHUNK_TOKENS = 6000
+
+# Número de fragmentos que se resumen en paralelo.
+DEFAULT_WORKERS = 4
+
+# Tokens máximos de respuesta para el resumen de cada fragmento.
+MAP_MAX_TOKENS = 400
+
+# Marca que abre la continuación de un hunk partido por exceder el presupuesto.
+_CONTINUATION_MARK = "@@ (continuación) @@\n"
+
+SYSTEM_PROMPT = "Eres un experto en análisis de código y cambios de software."
+
 
 def load_openai_config() -> tuple[str, str, int]:
     """Carga configuración de OpenAI desde variables de entorno."""
@@ -23,53 +41,126 @@ def load_openai_config() -> tuple[str, str, int]:
     except ImportError:
         # Si python-dotenv no está instalado, continuar sin cargar .env
         pass
-    
+
     api_key = os.getenv("OPENAI_API_KEY", "")
     model = os.getenv("OPENAI_MODEL", "gpt-4")
     max_tokens = int(os.getenv("OPENAI_MAX_TOKENS", "4000"))
-    
+
     return api_key, model, max_tokens
 
 
+def load_map_reduce_config() -> tuple[int, int]:
+    """Carga el presupuesto por fragmento y el número de workers del análisis map-reduce."""
+    chunk_tokens = int(os.getenv("OPENAI_CHUNK_TOKENS", str(DEFAULT_CHUNK_TOKENS)))
+    workers = int(os.getenv("OPENAI_WORKERS", str(DEFAULT_WORKERS)))
+    return max(1, chunk_tokens), max(1, workers)
+
+
 def is_openai_available() -> bool:
-    """Verifica si OpenAI está disponible y configurado."""
-    if openai is None:
-        print("🔍 DEBUG: OpenAI no está instalado")
-        return False
-    
-    api_key, _, _ = load_openai_config()
-    if not api_key.strip():
-        print("🔍 DEBUG: OPENAI_API_KEY no está configurada")
+    """Verifica si el backend LLM configurado está disponible (ver ``llm_backends``)."""
+    api_key, model, max_tokens = load_openai_config()
+    backend = load_backend_name()
+    motivo = check_backend(backend, api_key)
+    if motivo:
+        logger.debug(f"🔍 {motivo}")
         return False
-    
-    print(f"🔍 DEBUG: OpenAI disponible - Model: {load_openai_config()[1]}, Tokens: {load_openai_config()[2]}")
+
+    logger.debug(f"🔍 Backend LLM disponible ({backend}) - Model: {model}, Tokens: {max_tokens}")
     return True
 
 
-def analyze_changes_with_gpt(
-    diff_content: str, 
-    commits_summary: str, 
-    files_affected: Dict[str, List[str]]
-) -> str:
-    """Analiza cambios usando ChatGPT y genera resumen inteligente."""
-    
-    print("🤖 DEBUG: Iniciando análisis con ChatGPT...")
-    print(f"🔍 DEBUG: Longitud del diff: {len(diff_content)} caracteres")
-    print(f"🔍 DEBUG: Número de commits: {len(commits_summary.split(chr(10)))}")
-    print(f"🔍 DEBUG: Archivos afectados - Creados: {len(files_affected.get('creados', []))}, Modificados: {len(files_affected.get('modificados', []))}, Eliminados: {len(files_affected.get('eliminados', []))}")
-    
-    if not is_openai_available():
-        print("❌ ERROR: OpenAI no configurado. Añade OPENAI_API_KEY a tu archivo .env")
-        return "⚠️ OpenAI no configurado. Añade OPENAI_API_KEY a tu archivo .env"
-    
-    api_key, model, max_tokens = load_openai_config()
-    
+def iter_diff_lines(diff_content: Union[str, Iterable[str]]) -> Iterator[str]:
+    """Genera las líneas del diff (con su salto) a partir de un str o de bloques perezosos."""
+    if isinstance(diff_content, str):
+        yield from diff_content.splitlines(keepends=True)
+        return
+
+    pendiente = ""
     try:
-        print(f"🔍 DEBUG: Creando cliente OpenAI con modelo {model}")
-        client = openai.OpenAI(api_key=api_key)
-        
-        # Preparar el prompt para el análisis
-        prompt = f"""Analiza los siguientes cambios de Git y proporciona un resumen ejecutivo:
+        for chunk in diff_content:
+            lineas = (pendiente + chunk).splitlines(keepends=True)
+            pendiente = ""
+            if lineas and not lineas[-1].endswith(("\n", "\r")):
+                pendiente = lineas.pop()
+            yield from lineas
+        if pendiente:
+            yield pendiente
+    finally:
+        close = getattr(diff_content, "close", None)
+        if close is not None:
+            close()
+
+
+def split_diff_into_chunks(
+    diff_content: Union[str, Iterable[str]], max_tokens: int = DEFAULT_CHUNK_TOKENS
+) -> Iterator[str]:
+    """Divide el diff en fragmentos de como máximo ``max_tokens`` tokens estimados.
+
+    Los cortes se hacen en fronteras de archivo (``diff --git``) y de hunk
+    (``@@``); si un fragmento continúa un archivo ya empezado, se repite su
+    cabecera para que el modelo sepa a qué archivo pertenece. Solo un hunk
+    que por sí mismo supera el presupuesto se corta por líneas.
+    """
+    max_chars = max_tokens * 4
+
+    actual: List[str] = []
+    actual_len = 0
+    cabecera: List[str] = []
+    segmento: List[str] = []
+    segmento_len = 0
+    en_cabecera = False
+
+    def volcar_segmento() -> Iterator[str]:
+        nonlocal actual, actual_len, segmento, segmento_len
+        if not segmento:
+            return
+        if actual and actual_len + segmento_len > max_chars:
+            yield "".join(actual)
+            actual, actual_len = [], 0
+        if not actual and segmento[0].startswith("@@") and cabecera:
+            actual = list(cabecera)
+            actual_len = sum(len(x) for x in cabecera)
+        actual.extend(segmento)
+        actual_len += segmento_len
+        segmento, segmento_len = [], 0
+
+    for linea in iter_diff_lines(diff_content):
+        if linea.startswith("diff --git "):
+            yield from volcar_segmento()
+            cabecera = []
+            en_cabecera = True
+        elif linea.startswith("@@"):
+            # La cabecera del archivo viaja junto a su primer hunk.
+            if en_cabecera:
+                en_cabecera = False
+            else:
+                yield from volcar_segmento()
+
+        if en_cabecera:
+            cabecera.append(linea)
+
+        segmento.append(linea)
+        segmento_len += len(linea)
+
+        # Hunk gigante: cortar por líneas para respetar el presupuesto.
+        if segmento_len >= max_chars and not en_cabecera:
+            yield from volcar_segmento()
+            yield "".join(actual)
+            actual, actual_len = [], 0
+            segmento = [_CONTINUATION_MARK]
+            segmento_len = len(_CONTINUATION_MARK)
+
+    if segmento != [_CONTINUATION_MARK]:
+        yield from volcar_segmento()
+    if actual:
+        yield "".join(actual)
+
+
+def build_analysis_prompt(
+    commits_summary: str, files_affected: Dict[str, List[str]], diff_section: str, diff_title: str
+) -> str:
+    """Construye el prompt del análisis ejecutivo final."""
+    return f"""Analiza los siguientes cambios de Git y proporciona un resumen ejecutivo:
 
 COMMITS INVOLUCRADOS:
 {commits_summary}
@@ -79,8 +170,8 @@ ARCHIVOS AFECTADOS:
 - Modificados: {len(files_affected.get('modificados', []))}
 - Eliminados: {len(files_affected.get('eliminados', []))}
 
-DIFF COMPLETO:
-{diff_content[:3000]}...
+{diff_title}:
+{diff_section}
 
 Proporciona un análisis conciso que incluya:
 1. Resumen ejecutivo de los cambios principales
@@ -90,23 +181,262 @@ Proporciona un análisis conciso que incluya:
 
 Responde en español, de forma técnica pero clara. Máximo 300 palabras.
 """
-        
-        print("🔍 DEBUG: Enviando solicitud a OpenAI...")
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "Eres un experto en análisis de código y cambios de software."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=max_tokens,
-            temperature=0.3
+
+
+def build_chunk_prompt(chunk: str) -> str:
+    """Construye el prompt de resumen de un fragmento del diff (fase map).
+
+    No incluye la posición del fragmento: el prompt forma parte de la clave de
+    la caché de respuestas, y un fragmento idéntico debe reutilizar su resumen
+    aunque cambien los fragmentos anteriores del diff.
+    """
+    return f"""Este es un fragmento del diff de una release.
+Resume en español y en pocas viñetas qué cambia en estos archivos (funcionalidad,
+APIs, configuración, riesgos). No repitas el código. Máximo 120 palabras.
+
+FRAGMENTO DEL DIFF:
+{chunk}
+"""
+
+
+# Temperatura usada en todas las peticiones.
+TEMPERATURE = 0.3
+
+
+async def _complete(
+    client: AIClient,
+    model: str,
+    prompt: str,
+    max_tokens: int,
+    cache: Optional[AIResponseCache] = None,
+    kind: str = "single",
+    on_token: Optional[Callable[[str], None]] = None,
+) -> str:
+    """Realiza una petición de chat y retorna el texto de la respuesta.
+
+    Si hay caché, una petición idéntica a otra anterior se responde sin red.
+    ``kind`` (single/map/reduce) solo se usa para la instrumentación. Con
+    ``on_token`` el texto se entrega a medida que llega (o de una vez si
+    viene de la caché).
+    """
+    inicio = time.perf_counter()
+    key = None
+    if cache is not None:
+        # Las respuestas de otros backends (p. ej. fake) no se mezclan con las de OpenAI.
+        modelo_cache = model if client.name == "openai" else f"{client.name}/{model}"
+        key = build_request_key(modelo_cache, max_tokens, TEMPERATURE, SYSTEM_PROMPT, prompt)
+        cached = cache.get(key)
+        if cached is not None:
+            record_ai_request(kind, time.perf_counter() - inicio, cached=True)
+            if on_token is not None:
+                on_token(cached)
+            return cached
+
+    completion = await client.complete(
+        model,
+        [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens,
+        TEMPERATURE,
+        on_token,
+    )
+    result = completion.text.strip()
+
+    # Sin streaming, el primer token llega con la respuesta completa.
+    latencia = time.perf_counter() - inicio
+    record_ai_request(
+        kind,
+        latencia,
+        ttft=completion.ttft if completion.ttft is not None else latencia,
+        prompt_tokens=completion.prompt_tokens,
+        completion_tokens=completion.completion_tokens,
+        retries=completion.retries,
+    )
+
+    if cache is not None and key is not None and result:
+        cache.put(key, result)
+    return result
+
+
+async def _map_chunks(
+    client: AIClient,
+    model: str,
+    chunks: Iterable[str],
+    workers: int,
+    cache: Optional[AIResponseCache] = None,
+) -> List[str]:
+    """Resume los fragmentos en paralelo con como máximo ``workers`` peticiones en vuelo.
+
+    Un fragmento que sigue fallando tras los reintentos no aborta el análisis:
+    se sustituye por una nota para que la fase reduce sepa que falta.
+    """
+    import asyncio
+
+    semaforo = asyncio.Semaphore(workers)
+    resultados: Dict[int, str] = {}
+    tareas: List[asyncio.Task] = []
+
+    async def resumir(index: int, chunk: str) -> None:
+        try:
+            resultados[index] = await _complete(
+                client, model, build_chunk_prompt(chunk), MAP_MAX_TOKENS, cache, "map"
+            )
+        except LLMBackendError as e:
+            logger.warning(f"⚠️ Fragmento {index + 1} del diff sin analizar: {e}")
+            resultados[index] = f"(Fragmento no analizado: {e})"
+        finally:
+            semaforo.release()
+
+    # Los fragmentos se generan perezosamente: solo hay ``workers`` en memoria a la vez.
+    for index, chunk in enumerate(chunks):
+        await semaforo.acquire()
+        tareas.append(asyncio.create_task(resumir(index, chunk)))
+
+    try:
+        await asyncio.gather(*tareas)
+    finally:
+        for tarea in tareas:
+            tarea.cancel()
+    return [resultados[i] for i in range(len(tareas))]
+
+
+async def analyze_changes_async(
+    diff_content: Union[str, Iterable[str]],
+    commits_summary: str,
+    files_affected: Dict[str, List[str]],
+    workers: Optional[int] = None,
+    cache: Optional[AIResponseCache] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+    client: Optional[AIClient] = None,
+) -> str:
+    """Análisis map-reduce del diff completo con el backend LLM configurado.
+
+    El diff se condensa primero (ver ``diff_condenser``) para que quepa en
+    ``OPENAI_DIFF_BUDGET_TOKENS``.
+    Fase map: cada fragmento del diff se resume de forma concurrente.
+    Fase reduce: una última petición combina los resúmenes parciales en el
+    análisis ejecutivo. Si el diff cabe en un solo fragmento se envía
+    directamente en una única petición. ``on_token`` recibe el texto del
+    análisis final a medida que llega. Con ``client`` se usa un cliente
+    compartido (y su limitador) que no se cierra al terminar.
+    """
+    api_key, model, max_tokens = load_openai_config()
+    chunk_tokens, default_workers = load_map_reduce_config()
+    workers = max(1, workers or default_workers)
+
+    propio = client is None
+    if propio:
+        client = create_ai_client(api_key)
+    logger.debug(f"🔍 Backend LLM {client.name} con modelo {model}")
+
+    try:
+        # Lockfiles, generados, binarios y hunks de espacios no llegan al modelo.
+        chunks = split_diff_into_chunks(condense_diff(iter_diff_lines(diff_content)), chunk_tokens)
+        primero = next(chunks, "")
+        segundo = next(chunks, None)
+
+        if segundo is None:
+            logger.debug("🔍 Diff en un único fragmento, enviando solicitud a OpenAI...")
+            prompt = build_analysis_prompt(
+                commits_summary, files_affected, primero, "DIFF COMPLETO"
+            )
+            return await _complete(client, model, prompt, max_tokens, cache, on_token=on_token)
+
+        def todos() -> Iterator[str]:
+            yield primero
+            yield segundo
+            yield from chunks
+
+        logger.debug(f"🔍 Resumiendo fragmentos del diff con {workers} workers...")
+        parciales = await _map_chunks(client, model, todos(), workers, cache)
+        logger.debug(f"🔍 {len(parciales)} fragmentos resumidos, generando resumen final...")
+
+        resumen_diff = "\n\n".join(
+            f"[Fragmento {i + 1}]\n{texto}" for i, texto in enumerate(parciales)
+        )
+        prompt = build_analysis_prompt(
+            commits_summary, files_affected, resumen_diff, "RESÚMENES DEL DIFF POR FRAGMENTOS"
         )
-        
-        result = response.choices[0].message.content.strip()
-        print(f"✅ DEBUG: Análisis recibido de OpenAI ({len(result)} caracteres)")
-        print(f"🔍 DEBUG: Primeros 100 caracteres del resultado: {repr(result[:100])}")
+        return await _complete(client, model, prompt, max_tokens, cache, "reduce", on_token)
+    finally:
+        if propio:
+            await client.close()
+
+
+def get_unavailable_message() -> Optional[str]:
+    """Mensaje para el changelog si el backend LLM no está disponible; None si lo está."""
+    if is_openai_available():
+        return None
+    backend = load_backend_name()
+    if backend != "openai":
+        motivo = check_backend(backend, load_openai_config()[0])
+        logger.error(f"❌ ERROR: Backend LLM '{backend}' no disponible: {motivo}")
+        return f"⚠️ Backend LLM '{backend}' no disponible: {motivo}"
+    logger.error("❌ ERROR: OpenAI no configurado. Añade OPENAI_API_KEY a tu archivo .env")
+    return "⚠️ OpenAI no configurado. Añade OPENAI_API_KEY a tu archivo .env"
+
+
+async def analyze_changes_shared(
+    client: AIClient,
+    diff_content: Union[str, Iterable[str]],
+    commits_summary: str,
+    files_affected: Dict[str, List[str]],
+    workers: Optional[int] = None,
+    cache: Optional[AIResponseCache] = None,
+) -> str:
+    """Como ``analyze_changes_with_gpt`` pero dentro de un bucle asyncio ya en marcha.
+
+    Varios rangos (p. ej. de distintos repositorios) comparten así un mismo
+    cliente y sus límites de ritmo. Los errores se devuelven como texto.
+    """
+    try:
+        return await analyze_changes_async(
+            diff_content, commits_summary, files_affected, workers, cache, client=client
+        )
+    except Exception as e:
+        logger.error(f"❌ ERROR: Excepción al analizar con ChatGPT: {str(e)}")
+        return f"❌ Error al analizar con ChatGPT: {str(e)}"
+
+
+def analyze_changes_with_gpt(
+    diff_content: Union[str, Iterable[str]],
+    commits_summary: str,
+    files_affected: Dict[str, List[str]],
+    workers: Optional[int] = None,
+    cache: Optional[AIResponseCache] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+) -> str:
+    """Analiza cambios usando ChatGPT y genera resumen inteligente.
+
+    ``diff_content`` puede ser un str o un lector perezoso de bloques. El diff
+    completo se analiza en fragmentos (ver ``analyze_changes_async``). Con
+    ``cache`` las peticiones ya realizadas se reutilizan; con ``on_token`` el
+    análisis final se entrega por fragmentos según llega.
+    """
+
+    logger.debug("🤖 Iniciando análisis con ChatGPT...")
+    logger.debug(f"🔍 Número de commits: {len(commits_summary.split(chr(10)))}")
+    logger.debug(f"🔍 Archivos afectados - Creados: {len(files_affected.get('creados', []))}, Modificados: {len(files_affected.get('modificados', []))}, Eliminados: {len(files_affected.get('eliminados', []))}")
+
+    no_disponible = get_unavailable_message()
+    if no_disponible is not None:
+        return no_disponible
+
+    import asyncio
+
+    try:
+        result = asyncio.run(
+            analyze_changes_async(diff_content, commits_summary, files_affected, workers, cache, on_token)
+        )
+        if cache is not None:
+            stats = cache.stats()
+            logger.debug(f"🔍 Caché IA - aciertos: {stats['hits']}, fallos: {stats['misses']}, entradas: {stats['entries']}")
+        logger.debug(f"✅ Análisis recibido de OpenAI ({len(result)} caracteres)")
+        logger.debug(f"🔍 Primeros 100 caracteres del resultado: {repr(result[:100])}")
         return result
-        
+
     except Exception as e:
-        print(f"❌ ERROR: Excepción al analizar con ChatGPT: {str(e)}")
+        logger.error(f"❌ ERROR: Excepción al analizar con ChatGPT: {str(e)}")
         return f"❌ Error al analizar con ChatGPT: {str(e)}"
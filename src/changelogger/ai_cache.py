@@ -0,0 +1,140 @@
+"""Caché local de respuestas de la IA para Changelogger.
+
+Cada petición al modelo se identifica por un hash de su contenido completo
+(modelo, parámetros, prompt de sistema y prompt de usuario). Como el prompt
+incluye la plantilla, la lista de commits y el diff (o el fragmento de diff),
+repetir un análisis idéntico no realiza ninguna petición, y en los análisis
+map-reduce solo se reenvían los fragmentos que han cambiado.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Optional
+
+from .file_operations import get_cache_dir
+from .utils import get_env_int
+
+CACHE_FILENAME = "ai.sqlite3"
+
+SCHEMA_VERSION = 1
+
+# Vida de una respuesta en caché (segundos).
+DEFAULT_TTL = 7 * 24 * 3600
+
+# Número máximo de respuestas guardadas.
+DEFAULT_MAX_ENTRIES = 5000
+
+
+def build_request_key(model: str, max_tokens: int, temperature: float, system: str, prompt: str) -> str:
+    """Calcula la huella SHA-256 de una petición de chat."""
+    payload = json.dumps(
+        [model, max_tokens, temperature, system, prompt], ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AIResponseCache:
+    """Caché SQLite de respuestas de la IA con expiración (TTL) y límite de tamaño."""
+
+    def __init__(
+        self, path: str, ttl: int = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._init_schema()
+
+    def _init_schema(self) -> None:
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS responses")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created INTEGER NOT NULL,
+                last_used INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Retorna la respuesta guardada para ``key`` o None si no existe o ha expirado."""
+        ahora = int(time.time())
+        fila = self._conn.execute(
+            "SELECT response, created FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+
+        if fila is None or (self.ttl and ahora - fila[1] > self.ttl):
+            self.misses += 1
+            return None
+
+        self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (ahora, key))
+        self._conn.commit()
+        self.hits += 1
+        return fila[0]
+
+    def put(self, key: str, response: str) -> None:
+        """Guarda una respuesta y aplica la expiración y el límite de tamaño."""
+        ahora = int(time.time())
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, response, created, last_used) VALUES (?, ?, ?, ?)",
+            (key, response, ahora, ahora),
+        )
+        self._conn.commit()
+        self.prune()
+
+    def prune(self) -> int:
+        """Elimina respuestas expiradas y las menos usadas si se supera ``max_entries``."""
+        eliminadas = 0
+        if self.ttl:
+            limite = int(time.time()) - self.ttl
+            eliminadas += self._conn.execute(
+                "DELETE FROM responses WHERE created < ?", (limite,)
+            ).rowcount
+
+        total = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        sobrantes = total - self.max_entries
+        if sobrantes > 0:
+            eliminadas += self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)",
+                (sobrantes,),
+            ).rowcount
+
+        self._conn.commit()
+        return eliminadas
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna aciertos y fallos de esta ejecución y el número de entradas guardadas."""
+        entradas = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entradas}
+
+    def close(self) -> None:
+        """Cierra la conexión con la base de datos."""
+        self._conn.close()
+
+
+def open_ai_cache(base_path: str) -> Optional[AIResponseCache]:
+    """Abre la caché de respuestas de la IA del repositorio; retorna None si no es posible."""
+    path = os.path.join(get_cache_dir(base_path), CACHE_FILENAME)
+    try:
+        return AIResponseCache(
+            path,
+            ttl=get_env_int("CHANGELOGGER_AI_CACHE_TTL", DEFAULT_TTL),
+            max_entries=get_env_int("CHANGELOGGER_AI_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES),
+        )
+    except sqlite3.Error as e:
+        print(f"Aviso: no se ha podido abrir la caché de IA ({e}). Se continúa sin caché.")
+        return None
@@ -0,0 +1,289 @@
+"""Cliente asíncrono del backend LLM con límites de ritmo, reintentos y timeouts.
+
+``AIClient`` envuelve un backend de ``llm_backends`` y añade:
+
+- Límite de peticiones por minuto (``OPENAI_RPM``) y de tokens por minuto
+  (``OPENAI_TPM``) con cubos de tokens, compartidos por todo el proceso (los
+  rangos del modo batch se reparten el mismo cupo).
+- Concurrencia acotada (``OPENAI_MAX_CONCURRENCY`` peticiones en vuelo).
+- Reintentos con backoff exponencial y jitter en 429, 5xx, errores de red y
+  timeouts (``OPENAI_MAX_RETRIES``), respetando ``Retry-After``.
+- Timeout por intento (``OPENAI_TIMEOUT``, en segundos).
+- Streaming (``OPENAI_STREAM``): el texto se entrega por fragmentos a un
+  callback a medida que llega y se mide el tiempo hasta el primer token.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from .diff_condenser import estimate_tokens
+from .llm_backends import Completion, LLMBackendError, create_backend, load_backend_name
+from .utils import get_env_float, get_env_int
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_MAX_CONCURRENCY = 8
+
+# Espera base y máxima (segundos) del backoff exponencial.
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+
+class TokenBucket:
+    """Cubo de tokens que se rellena a ``per_minute`` unidades por minuto.
+
+    Es seguro entre hilos y no depende de un bucle asyncio concreto: ``reserve``
+    descuenta la cantidad de inmediato (el nivel puede quedar negativo) y
+    retorna cuántos segundos hay que esperar para que esté disponible, así que
+    las reservas se atienden en orden de llegada.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Reserva ``amount`` unidades y retorna los segundos de espera necesarios."""
+        # Una petición mayor que el cubo nunca cabría: se limita a su capacidad.
+        amount = min(amount, self.capacity)
+        with self._lock:
+            ahora = time.monotonic()
+            self._level = min(self.capacity, self._level + (ahora - self._updated) * self.rate)
+            self._updated = ahora
+            self._level -= amount
+            return 0.0 if self._level >= 0 else -self._level / self.rate
+
+    def refund(self, amount: float) -> None:
+        """Devuelve unidades reservadas de más (p. ej. tokens estimados no consumidos)."""
+        with self._lock:
+            self._level = min(self.capacity, self._level + amount)
+
+
+class RateLimiter:
+    """Límites de peticiones/min, tokens/min y peticiones en vuelo.
+
+    Los huecos de concurrencia se comparten entre bucles asyncio de distintos
+    hilos (rangos del modo batch): quien no encuentra hueco espera en una cola
+    FIFO con un futuro de su propio bucle, y ``release`` entrega el hueco
+    directamente al primero de la cola.
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self._free_slots = max(1, max_concurrency)
+        self._waiters: Deque[Tuple[object, object]] = deque()
+        self._lock = threading.Lock()
+
+    async def _acquire_slot(self) -> None:
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._free_slots > 0 and not self._waiters:
+                self._free_slots -= 1
+                return
+            futuro = loop.create_future()
+            entrada = (loop, futuro)
+            self._waiters.append(entrada)
+        try:
+            await futuro
+        except asyncio.CancelledError:
+            with self._lock:
+                if entrada in self._waiters:
+                    self._waiters.remove(entrada)
+                    raise
+            # El hueco ya se había entregado a esta espera: se pasa al siguiente
+            if futuro.done() and not futuro.cancelled():
+                self._release_slot()
+            raise
+
+    def _release_slot(self) -> None:
+        with self._lock:
+            while self._waiters:
+                loop, futuro = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(self._wake, futuro)
+                    return
+                except RuntimeError:
+                    continue  # bucle ya cerrado
+            self._free_slots += 1
+
+    def _wake(self, futuro) -> None:
+        # Se ejecuta en el bucle del que espera; si ya se canceló, el hueco sigue en la cola
+        if futuro.done():
+            self._release_slot()
+        else:
+            futuro.set_result(None)
+
+    async def acquire(self, tokens: int) -> float:
+        """Espera a que la petición quepa en los límites; retorna los segundos esperados."""
+        import asyncio
+
+        inicio = time.perf_counter()
+        await self._acquire_slot()
+        espera = max(
+            self.requests.reserve(1) if self.requests else 0.0,
+            self.tokens.reserve(tokens) if self.tokens else 0.0,
+        )
+        if espera > 0:
+            logger.debug(f"🔍 Límite de ritmo de la IA: esperando {espera:.2f} s")
+            await asyncio.sleep(espera)
+        return time.perf_counter() - inicio
+
+    def release(self, reserved_tokens: int, used_tokens: Optional[int] = None) -> None:
+        """Libera el hueco de concurrencia y devuelve los tokens no consumidos."""
+        self._release_slot()
+        if self.tokens is not None and used_tokens is not None and used_tokens < reserved_tokens:
+            self.tokens.refund(reserved_tokens - used_tokens)
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Limitador compartido por todo el proceso, configurado desde el entorno."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(
+                rpm=get_env_int("OPENAI_RPM", 0),
+                tpm=get_env_int("OPENAI_TPM", 0),
+                max_concurrency=get_env_int("OPENAI_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY, minimum=1),
+            )
+        return _rate_limiter
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Espera antes del reintento ``attempt`` (0, 1, ...): exponencial con jitter o ``Retry-After``."""
+    if retry_after is not None:
+        return min(BACKOFF_MAX, retry_after)
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+class AIClient:
+    """Peticiones de chat a un backend con límites, reintentos, timeout y streaming."""
+
+    def __init__(
+        self,
+        backend,
+        limiter: Optional[RateLimiter] = None,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        stream: bool = True,
+    ):
+        self.backend = backend
+        self.name = backend.name
+        self.limiter = limiter
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.stream = stream and hasattr(backend, "stream")
+
+    async def _attempt(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        on_token: Optional[Callable[[str], None]],
+        emitted: List[bool],
+    ) -> Completion:
+        """Un intento de la petición; ``emitted[0]`` indica si ya se entregó texto al callback.
+
+        Sin streaming el texto completo se entrega al callback de una vez.
+        """
+        if not self.stream:
+            completion = await self.backend.complete(model, messages, max_tokens, temperature)
+            if on_token is not None and completion.text:
+                emitted[0] = True
+                on_token(completion.text)
+            return completion
+
+        inicio = time.perf_counter()
+        ttft = None
+        async for parte in self.backend.stream(model, messages, max_tokens, temperature):
+            if isinstance(parte, Completion):
+                parte.ttft = ttft
+                return parte
+            if ttft is None:
+                ttft = time.perf_counter() - inicio
+            if on_token is not None:
+                emitted[0] = True
+                on_token(parte)
+        raise LLMBackendError("El streaming terminó sin respuesta completa", transient=True)
+
+    async def complete(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> Completion:
+        """Envía la petición respetando los límites y reintentando errores transitorios.
+
+        Con ``on_token`` el texto se entrega a medida que llega (de una vez
+        sin streaming); un fallo después del primer fragmento ya entregado no
+        se reintenta.
+        """
+        import asyncio
+
+        reservados = estimate_tokens("".join(m.get("content") or "" for m in messages)) + max_tokens
+        intento = 0
+        while True:
+            if self.limiter is not None:
+                await self.limiter.acquire(reservados)
+            usados = None
+            emitted = [False]
+            try:
+                completion = await asyncio.wait_for(
+                    self._attempt(model, messages, max_tokens, temperature, on_token, emitted),
+                    self.timeout,
+                )
+                if completion.prompt_tokens is not None and completion.completion_tokens is not None:
+                    usados = completion.prompt_tokens + completion.completion_tokens
+                completion.retries = intento
+                return completion
+            except (LLMBackendError, asyncio.TimeoutError) as e:
+                error = e if isinstance(e, LLMBackendError) else LLMBackendError(
+                    f"Timeout tras {self.timeout} s", transient=True
+                )
+                if not error.retryable or intento >= self.max_retries or emitted[0]:
+                    raise error from e
+                espera = backoff_delay(intento, error.retry_after)
+                logger.warning(
+                    f"⚠️ Petición a la IA fallida ({error}); reintento {intento + 1}/{self.max_retries} en {espera:.1f} s"
+                )
+            finally:
+                if self.limiter is not None:
+                    self.limiter.release(reservados, usados)
+            intento += 1
+            await asyncio.sleep(espera)
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+def create_ai_client(api_key: str) -> AIClient:
+    """Crea el cliente para el backend configurado con los límites del entorno."""
+    timeout = get_env_float("OPENAI_TIMEOUT", DEFAULT_TIMEOUT) or None
+    return AIClient(
+        create_backend(load_backend_name(), api_key, timeout),
+        get_rate_limiter(),
+        timeout=timeout,
+        max_retries=get_env_int("OPENAI_MAX_RETRIES", DEFAULT_MAX_RETRIES),
+        stream=os.getenv("OPENAI_STREAM", "1").strip().lower() not in ("0", "false", "no"),
+    )
@@ -0,0 +1,403 @@
+"""Almacén comprimido y direccionado por contenido para los ``.diff`` generados.
+
+Con el almacén activado (``--compress-diffs`` o ``CHANGELOGGER_DIFF_STORE=1``)
+cada ``.diff`` se divide en el parche de cada archivo (``diff --git ...``); cada
+parche se guarda una sola vez, comprimido (zstd si ``zstandard`` está instalado,
+si no gzip), en ``.changelogger/.diff/.store/objects`` con el SHA-256 de su
+contenido como nombre. Rangos que se solapan (p. ej. cada nightly desde la
+misma base) comparten así casi todos sus parches.
+
+El archivo ``.diff`` con el nombre de ``generate_filenames`` se conserva como
+una referencia de texto con la lista de parches, que ``iter_diff_file`` lee de
+forma transparente. ``--cat-diff`` reconstruye el diff completo y ``--gc``
+aplica la retención y borra los parches que ya no referencia ningún ``.diff``.
+"""
+
+from __future__ import annotations
+
+import codecs
+import gzip
+import hashlib
+import heapq
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .utils import ensure_directory_exists, get_env_int
+
+logger = logging.getLogger(__name__)
+
+STORE_DIRNAME = ".store"
+
+# Primera línea de un ``.diff`` que es una referencia al almacén.
+REF_MAGIC = "# changelogger-diff-ref 1"
+
+CODEC_EXTENSIONS = {"zstd": ".zst", "gzip": ".gz"}
+
+_READ_CHUNK = 64 * 1024
+
+
+def load_zstandard():
+    """Importa ``zstandard`` bajo demanda; retorna None si no está instalado."""
+    try:
+        import zstandard
+    except ModuleNotFoundError:
+        return None
+    return zstandard
+
+
+def is_store_enabled() -> bool:
+    """Indica si ``CHANGELOGGER_DIFF_STORE`` activa el almacén por defecto."""
+    return os.getenv("CHANGELOGGER_DIFF_STORE", "0").strip().lower() in ("1", "true", "yes", "si", "sí")
+
+
+def get_codec() -> str:
+    """Compresión de los parches nuevos (``CHANGELOGGER_DIFF_CODEC``: auto, zstd o gzip)."""
+    codec = os.getenv("CHANGELOGGER_DIFF_CODEC", "auto").strip().lower()
+    if codec == "gzip":
+        return "gzip"
+    if load_zstandard() is not None:
+        return "zstd"
+    if codec == "zstd":
+        logger.warning("⚠️ zstandard no está instalado; los diffs se comprimen con gzip")
+    return "gzip"
+
+
+def get_store_dir(diff_dir: str) -> str:
+    return os.path.join(diff_dir, STORE_DIRNAME)
+
+
+def _blob_base(store_dir: str, digest: str) -> str:
+    return os.path.join(store_dir, "objects", digest[:2], digest[2:])
+
+
+def find_blob(store_dir: str, digest: str) -> Optional[str]:
+    """Ruta del parche comprimido con ese hash (con cualquier compresión) o None."""
+    base = _blob_base(store_dir, digest)
+    for extension in CODEC_EXTENSIONS.values():
+        if os.path.isfile(base + extension):
+            return base + extension
+    return None
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return load_zstandard().ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _open_blob(path: str):
+    """Abre un parche comprimido para lectura binaria en streaming."""
+    if path.endswith(CODEC_EXTENSIONS["zstd"]):
+        zstandard = load_zstandard()
+        if zstandard is None:
+            raise RuntimeError(f"{path} está comprimido con zstd y zstandard no está instalado")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return gzip.open(path, "rb")
+
+
+def _tmp_path(path: str) -> str:
+    """Temporal junto a ``path``, distinto por proceso e hilo (workers del modo batch)."""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def put_blob(store_dir: str, data: bytes, codec: str) -> Tuple[str, bool]:
+    """Guarda un parche si no existe; retorna (hash, si era nuevo)."""
+    digest = hashlib.sha256(data).hexdigest()
+    if find_blob(store_dir, digest) is not None:
+        return digest, False
+    path = _blob_base(store_dir, digest) + CODEC_EXTENSIONS[codec]
+    ensure_directory_exists(os.path.dirname(path))
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "wb") as f:
+        f.write(_compress(data, codec))
+    os.replace(tmp_path, path)
+    return digest, True
+
+
+def _path_from_header(linea: str) -> str:
+    """Ruta destino de una línea ``diff --git a/X b/Y``.
+
+    Git entrecomilla (con escapes de C) las rutas con caracteres especiales:
+    ``diff --git "a/caf\\303\\251" "b/caf\\303\\251"``.
+    """
+    resto = linea[len("diff --git "):].rstrip("\n")
+    if resto.endswith('"'):
+        corte = resto.rfind(' "b/')
+        if corte >= 0:
+            crudo = codecs.escape_decode(resto[corte + 4:-1].encode("utf-8"))[0]
+            return crudo.decode("utf-8", errors="replace")
+    corte = resto.rfind(" b/")
+    return resto[corte + 3:] if corte >= 0 else resto
+
+
+def iter_file_patches(chunks: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """Divide el diff en (ruta, parche) por cada ``diff --git``.
+
+    El texto anterior al primer archivo (normalmente vacío) se genera con ruta "".
+    """
+    path = ""
+    partes: List[str] = []
+    pendiente = ""
+    for chunk in chunks:
+        lineas = (pendiente + chunk).split("\n")
+        pendiente = lineas.pop()
+        for linea in lineas:
+            if linea.startswith("diff --git "):
+                if partes:
+                    yield path, "".join(partes)
+                path, partes = _path_from_header(linea), []
+            partes.append(linea + "\n")
+    if pendiente:
+        if pendiente.startswith("diff --git "):
+            if partes:
+                yield path, "".join(partes)
+            path, partes = _path_from_header(pendiente), []
+        partes.append(pendiente)
+    if partes:
+        yield path, "".join(partes)
+
+
+def _patch_order(entrada: Tuple[str, object]) -> bytes:
+    """Clave con la que Git ordena los archivos de un diff: la ruta destino en bytes."""
+    return entrada[0].encode("utf-8")
+
+
+def merge_file_patches(
+    previos: Iterable[Tuple[str, str]], nuevos: Iterable[Tuple[str, str]], reemplazadas: Set[str]
+) -> Iterator[str]:
+    """Fusiona en streaming los parches de un diff anterior con los de un tramo nuevo.
+
+    Los parches de ``previos`` cuya ruta está en ``reemplazadas`` se descartan;
+    el resto se intercala con ``nuevos`` en el orden de ruta de ``git diff``.
+    Ambas entradas deben venir ya en ese orden (como las genera Git).
+    """
+    conservados = ((path, parche) for path, parche in previos if path and path not in reemplazadas)
+    for _, parche in heapq.merge(conservados, nuevos, key=_patch_order):
+        yield parche
+
+
+def _write_reference(
+    diff_path: str, entradas: Iterable[Tuple[str, str, int]], contadores: Dict[str, int]
+) -> None:
+    """Escribe (de forma atómica) una referencia con las entradas (ruta, hash, bytes)."""
+    tmp_path = _tmp_path(diff_path)
+    with open(tmp_path, "w", encoding="utf-8", newline="\n") as ref:
+        ref.write(REF_MAGIC + "\n")
+        for path, digest, size in entradas:
+            ref.write(f"{digest}\t{size}\t{path}\n")
+            contadores["patches"] += 1
+    os.replace(tmp_path, diff_path)
+
+
+def _store_patches(
+    store_dir: str, chunks: Iterable[str], codec: str, contadores: Dict[str, int]
+) -> Iterator[Tuple[str, str, int]]:
+    """Guarda en el almacén cada parche de ``chunks``; genera (ruta, hash, bytes)."""
+    for path, parche in iter_file_patches(chunks):
+        data = parche.encode("utf-8")
+        digest, nuevo = put_blob(store_dir, data, codec)
+        contadores["new"] += int(nuevo)
+        contadores["bytes"] += len(data)
+        yield path, digest, len(data)
+
+
+def write_diff_reference(diff_path: str, chunks: Iterable[str], codec: Optional[str] = None) -> Dict[str, int]:
+    """Guarda el diff en el almacén y escribe en ``diff_path`` su referencia.
+
+    Retorna contadores: parches totales, nuevos y bytes sin comprimir.
+    """
+    codec = codec or get_codec()
+    store_dir = get_store_dir(os.path.dirname(diff_path))
+    contadores = {"patches": 0, "new": 0, "bytes": 0}
+    _write_reference(diff_path, _store_patches(store_dir, chunks, codec, contadores), contadores)
+    logger.debug(
+        f"🔍 Diff en el almacén ({codec}): {contadores['patches']} parches, "
+        f"{contadores['new']} nuevos, {contadores['bytes']} bytes sin comprimir"
+    )
+    return contadores
+
+
+def merge_diff_reference(
+    diff_path: str,
+    previous_path: str,
+    chunks: Iterable[str],
+    reemplazadas: Set[str],
+    codec: Optional[str] = None,
+) -> Dict[str, int]:
+    """Escribe en ``diff_path`` la referencia anterior actualizada con un tramo nuevo.
+
+    Las entradas de ``previous_path`` se reutilizan sin leer sus parches, salvo
+    las de ``reemplazadas``, que se sustituyen por los parches de ``chunks``
+    (ver ``merge_file_patches``). Retorna los mismos contadores que
+    ``write_diff_reference``; ``bytes`` cuenta solo los parches nuevos.
+    """
+    codec = codec or get_codec()
+    store_dir = get_store_dir(os.path.dirname(diff_path))
+    contadores = {"patches": 0, "new": 0, "bytes": 0}
+    previas = (
+        (path, digest, size)
+        for digest, size, path in read_reference(previous_path)
+        if path and path not in reemplazadas
+    )
+    nuevas = _store_patches(store_dir, chunks, codec, contadores)
+    _write_reference(diff_path, heapq.merge(previas, nuevas, key=_patch_order), contadores)
+    logger.debug(
+        f"🔍 Diff incremental en el almacén ({codec}): {contadores['patches']} parches, "
+        f"{contadores['new']} nuevos, {contadores['bytes']} bytes sin comprimir"
+    )
+    return contadores
+
+
+def is_diff_reference(diff_path: str) -> bool:
+    """Indica si un ``.diff`` es una referencia al almacén y no el diff en texto."""
+    try:
+        with open(diff_path, "r", encoding="utf-8") as f:
+            return f.read(len(REF_MAGIC) + 1) == REF_MAGIC + "\n"
+    except (OSError, UnicodeDecodeError):
+        return False
+
+
+def read_reference(diff_path: str) -> List[Tuple[str, int, str]]:
+    """Lista (hash, bytes, ruta) de los parches de una referencia."""
+    entradas: List[Tuple[str, int, str]] = []
+    with open(diff_path, "r", encoding="utf-8") as f:
+        if f.readline().rstrip("\n") != REF_MAGIC:
+            raise ValueError(f"{diff_path} no es una referencia del almacén de diffs")
+        for linea in f:
+            linea = linea.rstrip("\n")
+            if linea:
+                digest, size, path = linea.split("\t", 2)
+                entradas.append((digest, int(size), path))
+    return entradas
+
+
+def iter_reference_chunks(diff_path: str, chunk_size: int = _READ_CHUNK) -> Iterator[str]:
+    """Reconstruye en streaming el texto del diff de una referencia."""
+    store_dir = get_store_dir(os.path.dirname(diff_path))
+    for digest, _, path in read_reference(diff_path):
+        blob = find_blob(store_dir, digest)
+        if blob is None:
+            raise FileNotFoundError(f"falta el parche {digest[:12]} ({path}) en {store_dir}")
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        with _open_blob(blob) as f:
+            while True:
+                bloque = f.read(chunk_size)
+                if not bloque:
+                    break
+                texto = decoder.decode(bloque)
+                if texto:
+                    yield texto
+        resto = decoder.decode(b"", final=True)
+        if resto:
+            yield resto
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def gc_diff_store(
+    diff_dir: str,
+    max_bytes: Optional[int] = None,
+    keep_days: Optional[int] = None,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """Aplica la retención a los ``.diff`` y borra los parches sin referencias.
+
+    Se borran los ``.diff`` (referencias o diffs en texto) con más de
+    ``keep_days`` días y después, del más antiguo al más reciente, los
+    necesarios para que ``.diff`` + almacén ocupen como mucho ``max_bytes``.
+    Un parche se borra cuando ya no lo referencia ningún ``.diff``.
+    """
+    store_dir = get_store_dir(diff_dir)
+    diffs = []
+    if os.path.isdir(diff_dir):
+        for nombre in os.listdir(diff_dir):
+            path = os.path.join(diff_dir, nombre)
+            if nombre.endswith(".diff") and os.path.isfile(path):
+                diffs.append((os.path.getmtime(path), path))
+    diffs.sort()
+
+    # Parches existentes y cuántos .diff los referencian
+    blobs: Dict[str, Tuple[str, int]] = {}
+    objetos = os.path.join(store_dir, "objects")
+    if os.path.isdir(objetos):
+        for raiz, _, nombres in os.walk(objetos):
+            for nombre in nombres:
+                path = os.path.join(raiz, nombre)
+                if nombre.endswith(".tmp"):
+                    continue
+                digest = os.path.basename(raiz) + nombre.split(".", 1)[0]
+                blobs[digest] = (path, _file_size(path))
+
+    referencias: Dict[str, List[str]] = {}
+    usos: Dict[str, int] = {}
+    for _, path in diffs:
+        if is_diff_reference(path):
+            hashes = sorted({digest for digest, _, _ in read_reference(path)})
+            referencias[path] = hashes
+            for digest in hashes:
+                usos[digest] = usos.get(digest, 0) + 1
+
+    total = sum(_file_size(p) for _, p in diffs) + sum(size for _, size in blobs.values())
+    resultado = {"diffs_removed": 0, "blobs_removed": 0, "bytes_freed": 0, "bytes_before": total}
+
+    def borrar(path: str) -> int:
+        liberado = _file_size(path)
+        if not dry_run:
+            os.remove(path)
+        return liberado
+
+    def borrar_diff(path: str) -> int:
+        liberado = borrar(path)
+        resultado["diffs_removed"] += 1
+        for digest in referencias.pop(path, []):
+            usos[digest] -= 1
+            if usos[digest] == 0 and digest in blobs:
+                liberado += borrar(blobs.pop(digest)[0])
+                resultado["blobs_removed"] += 1
+        return liberado
+
+    limite_edad = time.time() - keep_days * 86400 if keep_days else None
+    restantes = []
+    for mtime, path in diffs:
+        if limite_edad is not None and mtime < limite_edad:
+            liberado = borrar_diff(path)
+            total -= liberado
+            resultado["bytes_freed"] += liberado
+        else:
+            restantes.append(path)
+
+    if max_bytes is not None:
+        for path in restantes:
+            if total <= max_bytes:
+                break
+            liberado = borrar_diff(path)
+            total -= liberado
+            resultado["bytes_freed"] += liberado
+
+    # Parches huérfanos (p. ej. de ejecuciones interrumpidas)
+    for digest in [d for d in blobs if not usos.get(d)]:
+        liberado = borrar(blobs.pop(digest)[0])
+        resultado["blobs_removed"] += 1
+        resultado["bytes_freed"] += liberado
+        total -= liberado
+
+    resultado["bytes_after"] = total
+    return resultado
+
+
+def get_gc_limits() -> Tuple[Optional[int], Optional[int]]:
+    """Límites de retención del entorno: (``CHANGELOGGER_DIFF_MAX_MB`` en bytes, ``CHANGELOGGER_DIFF_KEEP_DAYS``).
+
+    Un valor 0 (por defecto) desactiva ese límite.
+    """
+    max_mb = get_env_int("CHANGELOGGER_DIFF_MAX_MB", 0)
+    keep_days = get_env_int("CHANGELOGGER_DIFF_KEEP_DAYS", 0)
+    return (max_mb * 1024 * 1024 if max_mb else None), (keep_days or None)
@@ -0,0 +1,156 @@
+"""Modo batch (no interactivo) para generar changelogs de varios rangos en paralelo."""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import replace
+from functools import partial
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from .commit_metadata import close_metadata_reader
+from .file_operations import get_ndjson_path, get_repository_working_path
+from .git_operations import get_commit_record
+from .pipeline import RunOptions, generate_changelog
+from .profiling import serial_phases_required
+from .range_index import ensure_commit_graph, needs_range_index, open_range_index
+from .utils import ensure_gitpython
+
+# Número de rangos procesados a la vez por defecto.
+DEFAULT_JOBS = 4
+
+RangeSpec = Tuple[str, str]
+
+
+def parse_range_spec(spec: str) -> RangeSpec:
+    """Convierte ``ORIGEN..DESTINO`` (o solo ``ORIGEN``, hasta HEAD) en una tupla de refs."""
+    if ".." in spec:
+        origen, destino = spec.split("..", 1)
+        return origen.strip(), destino.strip() or "HEAD"
+    return spec.strip(), "HEAD"
+
+
+def list_tags_by_date(repo) -> List[str]:
+    """Lista las etiquetas del repositorio ordenadas de la más antigua a la más reciente."""
+    salida = repo.git.for_each_ref(
+        "--sort=creatordate", "--format=%(refname:short)", "refs/tags"
+    )
+    return [linea.strip() for linea in salida.splitlines() if linea.strip()]
+
+
+def consecutive_tag_ranges(repo, last_tags: int) -> List[RangeSpec]:
+    """Genera los rangos entre cada par de etiquetas consecutivas de las últimas ``last_tags``."""
+    tags = list_tags_by_date(repo)[-last_tags:] if last_tags > 0 else []
+    return list(zip(tags, tags[1:]))
+
+
+def resolve_index_origins(repo, rangos: Sequence[RangeSpec], use_cache: bool = True) -> List[RangeSpec]:
+    """Resuelve los orígenes ``tag:PATRÓN`` y ``since:FECHA`` con el índice de rangos.
+
+    Si un origen no se puede resolver se avisa y se deja tal cual, de modo que
+    el rango falle después como cualquier referencia inexistente.
+    """
+    if not any(needs_range_index(origen) for origen, _ in rangos):
+        return list(rangos)
+    indice = open_range_index(repo, use_cache)
+    try:
+        resueltos: List[RangeSpec] = []
+        for origen, destino in rangos:
+            if needs_range_index(origen):
+                try:
+                    origen = indice.resolve_origin(origen, repo.rev_parse(destino).hexsha)
+                except Exception as e:
+                    print(f"⚠️  {origen}..{destino}: {e}")
+            resueltos.append((origen, destino))
+        return resueltos
+    finally:
+        indice.close()
+
+
+def resolve_ranges(
+    repo, range_specs: Sequence[str], last_tags: Optional[int] = None, use_cache: bool = True
+) -> List[RangeSpec]:
+    """Combina los rangos explícitos y los pares de etiquetas consecutivas, sin duplicados.
+
+    Los orígenes ``tag:PATRÓN`` (etiqueta más reciente que es ancestro del
+    destino) y ``since:FECHA`` (último commit anterior a la fecha) se resuelven
+    con el índice de ``range_index``. Antes se asegura el commit-graph de Git,
+    que acelera el recorrido de todos los rangos.
+    """
+    if range_specs or last_tags:
+        ensure_commit_graph(repo)
+    rangos = resolve_index_origins(repo, [parse_range_spec(spec) for spec in range_specs], use_cache)
+    if last_tags:
+        rangos.extend(consecutive_tag_ranges(repo, last_tags))
+
+    vistos = set()
+    unicos: List[RangeSpec] = []
+    for rango in rangos:
+        if rango not in vistos:
+            vistos.add(rango)
+            unicos.append(rango)
+    return unicos
+
+
+def process_range(repo_path: str, origin_ref: str, target_ref: str, options: RunOptions) -> Tuple[str, str]:
+    """Genera el changelog de un rango abriendo un ``git.Repo`` propio (seguro entre hilos)."""
+    git = ensure_gitpython()
+    repo = git.Repo(repo_path)
+    try:
+        commit_origen = get_commit_record(repo, origin_ref)
+        commit_destino = get_commit_record(repo, target_ref)
+        if commit_origen is None or commit_destino is None:
+            raise ValueError("referencia no encontrada")
+        return generate_changelog(repo, commit_origen, commit_destino, options)
+    finally:
+        close_metadata_reader(repo)
+        repo.close()
+
+
+def run_batch(
+    repo,
+    ranges: Sequence[RangeSpec],
+    options: Optional[RunOptions] = None,
+    jobs: int = DEFAULT_JOBS,
+) -> int:
+    """Procesa los rangos con un pool de workers y retorna el número de rangos fallidos.
+
+    Cada rango pasa por el mismo pipeline que el modo interactivo y produce su
+    par ``.diff``/``.md`` con ``create_output_files``. El trabajo de Git, las
+    llamadas a la IA y la escritura de archivos de distintos rangos se solapan.
+    """
+    options = replace(options or RunOptions(), md_with_origin=True)
+    repo_path = get_repository_working_path(repo)
+
+    def informar(origen: str, destino: str, resultado: Callable[[], Tuple[Optional[str], str]]) -> bool:
+        try:
+            diff_path, md_path = resultado()
+        except Exception as e:
+            print(f"❌ ERROR: {origen}..{destino}: {e}")
+            return False
+        print(f"✅ {origen}..{destino}")
+        if diff_path:
+            print(f"- Diff: {diff_path}")
+        print(f"- Markdown: {md_path}")
+        if options.ndjson:
+            print(f"- NDJSON: {get_ndjson_path(md_path)}")
+        return True
+
+    if serial_phases_required():
+        # Perfilado con cProfile o tracemalloc: un rango tras otro en este hilo
+        return sum(
+            not informar(origen, destino, partial(process_range, repo_path, origen, destino, options))
+            for origen, destino in ranges
+        )
+
+    fallidos = 0
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futuros = {
+            pool.submit(process_range, repo_path, origen, destino, options): (origen, destino)
+            for origen, destino in ranges
+        }
+        for futuro in as_completed(futuros):
+            origen, destino = futuros[futuro]
+            if not informar(origen, destino, futuro.result):
+                fallidos += 1
+
+    return fallidos
@@ -0,0 +1,188 @@
+"""Caché persistente de datos por commit para Changelogger.
+
+Los commits son inmutables: los archivos afectados (name-status), el autor, la
+fecha y el resumen de un SHA no cambian nunca. Se guardan en una base SQLite
+dentro de ``.changelogger/.cache`` para que ejecuciones posteriores sobre rangos
+solapados solo analicen los commits nuevos.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .commit_metadata import CommitAuthor, CommitRecord
+from .file_operations import get_cache_dir
+from .git_operations import analyze_range_changes
+from .utils import get_env_int
+
+CACHE_FILENAME = "commits.sqlite3"
+
+# Versión del esquema; si cambia se descarta el contenido anterior.
+SCHEMA_VERSION = 1
+
+# Número máximo de commits guardados antes de expulsar los menos usados.
+DEFAULT_MAX_ENTRIES = 200_000
+
+CommitChanges = List[Tuple[str, str]]
+
+
+def get_cache_max_entries() -> int:
+    """Lee el límite de entradas de la variable CHANGELOGGER_CACHE_MAX_ENTRIES."""
+    return get_env_int("CHANGELOGGER_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+
+
+class CommitCache:
+    """Caché direccionada por SHA con los datos que changelogger calcula por commit."""
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._init_schema()
+
+    def _init_schema(self) -> None:
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS commits")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS commits (
+                hexsha TEXT PRIMARY KEY,
+                author_name TEXT NOT NULL,
+                author_email TEXT NOT NULL,
+                committed_date INTEGER NOT NULL,
+                summary TEXT NOT NULL,
+                files TEXT NOT NULL,
+                last_used INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS commits_last_used ON commits (last_used)"
+        )
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.commit()
+
+    def get_many(self, hexshas: Sequence[str]) -> Dict[str, Tuple[CommitRecord, CommitChanges]]:
+        """Retorna los commits presentes en caché como ``{hexsha: (registro, cambios)}``."""
+        encontrados: Dict[str, Tuple[CommitRecord, CommitChanges]] = {}
+        ahora = int(time.time())
+
+        # SQLite limita el número de parámetros por consulta.
+        for inicio in range(0, len(hexshas), 500):
+            bloque = list(hexshas[inicio:inicio + 500])
+            marcas = ",".join("?" * len(bloque))
+            filas = self._conn.execute(
+                "SELECT hexsha, author_name, author_email, committed_date, summary, files "
+                f"FROM commits WHERE hexsha IN ({marcas})",
+                bloque,
+            ).fetchall()
+            for hexsha, nombre, email, fecha, summary, files in filas:
+                record = CommitRecord(hexsha, CommitAuthor(nombre, email), fecha, summary)
+                cambios = [(tipo, path) for tipo, path in json.loads(files)]
+                encontrados[hexsha] = (record, cambios)
+            if filas:
+                self._conn.executemany(
+                    "UPDATE commits SET last_used = ? WHERE hexsha = ?",
+                    [(ahora, fila[0]) for fila in filas],
+                )
+
+        self._conn.commit()
+        return encontrados
+
+    def put_many(self, entries: Iterable[Tuple[CommitRecord, CommitChanges]]) -> None:
+        """Guarda registros y cambios de commits, y aplica el límite de tamaño."""
+        ahora = int(time.time())
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO commits "
+            "(hexsha, author_name, author_email, committed_date, summary, files, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    record.hexsha,
+                    record.author.name,
+                    record.author.email,
+                    record.committed_date,
+                    record.summary,
+                    json.dumps(cambios, ensure_ascii=False),
+                    ahora,
+                )
+                for record, cambios in entries
+            ],
+        )
+        self._conn.commit()
+        self.prune()
+
+    def prune(self) -> int:
+        """Expulsa los commits usados hace más tiempo si se supera ``max_entries``."""
+        total = self._conn.execute("SELECT COUNT(*) FROM commits").fetchone()[0]
+        sobrantes = total - self.max_entries
+        if sobrantes <= 0:
+            return 0
+        self._conn.execute(
+            "DELETE FROM commits WHERE hexsha IN "
+            "(SELECT hexsha FROM commits ORDER BY last_used ASC LIMIT ?)",
+            (sobrantes,),
+        )
+        self._conn.commit()
+        return sobrantes
+
+    def close(self) -> None:
+        """Cierra la conexión con la base de datos."""
+        self._conn.close()
+
+
+def open_commit_cache(base_path: str) -> Optional[CommitCache]:
+    """Abre la caché de commits del repositorio; retorna None si no es posible."""
+    path = os.path.join(get_cache_dir(base_path), CACHE_FILENAME)
+    try:
+        return CommitCache(path, max_entries=get_cache_max_entries())
+    except sqlite3.Error as e:
+        print(f"Aviso: no se ha podido abrir la caché de commits ({e}). Se continúa sin caché.")
+        return None
+
+
+def load_commit_changes(
+    repo,
+    commits: Sequence,
+    cache: Optional[CommitCache] = None,
+    pathspecs: Sequence[str] = (),
+    known: Optional[Dict[str, CommitChanges]] = None,
+) -> Tuple[List[CommitRecord], Dict[str, CommitChanges]]:
+    """Obtiene metadatos y archivos afectados de los commits, usando la caché si existe.
+
+    Retorna los commits como ``CommitRecord`` (mismo orden) y el mapeo
+    ``{hexsha: [(tipo, path)]}``. Solo los commits ausentes de la caché y de
+    ``known`` (archivos ya calculados con los mismos ``pathspecs``, p. ej. por
+    el precálculo) se analizan con Git. Con ``pathspecs`` solo se listan los
+    archivos de esas rutas y la caché (que guarda commits completos) no se usa.
+    """
+    if pathspecs:
+        cache = None
+    known = known or {}
+    hexshas = [c.hexsha for c in commits]
+    cacheados = cache.get_many(hexshas) if cache is not None else {}
+
+    pendientes = [c for c in commits if c.hexsha not in cacheados]
+    nuevos_cambios = analyze_range_changes(
+        repo, [c for c in pendientes if c.hexsha not in known], pathspecs
+    )
+    nuevos_cambios.update((c.hexsha, known[c.hexsha]) for c in pendientes if c.hexsha in known)
+    nuevos = [
+        (CommitRecord.from_commit(c), nuevos_cambios.get(c.hexsha, []))
+        for c in pendientes
+    ]
+    if cache is not None and nuevos:
+        cache.put_many(nuevos)
+
+    resueltos = dict(cacheados)
+    for record, cambios in nuevos:
+        resueltos[record.hexsha] = (record, cambios)
+
+    records = [resueltos[h][0] for h in hexshas]
+    archivos_por_commit = {h: resueltos[h][1] for h in hexshas}
+    return records, archivos_por_commit
@@ -0,0 +1,431 @@
+"""Historial de commits paginado y con búsqueda para el selector interactivo.
+
+``CommitIndex`` recorre el historial con un único ``git log`` en un hilo en
+segundo plano y guarda cada commit como una sola cadena compacta (sha, fecha,
+autor, etiquetas y resumen), así que un historial de cientos de miles de
+commits ocupa unas decenas de MB. Las primeras páginas están disponibles en
+cuanto Git las emite, sin esperar al resto del historial.
+
+``CommitSearch`` filtra el índice por fragmentos en cualquier orden (prefijo
+de SHA, mensaje, autor, etiqueta o fecha ``AAAA-MM-DD``) recorriéndolo por
+tramos acotados, de modo que cada pulsación cuesta lo mismo con 500 que con
+500 000 commits y los resultados aparecen a medida que avanza el recorrido.
+Tras las coincidencias exactas se listan las aproximadas: fragmentos de 4 o
+más letras con una errata o con letras omitidas dentro de una palabra
+(``refactr``, ``cnfg``).
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import re
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional, Pattern, Sequence, Tuple
+
+from .commit_metadata import CommitAuthor, CommitRecord
+from .git_operations import _pathspec_args
+
+if TYPE_CHECKING:  # pragma: no cover
+    import git
+
+logger = logging.getLogger(__name__)
+
+_SEP = "\x1f"
+# Campos por commit: sha, fecha Unix, fecha local legible, autor, email y resumen.
+_INDEX_FORMAT = _SEP.join(["%H", "%ct", "%cd", "%an", "%ae", "%s"])
+_DATE_FORMAT = "--date=format-local:%Y-%m-%d %H:%M"
+
+# Entradas que ``CommitSearch.advance`` revisa como máximo por llamada.
+SEARCH_BUDGET = 50000
+
+# Longitud mínima de un fragmento hexadecimal para tratarlo como prefijo de SHA.
+_MIN_SHA_PREFIX = 4
+_HEX = frozenset("0123456789abcdef")
+
+# Longitud mínima de un fragmento para buscarlo también de forma aproximada.
+_MIN_FUZZY = 4
+# Coste relativo (frente a la búsqueda exacta) de revisar una entrada con patrones aproximados.
+_FUZZY_COST = 10
+
+
+def load_tag_map(repo: git.Repo) -> Dict[str, List[str]]:
+    """Etiquetas por SHA de commit (las anotadas se resuelven a su commit)."""
+    mapa: Dict[str, List[str]] = {}
+    salida = repo.git.for_each_ref(
+        "--format=%(objectname)%09%(*objectname)%09%(refname:short)", "refs/tags"
+    )
+    for linea in salida.splitlines():
+        objeto, destino, nombre = linea.split("\t", 2)
+        mapa.setdefault(destino or objeto, []).append(nombre)
+    return mapa
+
+
+class CommitIndex:
+    """Historial de ``rev`` (con ``pathspecs`` opcionales) cargado en segundo plano.
+
+    Las entradas se añaden en el orden de ``git log`` (del más reciente al más
+    antiguo); ``len()`` crece mientras ``done`` es ``False``.
+    """
+
+    def __init__(self, repo: git.Repo, rev: str = "HEAD", pathspecs: Sequence[str] = ()) -> None:
+        self.repo = repo
+        self.rev = rev
+        self.pathspecs = tuple(pathspecs)
+        self.done = False
+        self.error: Optional[str] = None
+        self._entries: List[str] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._proc = None
+        self._closed = False
+
+    def start(self) -> "CommitIndex":
+        """Lanza el hilo de carga (idempotente)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._load, name="changelogger-commit-index", daemon=True)
+            self._thread.start()
+        return self
+
+    def _load(self) -> None:
+        try:
+            etiquetas = load_tag_map(self.repo)
+            self._proc = self.repo.git.log(
+                "-z", f"--format={_INDEX_FORMAT}", _DATE_FORMAT, self.rev,
+                *_pathspec_args(self.pathspecs), as_process=True,
+            )
+            stdout = self._proc.proc.stdout
+            pendiente = b""
+            while not self._closed:
+                bloque = stdout.read(65536)
+                if not bloque:
+                    break
+                partes = (pendiente + bloque).split(b"\0")
+                pendiente = partes.pop()
+                self._append([self._entry(p, etiquetas) for p in partes if p])
+            if pendiente and not self._closed:
+                self._append([self._entry(pendiente, etiquetas)])
+            if not self._closed:
+                proc, self._proc = self._proc, None
+                proc.wait()
+        except Exception as e:
+            if not self._closed:
+                self.error = str(e) or type(e).__name__
+                logger.debug("Índice de commits interrumpido: %s", self.error)
+        finally:
+            self._finish_process()
+            with self._cond:
+                self.done = True
+                self._cond.notify_all()
+            logger.debug("Índice de commits: %d entradas", len(self._entries))
+
+    @staticmethod
+    def _entry(raw: bytes, etiquetas: Dict[str, List[str]]) -> str:
+        """Entrada compacta: ``sha␟ct␟fecha␟autor␟email␟etiquetas␟resumen``."""
+        linea = raw.decode("utf-8", errors="replace").lstrip("\n")
+        hexsha, resto = linea.split(_SEP, 1)
+        ct, fecha, autor, email, resumen = resto.split(_SEP, 4)
+        tags = " ".join(etiquetas.get(hexsha, ()))
+        return _SEP.join((hexsha, ct, fecha, autor, email, tags, resumen))
+
+    def _append(self, entradas: List[str]) -> None:
+        with self._cond:
+            self._entries.extend(entradas)
+            self._cond.notify_all()
+
+    def _finish_process(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.proc.kill()
+            proc.proc.stdout.close()
+            proc.proc.wait()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        """Detiene la carga si sigue en curso."""
+        self._closed = True
+        proc = self._proc
+        if proc is not None:
+            try:
+                proc.proc.kill()
+            except Exception:
+                pass
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def wait_for(self, count: int, timeout: Optional[float] = None) -> int:
+        """Espera a que haya ``count`` entradas (o a que termine la carga); retorna las cargadas."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.done or len(self._entries) >= count, timeout)
+            return len(self._entries)
+
+    def entry(self, position: int) -> str:
+        return self._entries[position]
+
+    def fields(self, position: int) -> Tuple[str, str, str, str, str, str, str]:
+        """``(sha, ct, fecha, autor, email, etiquetas, resumen)`` de una entrada."""
+        return tuple(self._entries[position].split(_SEP, 6))  # type: ignore[return-value]
+
+    def get(self, position: int) -> CommitRecord:
+        """``CommitRecord`` de una entrada (el resumen es el asunto de ``%s``)."""
+        hexsha, ct, _, autor, email, _, resumen = self.fields(position)
+        return CommitRecord(hexsha, CommitAuthor(autor, email), int(ct), resumen)
+
+    def format_entry(self, position: int) -> str:
+        """Línea para el selector: ``sha | fecha | autor | (etiquetas) resumen``."""
+        hexsha, _, fecha, autor, _, tags, resumen = self.fields(position)
+        etiquetas = f"({tags}) " if tags else ""
+        return f"{hexsha[:7]} | {fecha} | {autor} | {etiquetas}{resumen}"
+
+
+def parse_query(query: str) -> Tuple[str, ...]:
+    """Fragmentos de búsqueda en minúsculas (separados por espacios)."""
+    return tuple(query.lower().split())
+
+
+def entry_matches(entry: str, tokens: Sequence[str]) -> bool:
+    """Indica si la entrada contiene todos los fragmentos.
+
+    Un fragmento hexadecimal de al menos 4 caracteres también coincide como
+    prefijo del SHA; el resto se busca en fecha, autor, email, etiquetas y
+    resumen (nunca dentro del SHA ni de la fecha Unix).
+    """
+    bajo = entry.lower()
+    inicio = bajo.find(_SEP, bajo.find(_SEP) + 1)
+    for token in tokens:
+        if len(token) >= _MIN_SHA_PREFIX and bajo.startswith(token) and _HEX.issuperset(token):
+            continue
+        if bajo.find(token, inicio) < 0:
+            return False
+    return True
+
+
+@functools.lru_cache(maxsize=256)
+def fuzzy_pattern(token: str) -> Optional[Pattern[str]]:
+    """Patrón de las coincidencias aproximadas de un fragmento.
+
+    None si es corto o no es solo letras (números, versiones o SHA se buscan
+    exactos: ``module61`` no debe encontrar ``module62``). Coincide con el principio de una palabra que difiere del fragmento en una
+    errata (un carácter cambiado, sobrante o dos contiguos intercambiados) o
+    que contiene sus letras en orden, empezando por la misma (``cnfg`` ->
+    ``config``). Las letras omitidas en la palabra ya las cubre lo segundo.
+    """
+    if len(token) < _MIN_FUZZY or not token.isalpha():
+        return None
+    esc = re.escape
+    alternativas = [esc(token[0]) + "".join(r"\w*?" + esc(c) for c in token[1:])]
+    for i in range(len(token)):
+        alternativas.append(esc(token[:i]) + r"\w" + esc(token[i + 1:]))
+        alternativas.append(esc(token[:i]) + esc(token[i + 1:]))
+        if i + 1 < len(token):
+            alternativas.append(esc(token[:i] + token[i + 1] + token[i] + token[i + 2:]))
+    return re.compile(r"(?<!\w)(?:" + "|".join(alternativas) + ")")
+
+
+def entry_matches_fuzzy(entry: str, tokens: Sequence[str]) -> bool:
+    """Como ``entry_matches``, pero los fragmentos largos también valen aproximados.
+
+    Las entradas que cumplen ``entry_matches`` también lo cumplen.
+    """
+    bajo = entry.lower()
+    inicio = bajo.find(_SEP, bajo.find(_SEP) + 1)
+    for token in tokens:
+        if len(token) >= _MIN_SHA_PREFIX and bajo.startswith(token) and _HEX.issuperset(token):
+            continue
+        if bajo.find(token, inicio) >= 0:
+            continue
+        patron = fuzzy_pattern(token)
+        if patron is None or patron.search(bajo, inicio) is None:
+            return False
+    return True
+
+
+def _token_kind(token: str) -> Tuple[bool, bool]:
+    """Qué comparaciones admite un fragmento: prefijo de SHA y aproximada."""
+    return (
+        len(token) >= _MIN_SHA_PREFIX and _HEX.issuperset(token),
+        fuzzy_pattern(token) is not None,
+    )
+
+
+def _narrows(anterior: Tuple[str, ...], nueva: Tuple[str, ...]) -> bool:
+    """Indica si la consulta ``nueva`` (que extiende a ``anterior``) solo puede descartar entradas.
+
+    No ocurre cuando el último fragmento, al crecer, pasa a admitir una
+    comparación más (p. ej. ``abc`` -> ``abcd`` ya vale como prefijo de SHA).
+    """
+    if not anterior:
+        return False
+    ultimo = len(anterior) - 1
+    return all(
+        not (b and not a)
+        for a, b in zip(_token_kind(anterior[ultimo]), _token_kind(nueva[ultimo]))
+    )
+
+
+class _SearchPass:
+    """Recorrido de la búsqueda: candidatos ya conocidos y luego el índice desde ``tail``."""
+
+    __slots__ = ("candidates", "pos", "tail")
+
+    def __init__(self, candidates: Optional[List[int]] = None, tail: int = 0) -> None:
+        self.candidates = candidates or []
+        self.pos = 0
+        self.tail = tail
+
+    def pending(self) -> List[int]:
+        return self.candidates[self.pos:]
+
+
+class CommitSearch:
+    """Búsqueda incremental sobre un ``CommitIndex``.
+
+    ``set_query`` reinicia la búsqueda (o filtra los resultados anteriores si
+    la nueva consulta solo añade texto) y ``advance`` revisa el siguiente
+    tramo del índice, también las entradas cargadas después. ``matches`` lista
+    primero las coincidencias exactas, en orden de historial, y cuando el
+    índice está cargado y revisado añade detrás las aproximadas.
+    """
+
+    def __init__(self, index: CommitIndex) -> None:
+        self.index = index
+        self.query = ""
+        self.tokens: Tuple[str, ...] = ()
+        self.matches: List[int] = []
+        # Coincidencias exactas al principio de ``matches`` (todas, si ``fuzzy`` ya empezó)
+        self.exact_count = 0
+        self.fuzzy = False
+        self._exact = _SearchPass()
+        self._fuzzy = _SearchPass()
+
+    @property
+    def scanned(self) -> int:
+        """Entradas del índice que el recorrido exacto ya revisó (en orden)."""
+        return self._exact.tail
+
+    @property
+    def active(self) -> bool:
+        return bool(self.tokens)
+
+    @property
+    def done(self) -> bool:
+        if not self.tokens:
+            return True
+        return (
+            self.fuzzy
+            and self._fuzzy.pos >= len(self._fuzzy.candidates)
+            and self._fuzzy.tail >= len(self.index)
+        )
+
+    def set_query(self, query: str) -> None:
+        normalizada = " ".join(parse_query(query))
+        tokens = parse_query(normalizada)
+        if normalizada.startswith(self.query) and _narrows(self.tokens, tokens):
+            # La consulta es más restrictiva: basta volver a filtrar lo ya
+            # encontrado (y lo pendiente de la anterior) antes de seguir
+            exactas = self.matches[:self.exact_count] if self.fuzzy else self.matches
+            self._exact = _SearchPass(exactas + self._exact.pending(), self._exact.tail)
+            if self.fuzzy:
+                # Candidatas aproximadas: todo lo que encajaba ya revisado; el resto
+                # del índice se revisa desde donde iba el recorrido anterior
+                vistas = set(self.matches)
+                vistas.update(self._fuzzy.pending())
+                fin = self._fuzzy.tail
+                self._fuzzy = _SearchPass(sorted(i for i in vistas if i < fin), fin)
+            else:
+                self._fuzzy = _SearchPass()
+        else:
+            self._exact = _SearchPass()
+            self._fuzzy = _SearchPass()
+        self.matches = []
+        self.exact_count = 0
+        self.fuzzy = False
+        self.query = normalizada
+        self.tokens = tokens
+
+    def _scan(self, recorrido: _SearchPass, budget: int, coincide) -> bool:
+        """Revisa hasta ``budget`` entradas de un recorrido; retorna si revisó alguna."""
+        entry = self.index.entry
+        if recorrido.pos < len(recorrido.candidates):
+            fin = min(len(recorrido.candidates), recorrido.pos + budget)
+            self.matches.extend(
+                i for i in recorrido.candidates[recorrido.pos:fin] if coincide(entry(i))
+            )
+            recorrido.pos = fin
+            return True
+        fin = min(len(self.index), recorrido.tail + budget)
+        if fin <= recorrido.tail:
+            return False
+        self.matches.extend(i for i in range(recorrido.tail, fin) if coincide(entry(i)))
+        recorrido.tail = fin
+        return True
+
+    def advance(self, budget: int = SEARCH_BUDGET) -> bool:
+        """Revisa hasta ``budget`` entradas más; retorna si hubo entradas nuevas que revisar."""
+        if not self.tokens:
+            return False
+        tokens = self.tokens
+        if not self.fuzzy:
+            if self._scan(self._exact, budget, lambda e: entry_matches(e, tokens)):
+                self.exact_count = len(self.matches)
+                return True
+            if not self.index.done or self._exact.tail < len(self.index):
+                return False
+            if not any(fuzzy_pattern(t) for t in tokens):
+                self._fuzzy = _SearchPass(tail=len(self.index))
+            self.fuzzy = True
+        # Las exactas ya están en ``matches``: aquí solo se añaden las aproximadas
+        return self._scan(
+            self._fuzzy,
+            max(1, budget // _FUZZY_COST),
+            lambda e: not entry_matches(e, tokens) and entry_matches_fuzzy(e, tokens),
+        )
+
+    def run(self) -> List[int]:
+        """Completa la búsqueda esperando a que termine la carga del índice."""
+        while not self.done:
+            if not self.advance():
+                self.index.wait_for(self.scanned + 1)
+        return self.matches
+
+
+class CommitView:
+    """Filas del selector: todo el historial o solo las coincidencias de la búsqueda."""
+
+    def __init__(self, index: CommitIndex) -> None:
+        self.index = index
+        self.search = CommitSearch(index)
+
+    def set_query(self, query: str) -> None:
+        self.search.set_query(query)
+
+    def refresh(self) -> None:
+        """Avanza la búsqueda un tramo (llamar periódicamente desde la UI)."""
+        self.search.advance()
+
+    def __len__(self) -> int:
+        return len(self.search.matches) if self.search.active else len(self.index)
+
+    @property
+    def complete(self) -> bool:
+        """``True`` cuando ``len()`` ya no va a crecer."""
+        return self.search.done if self.search.active else self.index.done
+
+    def position(self, row: int) -> int:
+        """Posición en el índice de la fila ``row`` de la vista."""
+        return self.search.matches[row] if self.search.active else row
+
+    def ensure(self, rows: int, timeout: Optional[float] = None) -> int:
+        """Espera a que la vista tenga ``rows`` filas (o esté completa); retorna las disponibles."""
+        if not self.search.active:
+            return self.index.wait_for(rows, timeout)
+        while len(self.search.matches) < rows and not self.search.done:
+            if not self.search.advance():
+                self.index.wait_for(self.search.scanned + 1, timeout)
+                if timeout is not None:
+                    break
+        return len(self.search.matches)
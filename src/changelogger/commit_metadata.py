@@ -0,0 +1,246 @@
+"""Metadatos de commits en bloque para Changelogger.
+
+GitPython carga los atributos de cada ``Commit`` de forma perezosa, con una
+consulta al almacén de objetos por commit. Este módulo lee los metadatos en
+bloque (``git log`` con separadores propios) o a través de un único proceso
+``git cat-file --batch`` de larga duración por repositorio, y los guarda en
+registros compactos con ``__slots__``.
+"""
+
+from __future__ import annotations
+
+import subprocess
+import threading
+import weakref
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence
+
+if TYPE_CHECKING:  # pragma: no cover
+    import git
+
+# Separadores de campo y de registro en el formato de ``git log``.
+_FIELD_SEP = "\x1f"
+_LOG_FORMAT = _FIELD_SEP.join(["%H", "%an", "%ae", "%ct", "%B"])
+
+
+class CommitAuthor:
+    """Autor de un commit (subconjunto de ``git.Actor``)."""
+
+    __slots__ = ("name", "email")
+
+    def __init__(self, name: str, email: str = "") -> None:
+        self.name = name
+        self.email = email
+
+
+class CommitRecord:
+    """Metadatos compactos de un commit.
+
+    Expone los mismos atributos de ``git.objects.Commit`` que usan los
+    formateadores (``hexsha``, ``summary``, ``committed_date``, ``author.name``),
+    sin la carga perezosa de objetos de GitPython.
+    """
+
+    __slots__ = ("hexsha", "author", "committed_date", "summary")
+
+    def __init__(
+        self, hexsha: str, author: CommitAuthor, committed_date: int, summary: str
+    ) -> None:
+        self.hexsha = hexsha
+        self.author = author
+        self.committed_date = committed_date
+        self.summary = summary
+
+    @classmethod
+    def from_commit(cls, commit) -> "CommitRecord":
+        """Crea un registro a partir de un commit de GitPython (o de otro registro)."""
+        if isinstance(commit, CommitRecord):
+            return commit
+        summary = commit.summary
+        if isinstance(summary, bytes):
+            summary = summary.decode("utf-8", errors="replace")
+        return cls(
+            commit.hexsha,
+            CommitAuthor(commit.author.name or "", commit.author.email or ""),
+            int(commit.committed_date),
+            summary,
+        )
+
+    def __repr__(self) -> str:
+        return f"CommitRecord({self.hexsha[:7]!r}, {self.summary!r})"
+
+
+def _first_line(message: str) -> str:
+    """Primera línea del mensaje (equivalente a ``Commit.summary`` de GitPython)."""
+    return message.split("\n", 1)[0]
+
+
+def parse_log_record(raw: str) -> Optional[CommitRecord]:
+    """Convierte un registro de ``git log -z --format=_LOG_FORMAT`` en ``CommitRecord``."""
+    partes = raw.lstrip("\n").split(_FIELD_SEP, 4)
+    if len(partes) != 5:
+        return None
+    hexsha, nombre, email, fecha, mensaje = partes
+    return CommitRecord(hexsha, CommitAuthor(nombre, email), int(fecha), _first_line(mensaje))
+
+
+def parse_commit_object(hexsha: str, data: bytes) -> CommitRecord:
+    """Convierte el contenido bruto de un objeto commit en ``CommitRecord``."""
+    cabecera, _, mensaje = data.partition(b"\n\n")
+    encoding = "utf-8"
+    nombre, email, fecha = "", "", 0
+
+    for linea in cabecera.split(b"\n"):
+        if linea.startswith(b"author "):
+            autor = linea[len(b"author "):]
+            ident, _, resto = autor.rpartition(b"> ")
+            nombre_b, _, email_b = ident.partition(b" <")
+            nombre, email = nombre_b, email_b
+            fecha = int(resto.split(b" ")[0] or 0)
+        elif linea.startswith(b"committer "):
+            resto = linea.rpartition(b"> ")[2]
+            fecha = int(resto.split(b" ")[0] or 0)
+        elif linea.startswith(b"encoding "):
+            encoding = linea[len(b"encoding "):].decode("ascii", errors="replace")
+
+    def decodificar(valor: bytes) -> str:
+        try:
+            return valor.decode(encoding, errors="replace")
+        except LookupError:
+            return valor.decode("utf-8", errors="replace")
+
+    return CommitRecord(
+        hexsha,
+        CommitAuthor(decodificar(nombre), decodificar(email)),
+        fecha,
+        _first_line(decodificar(mensaje)),
+    )
+
+
+def iter_commit_records(repo: git.Repo, *rev_args: str, max_count: Optional[int] = None) -> Iterator[CommitRecord]:
+    """Recorre ``git log`` con un único proceso y genera ``CommitRecord`` sin cargas perezosas."""
+    args: List[str] = ["-z", f"--format={_LOG_FORMAT}"]
+    if max_count is not None:
+        args.append(f"--max-count={max_count}")
+    args.extend(rev_args)
+
+    proc = repo.git.log(*args, as_process=True)
+    pendiente = b""
+    try:
+        while True:
+            bloque = proc.proc.stdout.read(65536)
+            if not bloque:
+                break
+            partes = (pendiente + bloque).split(b"\0")
+            pendiente = partes.pop()
+            for parte in partes:
+                record = parse_log_record(parte.decode("utf-8", errors="replace"))
+                if record is not None:
+                    yield record
+        if pendiente.strip():
+            record = parse_log_record(pendiente.decode("utf-8", errors="replace"))
+            if record is not None:
+                yield record
+    finally:
+        proc.proc.stdout.close()
+        proc.wait()
+
+
+class CommitMetadataReader:
+    """Proceso ``git cat-file --batch`` persistente para leer commits por SHA o ref.
+
+    Los registros leídos se guardan en memoria, así que pedir dos veces el
+    mismo commit no vuelve a consultar Git.
+    """
+
+    # Peticiones escritas antes de leer sus respuestas (evita bloqueos del pipe).
+    BATCH_SIZE = 100
+
+    def __init__(self, repo: git.Repo) -> None:
+        self._proc = repo.git.cat_file("--batch", istream=subprocess.PIPE, as_process=True)
+        self._lock = threading.Lock()
+        self._records: Dict[str, CommitRecord] = {}
+        self._finalizer = weakref.finalize(self, _terminate, self._proc)
+
+    def _read_object(self) -> Optional[tuple]:
+        stdout = self._proc.proc.stdout
+        cabecera = stdout.readline().decode("ascii", errors="replace").split()
+        if len(cabecera) != 3:
+            return None
+        hexsha, tipo, tamano = cabecera
+        data = stdout.read(int(tamano))
+        stdout.read(1)
+        return hexsha, tipo, data
+
+    def get_many(self, revs: Sequence[str]) -> List[Optional[CommitRecord]]:
+        """Retorna los registros de varios commits (None si la ref no es un commit)."""
+        resultados: List[Optional[CommitRecord]] = []
+        with self._lock:
+            for inicio in range(0, len(revs), self.BATCH_SIZE):
+                bloque = revs[inicio:inicio + self.BATCH_SIZE]
+                pendientes = [rev for rev in bloque if rev not in self._records]
+                if pendientes:
+                    stdin = self._proc.proc.stdin
+                    # ``^{commit}`` pela las etiquetas anotadas hasta su commit
+                    stdin.write("".join(f"{rev}^{{commit}}\n" for rev in pendientes).encode("utf-8"))
+                    stdin.flush()
+                    for rev in pendientes:
+                        objeto = self._read_object()
+                        if objeto is None or objeto[1] != "commit":
+                            continue
+                        record = parse_commit_object(objeto[0], objeto[2])
+                        self._records[rev] = record
+                        self._records[record.hexsha] = record
+                resultados.extend(self._records.get(rev) for rev in bloque)
+        return resultados
+
+    def get(self, rev: str) -> Optional[CommitRecord]:
+        """Retorna el registro de un commit por SHA o ref (por ejemplo ``HEAD``)."""
+        return self.get_many([rev])[0]
+
+    def close(self) -> None:
+        """Termina el proceso ``git cat-file``."""
+        self._finalizer()
+
+
+def _terminate(proc) -> None:
+    try:
+        proc.proc.stdin.close()
+    except Exception:
+        pass
+    proc.wait()
+
+
+# Lectores por objeto ``git.Repo`` (``id``): dos ``Repo`` del mismo repositorio
+# son iguales y tienen el mismo hash, y cada uno (p. ej. el de cada worker del
+# modo batch) debe tener su propio proceso para poder cerrarlo sin afectar a otros.
+_readers: Dict[int, CommitMetadataReader] = {}
+_readers_lock = threading.Lock()
+
+
+def _forget_reader(key: int) -> None:
+    # Sin ``_readers_lock``: el finalizador puede ejecutarse durante una recolección
+    # en un hilo que ya lo tiene (``dict.pop`` es atómico)
+    reader = _readers.pop(key, None)
+    if reader is not None:
+        reader.close()
+
+
+def get_metadata_reader(repo: git.Repo) -> CommitMetadataReader:
+    """Retorna el lector de metadatos (un proceso por objeto ``git.Repo``) de ``repo``."""
+    with _readers_lock:
+        reader = _readers.get(id(repo))
+        if reader is None:
+            reader = CommitMetadataReader(repo)
+            _readers[id(repo)] = reader
+            # Al liberarse el Repo su id puede reutilizarse: se olvida su lector
+            weakref.finalize(repo, _forget_reader, id(repo))
+        return reader
+
+
+def close_metadata_reader(repo: git.Repo) -> None:
+    """Termina el lector de metadatos de ``repo`` si existe.
+
+    Solo afecta al lector de ese objeto ``git.Repo``; los de otros objetos del
+    mismo repositorio siguen abiertos.
+    """
+    _forget_reader(id(repo))
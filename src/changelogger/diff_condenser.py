@@ -0,0 +1,342 @@
+"""Condensación del diff antes de enviarlo a la IA.
+
+El diff se recorre en streaming y se divide en archivos y hunks. Se descarta
+el contenido de poco valor para el análisis (lockfiles, rutas vendorizadas o
+generadas, hunks que solo cambian espacios y parches binarios) y, si el resto
+no cabe en el presupuesto de tokens, se conservan los hunks más importantes
+según su churn (líneas añadidas + eliminadas) y el tipo de archivo; un hunk
+que por sí solo supera el presupuesto se recorta en lugar de descartarse. Al
+final se añade una lista del contenido omitido para que el modelo sepa que
+existe.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import math
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .utils import get_env_int
+
+logger = logging.getLogger(__name__)
+
+# Presupuesto por defecto (tokens estimados) del diff condensado.
+DEFAULT_DIFF_BUDGET_TOKENS = 24000
+
+# Rutas omitidas por motivo que se listan como máximo en el resumen final.
+MAX_OMITTED_LISTED = 30
+
+LOCKFILES = frozenset({
+    "package-lock.json",
+    "npm-shrinkwrap.json",
+    "yarn.lock",
+    "pnpm-lock.yaml",
+    "poetry.lock",
+    "Pipfile.lock",
+    "uv.lock",
+    "Cargo.lock",
+    "composer.lock",
+    "Gemfile.lock",
+    "go.sum",
+    "mix.lock",
+    "pubspec.lock",
+    "packages.lock.json",
+})
+
+# Directorios cuyo contenido es de terceros.
+VENDORED_DIRS = frozenset({"vendor", "vendors", "node_modules", "third_party", "third-party", "bower_components"})
+
+# Directorios y sufijos de archivos generados.
+GENERATED_DIRS = frozenset({"dist", "build", "generated", "__generated__", "gen", ".next", "coverage"})
+GENERATED_SUFFIXES = (
+    ".min.js",
+    ".min.css",
+    ".map",
+    "_pb2.py",
+    "_pb2_grpc.py",
+    ".pb.go",
+    ".pb.cc",
+    ".pb.h",
+    ".g.dart",
+    ".designer.cs",
+    ".snap",
+)
+
+# Peso de cada tipo de archivo en la puntuación de sus hunks.
+_SOURCE_EXTENSIONS = frozenset({
+    ".py", ".js", ".jsx", ".ts", ".tsx", ".go", ".rs", ".java", ".kt", ".scala",
+    ".c", ".h", ".cc", ".cpp", ".hpp", ".cs", ".rb", ".php", ".swift", ".m",
+    ".sql", ".sh", ".vue", ".svelte", ".dart", ".ex", ".exs", ".lua",
+})
+_CONFIG_EXTENSIONS = frozenset({".toml", ".yaml", ".yml", ".json", ".ini", ".cfg", ".conf", ".env", ".xml", ".gradle"})
+_DOC_EXTENSIONS = frozenset({".md", ".rst", ".txt", ".adoc"})
+
+WEIGHT_SOURCE = 1.0
+WEIGHT_CONFIG = 0.8
+WEIGHT_TEST = 0.7
+WEIGHT_OTHER = 0.6
+WEIGHT_DOC = 0.5
+
+OMISSION_REASONS = {
+    "lockfile": "lockfiles",
+    "vendored": "código de terceros",
+    "generated": "archivos generados",
+    "binary": "binarios",
+    "whitespace": "solo espacios en blanco",
+    "budget": "fuera del presupuesto de tokens",
+    "truncated": "hunks recortados al presupuesto de tokens",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación offline de tokens (~4 caracteres por token)."""
+    return (len(text) + 3) // 4
+
+
+def get_diff_budget_tokens() -> int:
+    """Presupuesto del diff condensado (``OPENAI_DIFF_BUDGET_TOKENS``; 0 = sin límite)."""
+    return get_env_int("OPENAI_DIFF_BUDGET_TOKENS", DEFAULT_DIFF_BUDGET_TOKENS)
+
+
+def classify_path(path: str) -> Optional[str]:
+    """Retorna el motivo por el que un archivo se omite (lockfile/vendored/generated) o None."""
+    partes = path.split("/")
+    nombre = partes[-1]
+    if nombre in LOCKFILES:
+        return "lockfile"
+    directorios = partes[:-1]
+    if any(d in VENDORED_DIRS for d in directorios):
+        return "vendored"
+    if any(d in GENERATED_DIRS for d in directorios) or nombre.endswith(GENERATED_SUFFIXES):
+        return "generated"
+    return None
+
+
+def file_weight(path: str) -> float:
+    """Peso del tipo de archivo en la importancia de sus hunks."""
+    nombre = path.rsplit("/", 1)[-1].lower()
+    if "test" in path.lower():
+        return WEIGHT_TEST
+    extension = os.path.splitext(nombre)[1]
+    if extension in _SOURCE_EXTENSIONS:
+        return WEIGHT_SOURCE
+    if extension in _CONFIG_EXTENSIONS or nombre in ("dockerfile", "makefile"):
+        return WEIGHT_CONFIG
+    if extension in _DOC_EXTENSIONS:
+        return WEIGHT_DOC
+    return WEIGHT_OTHER
+
+
+class DiffHunk:
+    """Un hunk del diff (o un archivo sin hunks, p. ej. un renombrado puro)."""
+
+    __slots__ = ("seq", "file_index", "path", "header", "lines", "added", "removed")
+
+    def __init__(self, seq: int, file_index: int, path: str, header: List[str]):
+        self.seq = seq
+        self.file_index = file_index
+        self.path = path
+        self.header = header
+        self.lines: List[str] = []
+        self.added = 0
+        self.removed = 0
+
+    @property
+    def churn(self) -> int:
+        return self.added + self.removed
+
+    def is_whitespace_only(self) -> bool:
+        """Indica si las líneas añadidas y eliminadas solo difieren en espacios."""
+        if not self.churn:
+            return False
+        antes = "".join("".join(l[1:].split()) for l in self.lines if l.startswith("-"))
+        despues = "".join("".join(l[1:].split()) for l in self.lines if l.startswith("+"))
+        return antes == despues
+
+    def truncate(self, max_tokens: int) -> Tuple[int, int]:
+        """Recorta las líneas para que cabecera y hunk quepan en ``max_tokens``.
+
+        Añade una línea que indica el recorte y retorna las líneas añadidas y
+        eliminadas que se han quitado.
+        """
+        disponible = max_tokens * 4 - len("".join(self.header)) - 80
+        conservadas = 0
+        for linea in self.lines:
+            disponible -= len(linea)
+            if disponible < 0:
+                break
+            conservadas += 1
+        fuera = self.lines[conservadas:]
+        added = sum(1 for l in fuera if l.startswith("+"))
+        removed = sum(1 for l in fuera if l.startswith("-"))
+        self.lines = self.lines[:conservadas]
+        self.lines.append(f"# ... hunk recortado: {len(fuera)} líneas omitidas\n")
+        return added, removed
+
+
+def _path_from_header(linea: str) -> str:
+    """Extrae la ruta destino de una línea ``diff --git a/X b/Y``."""
+    resto = linea[len("diff --git "):].rstrip("\n")
+    corte = resto.rfind(" b/")
+    return resto[corte + 3:] if corte >= 0 else resto
+
+
+def iter_diff_hunks(lines: Iterable[str]) -> Iterator[Tuple[DiffHunk, Optional[str]]]:
+    """Genera (hunk, motivo de omisión o None) a partir de las líneas del diff.
+
+    Los archivos sin hunks (binarios, renombrados puros, cambios de modo) se
+    generan como un ``DiffHunk`` sin líneas, con su cabecera. De los hunks de
+    archivos omitidos solo se cuentan las líneas añadidas y eliminadas, sin
+    guardarlas.
+    """
+    seq = 0
+    file_index = -1
+    path = ""
+    header: List[str] = []
+    motivo: Optional[str] = None
+    actual: Optional[DiffHunk] = None
+    archivo_con_hunks = False
+
+    def cerrar_archivo() -> Iterator[Tuple[DiffHunk, Optional[str]]]:
+        if file_index >= 0 and not archivo_con_hunks:
+            yield DiffHunk(seq, file_index, path, header), motivo
+
+    def emitir(hunk: DiffHunk) -> Tuple[DiffHunk, Optional[str]]:
+        if motivo is None and hunk.is_whitespace_only():
+            return hunk, "whitespace"
+        return hunk, motivo
+
+    for linea in lines:
+        if linea.startswith("diff --git "):
+            if actual is not None:
+                yield emitir(actual)
+                actual = None
+            yield from cerrar_archivo()
+            seq += 1
+            file_index += 1
+            path = _path_from_header(linea)
+            header = [linea]
+            motivo = classify_path(path)
+            archivo_con_hunks = False
+            continue
+
+        if actual is None and not linea.startswith("@@"):
+            header.append(linea)
+            if linea.startswith("+++ b/"):
+                path = linea[len("+++ b/"):].rstrip("\n")
+                motivo = classify_path(path) or motivo
+            elif linea.startswith(("Binary files ", "GIT binary patch")):
+                motivo = motivo or "binary"
+            continue
+
+        if linea.startswith("@@"):
+            if actual is not None:
+                yield emitir(actual)
+            seq += 1
+            actual = DiffHunk(seq, file_index, path, header)
+            archivo_con_hunks = True
+        if linea.startswith("+"):
+            actual.added += 1
+        elif linea.startswith("-"):
+            actual.removed += 1
+        if motivo is None:
+            actual.lines.append(linea)
+
+    if actual is not None:
+        yield emitir(actual)
+    yield from cerrar_archivo()
+
+
+def hunk_score(hunk: DiffHunk) -> float:
+    """Importancia de un hunk: churn (escala logarítmica) ponderado por tipo de archivo."""
+    return file_weight(hunk.path) * math.log1p(hunk.churn)
+
+
+def _format_omitted(omitidos: Dict[str, Dict[str, List[int]]]) -> str:
+    """Resume el contenido omitido por motivo, con el churn de cada archivo."""
+    logger.debug(
+        "🔍 Diff condensado - omitidos: "
+        + ", ".join(f"{motivo}={len(archivos)}" for motivo, archivos in omitidos.items() if archivos)
+    )
+    lineas = ["", "# Contenido omitido del diff:"]
+    for motivo, archivos in omitidos.items():
+        if not archivos:
+            continue
+        lineas.append(f"# - {OMISSION_REASONS[motivo]} ({len(archivos)} archivos):")
+        for path, (added, removed) in list(archivos.items())[:MAX_OMITTED_LISTED]:
+            churn = f" (+{added} -{removed})" if added or removed else ""
+            lineas.append(f"#     {path}{churn}")
+        if len(archivos) > MAX_OMITTED_LISTED:
+            lineas.append(f"#     ... y {len(archivos) - MAX_OMITTED_LISTED} más")
+    return "\n".join(lineas) + "\n"
+
+
+def condense_diff(
+    lines: Iterable[str], budget_tokens: Optional[int] = None
+) -> Iterator[str]:
+    """Genera el diff condensado como bloques de texto con líneas completas.
+
+    Sin presupuesto (``budget_tokens`` <= 0) solo se filtra y la salida es
+    streaming. Con presupuesto, los hunks candidatos se mantienen en un
+    min-heap por puntuación: cuando el total supera el presupuesto se expulsa
+    el menos importante, así que la memoria queda acotada por el presupuesto.
+    Un hunk mayor que todo el presupuesto se recorta hasta caber (conserva la
+    puntuación de su churn completo). Los hunks conservados se emiten en el orden original del diff, cada uno
+    con la cabecera de su archivo una sola vez.
+    """
+    if budget_tokens is None:
+        budget_tokens = get_diff_budget_tokens()
+
+    omitidos: Dict[str, Dict[str, List[int]]] = {motivo: {} for motivo in OMISSION_REASONS}
+
+    def omitir(hunk: DiffHunk, motivo: str, added: Optional[int] = None, removed: Optional[int] = None) -> None:
+        cuenta = omitidos[motivo].setdefault(hunk.path, [0, 0])
+        cuenta[0] += hunk.added if added is None else added
+        cuenta[1] += hunk.removed if removed is None else removed
+
+    if budget_tokens <= 0:
+        ultimo_archivo = -1
+        for hunk, motivo in iter_diff_hunks(lines):
+            if motivo:
+                omitir(hunk, motivo)
+                continue
+            if hunk.file_index != ultimo_archivo:
+                ultimo_archivo = hunk.file_index
+                yield "".join(hunk.header)
+            if hunk.lines:
+                yield "".join(hunk.lines)
+        if any(omitidos.values()):
+            yield _format_omitted(omitidos)
+        return
+
+    heap: List[Tuple[float, int, int, DiffHunk]] = []
+    total = 0
+    for hunk, motivo in iter_diff_hunks(lines):
+        if motivo:
+            omitir(hunk, motivo)
+            continue
+        # La cabecera se cuenta en cada hunk: estimación conservadora.
+        tokens = estimate_tokens("".join(hunk.header)) + estimate_tokens("".join(hunk.lines))
+        puntuacion = hunk_score(hunk)
+        if tokens > budget_tokens:
+            omitir(hunk, "truncated", *hunk.truncate(budget_tokens))
+            tokens = estimate_tokens("".join(hunk.header)) + estimate_tokens("".join(hunk.lines))
+        heapq.heappush(heap, (puntuacion, -hunk.seq, tokens, hunk))
+        total += tokens
+        while total > budget_tokens and heap:
+            _, _, tokens_fuera, fuera = heapq.heappop(heap)
+            total -= tokens_fuera
+            omitir(fuera, "budget")
+
+    ultimo_archivo = -1
+    for _, _, _, hunk in sorted(heap, key=lambda item: item[3].seq):
+        if hunk.file_index != ultimo_archivo:
+            ultimo_archivo = hunk.file_index
+            yield "".join(hunk.header)
+        if hunk.lines:
+            yield "".join(hunk.lines)
+    if any(omitidos.values()):
+        yield _format_omitted(omitidos)
+
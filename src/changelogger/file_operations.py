@@ -4,8 +4,9 @@ from __future__ import annotations
 
 import os
 from datetime import datetime
-from typing import Tuple
+from typing import Iterable, Iterator, Optional, Tuple, Union
 
+from .artifact_store import is_diff_reference, iter_reference_chunks
 from .utils import ensure_directory_exists, format_timestamp, slugify
 
 
@@ -21,14 +22,35 @@ def ensure_output_structure(base_path: str) -> Tuple[str, str]:
     return diff_dir, md_dir
 
 
+def get_cache_dir(base_path: str) -> str:
+    """Crea (si hace falta) y retorna el directorio de caché dentro de .changelogger."""
+    cache_dir = os.path.join(base_path, ".changelogger", ".cache")
+    ensure_directory_exists(cache_dir)
+    return cache_dir
+
+
 def generate_filenames(
-    origin_hash: str, target_hash: str, target_message: str, timestamp: datetime
+    origin_hash: str,
+    target_hash: str,
+    target_message: str,
+    timestamp: datetime,
+    md_with_origin: bool = False,
+    scope: Optional[str] = None,
 ) -> Tuple[str, str]:
-    """Genera nombres de archivo para diff y markdown."""
+    """Genera nombres de archivo para diff y markdown.
+
+    Con ``md_with_origin`` el nombre del Markdown incluye el hash corto del
+    origen, para que rangos con el mismo destino no se sobrescriban. Con
+    ``scope`` (filtro de rutas) ambos nombres llevan ese sufijo.
+    """
     ts = timestamp.strftime("%Y%m%d-%H%M")
+    sufijo = f"_{scope}" if scope else ""
     
-    diff_filename = f"{ts}_{origin_hash[:7]}-{target_hash[:7]}.diff"
-    md_filename = f"{ts}_{slugify(target_message)}.md"
+    diff_filename = f"{ts}_{origin_hash[:7]}-{target_hash[:7]}{sufijo}.diff"
+    if md_with_origin:
+        md_filename = f"{ts}_{origin_hash[:7]}_{slugify(target_message)}{sufijo}.md"
+    else:
+        md_filename = f"{ts}_{slugify(target_message)}{sufijo}.md"
 
     return diff_filename, md_filename
 
@@ -39,6 +61,30 @@ def write_diff_file(diff_path: str, content: str) -> None:
         f.write(content)
 
 
+def write_diff_stream(diff_path: str, chunks: Iterable[str]) -> None:
+    """Escribe un archivo diff bloque a bloque, con memoria acotada."""
+    with open(diff_path, "w", encoding="utf-8", newline="\n") as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+
+def iter_diff_file(diff_path: str, chunk_size: int = 64 * 1024) -> Iterator[str]:
+    """Lee perezosamente un archivo diff ya generado, bloque a bloque.
+
+    Si el ``.diff`` es una referencia al almacén comprimido, el texto se
+    reconstruye desde sus parches (ver ``artifact_store``).
+    """
+    if is_diff_reference(diff_path):
+        yield from iter_reference_chunks(diff_path, chunk_size)
+        return
+    with open(diff_path, "r", encoding="utf-8", newline="") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
 def write_markdown_file(md_path: str, content: str) -> None:
     """Escribe archivo Markdown con codificación UTF-8."""
     with open(md_path, "w", encoding="utf-8", newline="\n") as f:
@@ -54,35 +100,80 @@ def get_repository_working_path(repo) -> str:
     return base_repo
 
 
-def create_output_files(
+def get_output_paths(
     diff_dir: str,
     md_dir: str,
     origin_hash: str,
     target_hash: str,
     target_message: str,
     target_timestamp: datetime,
-    diff_content: str,
-    markdown_content: str,
+    md_with_origin: bool = False,
+    scope: Optional[str] = None,
 ) -> Tuple[str, str]:
-    """Crea los archivos de salida y retorna sus rutas."""
+    """Calcula las rutas completas de los archivos diff y markdown."""
     diff_filename, md_filename = generate_filenames(
-        origin_hash, target_hash, target_message, target_timestamp
+        origin_hash, target_hash, target_message, target_timestamp, md_with_origin, scope
     )
+    return os.path.join(diff_dir, diff_filename), os.path.join(md_dir, md_filename)
 
-    diff_path = os.path.join(diff_dir, diff_filename)
-    md_path = os.path.join(md_dir, md_filename)
 
-    write_diff_file(diff_path, diff_content)
+def get_ndjson_path(md_path: str) -> str:
+    """Ruta del export NDJSON que acompaña a un Markdown (mismo nombre, extensión ``.ndjson``)."""
+    return os.path.splitext(md_path)[0] + ".ndjson"
+
+
+def create_output_files(
+    diff_dir: str,
+    md_dir: str,
+    origin_hash: str,
+    target_hash: str,
+    target_message: str,
+    target_timestamp: datetime,
+    diff_content: Optional[Union[str, Iterable[str]]],
+    markdown_content: str,
+    md_with_origin: bool = False,
+    scope: Optional[str] = None,
+) -> Tuple[str, str]:
+    """Crea los archivos de salida y retorna sus rutas.
+
+    ``diff_content`` puede ser el texto completo, un iterable de bloques (se
+    escribe en streaming) o ``None`` si el diff ya se volcó a su ruta.
+    """
+    diff_path, md_path = get_output_paths(
+        diff_dir,
+        md_dir,
+        origin_hash,
+        target_hash,
+        target_message,
+        target_timestamp,
+        md_with_origin,
+        scope,
+    )
+
+    if isinstance(diff_content, str):
+        write_diff_file(diff_path, diff_content)
+    elif diff_content is not None:
+        write_diff_stream(diff_path, diff_content)
     write_markdown_file(md_path, markdown_content)
 
     return diff_path, md_path
 
 
-def print_output_summary(diff_path: str, md_path: str) -> None:
-    """Imprime resumen de archivos generados."""
+def print_output_summary(
+    diff_path: Optional[str], md_path: str, ndjson_path: Optional[str] = None
+) -> None:
+    """Imprime resumen de archivos generados (``diff_path`` None si no se generó diff)."""
     print("")
     print("Archivos generados:")
-    print(f"- Diff: {diff_path}")
+    if diff_path:
+        print(f"- Diff: {diff_path}")
     print(f"- Markdown: {md_path}")
-    print("")
-    print("Ahora puedes pasar el archivo .diff a Claude Code para que te explique los cambios.")
+    if ndjson_path:
+        print(f"- NDJSON: {ndjson_path}")
+    if diff_path:
+        print("")
+        if is_diff_reference(diff_path):
+            print("El .diff es una referencia al almacén comprimido; para obtener el diff completo:")
+            print(f"  changelogger --cat-diff {diff_path} > cambios.diff")
+        else:
+            print("Ahora puedes pasar el archivo .diff a Claude Code para que te explique los cambios.")
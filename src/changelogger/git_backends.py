@@ -0,0 +1,462 @@
+"""Backends de Git para las operaciones de ``git_operations``.
+
+Por defecto cada operación lanza un proceso ``git`` a través de GitPython. Si
+``pygit2`` (libgit2) está instalado, los diffs de árboles, la detección de
+renombrados y el texto del parche se calculan en el propio proceso, sin
+forks:
+
+- ``gitpython``: siempre procesos ``git`` (el camino de siempre).
+- ``pygit2``: libgit2 en proceso; si no está instalado se avisa y se usa
+  ``gitpython``.
+- ``auto`` (por defecto): ``pygit2`` si está instalado.
+
+El backend se elige con ``CHANGELOGGER_GIT_BACKEND``. ``pygit2`` no entiende
+los pathspecs mágicos de Git, así que con filtro de rutas, con una
+configuración de diff que libgit2 no reproduce (prefijos, algoritmo,
+textconv...) o ante cualquier error se vuelve automáticamente a GitPython.
+``python -m changelogger.git_backends ORIGEN..DESTINO`` compara la salida de
+ambos backends sobre un rango.
+
+La similitud de libgit2 no es la de Git, así que en proceso solo se detectan
+los renombrados exactos (mismo blob), que ambos emparejan igual. Si quedan
+archivos añadidos y eliminados que Git podría emparejar por similitud, ese
+commit o ese diff se calcula con ``git``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import logging
+import os
+import re
+import threading
+import weakref
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .commit_metadata import CommitRecord, parse_commit_object
+from .utils import ensure_gitpython, normalize_file_status
+
+if TYPE_CHECKING:  # pragma: no cover
+    import git
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("auto", "gitpython", "pygit2")
+DEFAULT_BACKEND = "auto"
+
+# Opciones de libgit2 (valores estables de su API en C).
+_DIFF_INCLUDE_TYPECHANGE = 1 << 6
+_DIFF_INDENT_HEURISTIC = 1 << 18
+_FIND_RENAMES = 1 << 0
+_FIND_EXACT_MATCH_ONLY = 1 << 14
+_SORT_NONE = 0
+
+# Configuración de Git que cambia el diff y que libgit2 no aplica igual.
+_UNSUPPORTED_DIFF_CONFIG = frozenset({
+    "diff.algorithm",
+    "diff.context",
+    "diff.dstprefix",
+    "diff.external",
+    "diff.indentheuristic",
+    "diff.interhunkcontext",
+    "diff.mnemonicprefix",
+    "diff.noprefix",
+    "diff.orderfile",
+    "diff.relative",
+    "diff.renames",
+    "diff.srcprefix",
+    "diff.suppressblankempty",
+    "log.showroot",
+})
+_UNSUPPORTED_DRIVER_CONFIG = re.compile(r"^diff\..+\.(textconv|command)$")
+
+_INDEX_LINE = re.compile(rb"^index [0-9a-f]+\.\.[0-9a-f]+", re.MULTILINE)
+
+# Cambios de un commit: [(tipo, ruta)] como en ``git_operations``.
+Changes = List[Tuple[str, str]]
+
+
+class RenamesNotReproducible(Exception):
+    """Git podría detectar renombrados por similitud que libgit2 no reproduce igual."""
+
+
+def _find_exact_renames(diff) -> None:
+    """Detecta los renombrados exactos; lanza ``RenamesNotReproducible`` si Git podría diferir.
+
+    Git empareja además por similitud (con su propia métrica y sus
+    preferencias por nombre): si quedan añadidos y eliminados sin emparejar, o
+    un mismo blob se podría emparejar con varias rutas, el resultado se deja a Git.
+    """
+    diff.find_similar(flags=_FIND_RENAMES | _FIND_EXACT_MATCH_ONLY)
+    estados = set()
+    origenes: Dict[str, int] = {}
+    destinos: Dict[str, int] = {}
+    for delta in diff.deltas:
+        estado = delta.status_char()
+        estados.add(estado)
+        if estado in ("D", "R"):
+            origenes[str(delta.old_file.id)] = origenes.get(str(delta.old_file.id), 0) + 1
+        if estado in ("A", "R"):
+            destinos[str(delta.new_file.id)] = destinos.get(str(delta.new_file.id), 0) + 1
+    if "A" in estados and "D" in estados:
+        raise RenamesNotReproducible("archivos añadidos y eliminados sin emparejar")
+    if "R" in estados and any(
+        origenes[str(d.old_file.id)] > 1 or destinos[str(d.new_file.id)] > 1
+        for d in diff.deltas
+        if d.status_char() == "R"
+    ):
+        raise RenamesNotReproducible("renombrado exacto ambiguo")
+
+
+def load_pygit2():
+    """Importa ``pygit2`` bajo demanda; retorna None si no está instalado."""
+    try:
+        import pygit2
+    except ModuleNotFoundError:
+        return None
+    return pygit2
+
+
+def load_backend_name() -> str:
+    """Retorna el backend configurado en ``CHANGELOGGER_GIT_BACKEND``."""
+    nombre = os.getenv("CHANGELOGGER_GIT_BACKEND", DEFAULT_BACKEND).strip().lower()
+    return nombre or DEFAULT_BACKEND
+
+
+class Pygit2Backend:
+    """Operaciones de Git en proceso con libgit2.
+
+    Cada hilo abre su propio ``pygit2.Repository`` (libgit2 no permite usar
+    el mismo objeto desde varios hilos a la vez). Los métodos reproducen la
+    salida de los comandos ``git`` equivalentes de ``git_operations``.
+    """
+
+    name = "pygit2"
+
+    def __init__(self, git_dir: str, abbrev: int = 7) -> None:
+        self.git_dir = git_dir
+        self.abbrev = abbrev
+        self._local = threading.local()
+        self.patches_supported, self.changes_supported = self._check_config()
+
+    def _repo(self):
+        repo = getattr(self._local, "repo", None)
+        if repo is None:
+            repo = load_pygit2().Repository(self.git_dir)
+            self._local.repo = repo
+        return repo
+
+    def _check_config(self) -> Tuple[bool, bool]:
+        """(parches, archivos por commit): si la configuración de Git permite reproducirlos."""
+        claves = {entrada.name.lower() for entrada in self._repo().config}
+        distintas = sorted(
+            c for c in claves if c in _UNSUPPORTED_DIFF_CONFIG or _UNSUPPORTED_DRIVER_CONFIG.match(c)
+        )
+        if distintas:
+            logger.debug("pygit2: configuración de diff no soportada (%s)", ", ".join(distintas))
+        return not distintas, "diff.renames" not in claves and "log.showroot" not in claves
+
+    @staticmethod
+    def _tree_diff(old_tree, new_tree, flags: int):
+        if old_tree is None:
+            return new_tree.diff_to_tree(flags=flags, swap=True)
+        return old_tree.diff_to_tree(new_tree, flags=flags)
+
+    def _commit(self, hexsha: str):
+        return self._repo()[load_pygit2().Oid(hex=hexsha)]
+
+    # --- Commits -------------------------------------------------------------
+
+    def commits_in_range(self, origin_hexsha: str, target_hexsha: str) -> List[CommitRecord]:
+        """Commits de ``origen..destino`` en el orden de ``git log`` (del más reciente al más antiguo).
+
+        libgit2 solo aporta el conjunto; el orden se reproduce como Git: cola
+        por fecha de commit y, a igual fecha, por orden de llegada.
+        """
+        repo = self._repo()
+        pygit2 = load_pygit2()
+        walker = repo.walk(pygit2.Oid(hex=target_hexsha), _SORT_NONE)
+        walker.hide(pygit2.Oid(hex=origin_hexsha))
+        incluidos = {c.id: c for c in walker}
+
+        resultado: List[CommitRecord] = []
+        destino = pygit2.Oid(hex=target_hexsha)
+        if destino not in incluidos:
+            return resultado
+        vistos = {destino}
+        llegada = 0
+        cola = [(-incluidos[destino].commit_time, llegada, destino)]
+        while cola:
+            _, _, oid = heapq.heappop(cola)
+            commit = incluidos[oid]
+            resultado.append(parse_commit_object(str(oid), commit.read_raw()))
+            for padre in commit.parent_ids:
+                if padre in incluidos and padre not in vistos:
+                    vistos.add(padre)
+                    llegada += 1
+                    heapq.heappush(cola, (-incluidos[padre].commit_time, llegada, padre))
+        return resultado
+
+    # --- Archivos por commit -------------------------------------------------
+
+    def commit_changes(self, hexsha: str) -> Changes:
+        """Archivos de un commit como ``git log --cc --name-status`` (sin ordenar).
+
+        En los merges ``--cc`` solo compacta los hunks del parche: con
+        ``--name-status`` lista, igual que ``-c``, las rutas que difieren de
+        todos los padres. Una ruta cuyo resultado coincide con uno de los
+        padres no aparece; una fusionada automáticamente con cambios de ambos
+        lados sí, aunque ``--cc`` no muestre ningún hunk suyo.
+        """
+        commit = self._commit(hexsha)
+        parents = commit.parents
+        if len(parents) <= 1:
+            diff = self._tree_diff(parents[0].tree if parents else None, commit.tree, _DIFF_INCLUDE_TYPECHANGE)
+            if parents:
+                _find_exact_renames(diff)
+            return [(normalize_file_status(d.status_char()), d.new_file.path) for d in diff.deltas]
+
+        # Merge (diff combinado): rutas que difieren de todos los padres, con
+        # una letra de estado por padre
+        por_padre: List[Dict[str, str]] = []
+        for padre in parents:
+            diff = self._tree_diff(padre.tree, commit.tree, _DIFF_INCLUDE_TYPECHANGE)
+            por_padre.append({d.new_file.path: d.status_char() for d in diff.deltas})
+        comunes = set(por_padre[0]).intersection(*por_padre[1:])
+        return [
+            (normalize_file_status("".join(estados[path] for estados in por_padre)), path)
+            for path in comunes
+        ]
+
+    def range_changes(self, hexshas: Sequence[str]) -> List[Tuple[str, Optional[Changes]]]:
+        """``(hexsha, cambios ordenados por ruta)`` de cada commit, en el orden recibido.
+
+        Los cambios son None en los commits cuyos renombrados hay que pedir a
+        Git (ver ``RenamesNotReproducible``).
+        """
+        resultado: List[Tuple[str, Optional[Changes]]] = []
+        for hexsha in hexshas:
+            try:
+                cambios = self.commit_changes(hexsha)
+            except RenamesNotReproducible:
+                resultado.append((hexsha, None))
+                continue
+            cambios.sort(key=lambda x: x[1])
+            resultado.append((hexsha, cambios))
+        return resultado
+
+    # --- Diff de un rango ----------------------------------------------------
+
+    def range_diff(self, origin_hexsha: str, target_hexsha: str):
+        """``pygit2.Diff`` de ``git diff origen..destino`` con renombrados detectados."""
+        diff = self._tree_diff(
+            self._commit(origin_hexsha).tree, self._commit(target_hexsha).tree, _DIFF_INDENT_HEURISTIC
+        )
+        _find_exact_renames(diff)
+        return diff
+
+    def iter_patches(self, diff) -> Iterator[bytes]:
+        """Texto de cada archivo del diff, con los hashes abreviados como Git."""
+        for patch in diff:
+            delta = patch.delta
+            linea = b"index %s..%s" % (
+                str(delta.old_file.id)[:self.abbrev].encode("ascii"),
+                str(delta.new_file.id)[:self.abbrev].encode("ascii"),
+            )
+            yield _INDEX_LINE.sub(lambda _: linea, patch.data, count=1)
+
+    def classify_files(self, origin_hexsha: str, target_hexsha: str) -> Dict[str, List[str]]:
+        """Archivos creados/modificados/eliminados como ``Commit.diff`` de GitPython (``-M``)."""
+        diff = self._tree_diff(
+            self._commit(origin_hexsha).tree, self._commit(target_hexsha).tree, _DIFF_INCLUDE_TYPECHANGE
+        )
+        _find_exact_renames(diff)
+        creados, modificados, eliminados = set(), set(), set()
+        for delta in diff.deltas:
+            estado = delta.status_char()
+            if estado == "A":
+                creados.add(delta.new_file.path)
+            elif estado == "D":
+                eliminados.add(delta.old_file.path)
+            else:
+                modificados.add(delta.new_file.path)
+        return {
+            "creados": sorted(creados),
+            "modificados": sorted(modificados),
+            "eliminados": sorted(eliminados),
+        }
+
+
+# Backend por objeto ``git.Repo`` (``id``): dos ``Repo`` del mismo repositorio son
+# iguales y tienen el mismo hash, y cada uno puede usar un backend distinto
+# (``check_backend_parity`` compara ambos sobre el mismo repositorio).
+_backends: Dict[int, Optional[Pygit2Backend]] = {}
+_backends_lock = threading.Lock()
+_warned = False
+
+
+def _git_abbrev(repo: git.Repo) -> int:
+    """Longitud de los hashes abreviados que usa Git en este repositorio (``core.abbrev``)."""
+    git = ensure_gitpython()
+    try:
+        return max(4, len(repo.git.rev_parse("--short", "HEAD").strip()))
+    except git.GitCommandError:
+        return 7
+
+
+def create_backend(repo: git.Repo, name: str) -> Optional[Pygit2Backend]:
+    """Crea el backend nativo indicado; None para usar GitPython."""
+    global _warned
+    if name not in BACKENDS:
+        logger.warning("⚠️ CHANGELOGGER_GIT_BACKEND desconocido: %s (opciones: %s)", name, ", ".join(BACKENDS))
+        return None
+    if name == "gitpython":
+        return None
+    if load_pygit2() is None:
+        with _backends_lock:
+            avisar = name == "pygit2" and not _warned
+            _warned = _warned or avisar
+        if avisar:
+            logger.warning("⚠️ pygit2 no está instalado; se usa GitPython")
+        return None
+    try:
+        return Pygit2Backend(repo.git_dir, _git_abbrev(repo))
+    except Exception as e:
+        logger.debug("pygit2 no puede abrir %s: %s", repo.git_dir, e)
+        return None
+
+
+def _forget_backend(key: int) -> None:
+    # Sin ``_backends_lock``: el finalizador puede ejecutarse durante una recolección
+    # en un hilo que ya lo tiene (``dict.pop`` es atómico)
+    _backends.pop(key, None)
+
+
+def select_git_backend(repo: git.Repo, name: Optional[str] = None) -> Optional[Pygit2Backend]:
+    """Fija el backend de ``repo`` (por defecto el de ``CHANGELOGGER_GIT_BACKEND``) y lo retorna.
+
+    Solo afecta a ese objeto ``git.Repo``; otros objetos del mismo repositorio
+    conservan su backend.
+    """
+    backend = create_backend(repo, name or load_backend_name())
+    with _backends_lock:
+        if id(repo) not in _backends:
+            # Al liberarse el Repo su id puede reutilizarse: se olvida su backend
+            weakref.finalize(repo, _forget_backend, id(repo))
+        _backends[id(repo)] = backend
+    return backend
+
+
+def get_native_backend(repo: git.Repo, pathspecs: Sequence[str] = ()) -> Optional[Pygit2Backend]:
+    """Backend en proceso de ``repo``, o None si hay que usar GitPython (p. ej. con pathspecs)."""
+    if pathspecs:
+        return None
+    with _backends_lock:
+        if id(repo) in _backends:
+            return _backends[id(repo)]
+    return select_git_backend(repo)
+
+
+def git_backend_name(repo: git.Repo) -> str:
+    """Nombre del backend que usa ``repo`` (``pygit2`` o ``gitpython``)."""
+    backend = get_native_backend(repo)
+    return backend.name if backend is not None else "gitpython"
+
+
+def check_backend_parity(repo_path: str, origin_ref: str, target_ref: str) -> List[str]:
+    """Compara las operaciones de ``git_operations`` con ambos backends sobre un rango.
+
+    Retorna las diferencias encontradas (vacío si las salidas son idénticas).
+    """
+    from . import git_operations as ops
+    from .commit_metadata import close_metadata_reader
+
+    git = ensure_gitpython()
+    repo_cli, repo_nativo = git.Repo(repo_path), git.Repo(repo_path)
+    select_git_backend(repo_cli, "gitpython")
+    if select_git_backend(repo_nativo, "pygit2") is None:
+        return ["pygit2 no está disponible"]
+
+    diferencias: List[str] = []
+
+    def comparar(nombre: str, cli, nativo) -> None:
+        if cli != nativo:
+            diferencias.append(f"{nombre}: gitpython={cli!r:.200} pygit2={nativo!r:.200}")
+
+    try:
+        origen = ops.get_commit_record(repo_cli, origin_ref)
+        destino = ops.get_commit_record(repo_cli, target_ref)
+        if origen is None or destino is None:
+            return ["referencia no encontrada"]
+
+        def registros(repo):
+            return [
+                (c.hexsha, c.author.name, c.author.email, c.committed_date, c.summary)
+                for c in ops.get_commits_in_range(repo, origen, destino)
+            ]
+
+        comparar("get_commits_in_range", registros(repo_cli), registros(repo_nativo))
+        commits = ops.get_commits_in_range(repo_cli, origen, destino)
+        cli = ops.analyze_range_changes(repo_cli, commits)
+        nativo = ops.analyze_range_changes(repo_nativo, commits)
+        for commit in commits:
+            comparar(f"analyze_range_changes {commit.hexsha[:12]}", cli.get(commit.hexsha), nativo.get(commit.hexsha))
+        for commit in (origen, destino):
+            comparar(
+                f"analyze_commit_changes {commit.hexsha[:12]}",
+                ops.analyze_commit_changes(repo_cli, commit),
+                ops.analyze_commit_changes(repo_nativo, commit),
+            )
+        comparar(
+            "classify_files_by_status",
+            ops.classify_files_by_status(repo_cli, repo_cli.commit(origen.hexsha), repo_cli.commit(destino.hexsha)),
+            ops.classify_files_by_status(
+                repo_nativo, repo_nativo.commit(origen.hexsha), repo_nativo.commit(destino.hexsha)
+            ),
+        )
+        diff_cli = ops.generate_diff(repo_cli, origen, destino).splitlines()
+        diff_nativo = ops.generate_diff(repo_nativo, origen, destino).splitlines()
+        if diff_cli != diff_nativo:
+            linea = next(
+                (i for i, (a, b) in enumerate(zip(diff_cli, diff_nativo)) if a != b),
+                min(len(diff_cli), len(diff_nativo)),
+            )
+            comparar(
+                f"generate_diff (línea {linea + 1})",
+                diff_cli[linea] if linea < len(diff_cli) else None,
+                diff_nativo[linea] if linea < len(diff_nativo) else None,
+            )
+        return diferencias
+    finally:
+        for repo in (repo_cli, repo_nativo):
+            close_metadata_reader(repo)
+            repo.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Comprueba que pygit2 y GitPython producen la misma salida en los rangos indicados."""
+    parser = argparse.ArgumentParser(
+        prog="python -m changelogger.git_backends",
+        description="Compara los backends de Git (GitPython y pygit2) sobre uno o varios rangos.",
+    )
+    parser.add_argument("ranges", nargs="+", metavar="ORIGEN..DESTINO")
+    parser.add_argument("--repo", default=".", metavar="RUTA", help="repositorio (por defecto el directorio actual)")
+    args = parser.parse_args(argv)
+
+    fallidos = 0
+    for spec in args.ranges:
+        origen, _, destino = spec.partition("..")
+        diferencias = check_backend_parity(args.repo, origen.strip(), destino.strip() or "HEAD")
+        if diferencias:
+            fallidos += 1
+            print(f"❌ {spec}")
+            for diferencia in diferencias:
+                print(f"   - {diferencia}")
+        else:
+            print(f"✅ {spec}: salidas idénticas")
+    raise SystemExit(1 if fallidos else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,139 @@
-"""Operaciones Git para Changelogger."""
+"""Operaciones Git para Changelogger.
+
+Las operaciones de diff, archivos por commit y commits de un rango usan el
+backend en proceso de ``git_backends`` (pygit2) cuando está disponible y, si
+no, o si no puede reproducir la salida de Git, lanzan ``git`` con GitPython.
+"""
 
 from __future__ import annotations
 
+import codecs
+import logging
 import os
-from typing import Dict, List, Tuple
+import subprocess
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
-try:
+if TYPE_CHECKING:  # pragma: no cover
     import git
-except ModuleNotFoundError:  # pragma: no cover
-    git = None  # type: ignore[assignment]
 
+from .commit_metadata import CommitAuthor, CommitRecord, get_metadata_reader, iter_commit_records
+from .git_backends import Pygit2Backend, get_native_backend, git_backend_name
 from .utils import ensure_gitpython, format_timestamp, normalize_file_status
 
+logger = logging.getLogger(__name__)
+
+# Tamaño de bloque (bytes) con el que se lee la salida de ``git diff`` en streaming.
+DIFF_CHUNK_SIZE = 1024 * 1024
+
+# Líneas (añadidas, eliminadas) de un archivo; None en ambas si es binario.
+LineStats = Tuple[Optional[int], Optional[int]]
+
+
+def build_pathspecs(paths: Iterable[str]) -> List[str]:
+    """Convierte patrones de usuario en pathspecs de Git.
+
+    ``services/billing/**`` se incluye como ``:(glob)services/billing/**`` y
+    ``!**/*.lock`` se excluye como ``:(exclude,glob)**/*.lock``. Un patrón que
+    ya empieza por ``:`` (pathspec mágico de Git) se pasa tal cual.
+    """
+    pathspecs: List[str] = []
+    for path in paths:
+        path = path.strip()
+        if not path:
+            continue
+        if path.startswith(":"):
+            pathspecs.append(path)
+        elif path.startswith("!"):
+            pathspecs.append(f":(exclude,glob){path[1:]}")
+        else:
+            pathspecs.append(f":(glob){path}")
+    return pathspecs
+
+
+def _pathspec_args(pathspecs: Sequence[str]) -> List[str]:
+    """Argumentos finales ``-- pathspec...`` de un comando Git (vacío sin filtros)."""
+    return ["--", *pathspecs] if pathspecs else []
+
+
+def _native(repo: git.Repo, pathspecs: Sequence[str] = (), patches: bool = False) -> Optional[Pygit2Backend]:
+    """Backend en proceso si puede reproducir la operación (archivos por commit o ``patches``)."""
+    backend = get_native_backend(repo, pathspecs)
+    if backend is None:
+        return None
+    if not (backend.patches_supported if patches else backend.changes_supported):
+        return None
+    return backend
+
 
 def detect_repository() -> git.Repo:
     """Detecta y abre el repositorio Git en la ruta actual o sus directorios padre."""
-    ensure_gitpython()
+    git = ensure_gitpython()
     try:
-        return git.Repo(os.getcwd(), search_parent_directories=True)
+        repo = git.Repo(os.getcwd(), search_parent_directories=True)
     except git.InvalidGitRepositoryError:
         print(
             "Error: no se ha encontrado un repositorio Git en esta ruta ni en sus padres."
         )
         raise SystemExit(1)
+    logger.debug("Backend de Git: %s", git_backend_name(repo))
+    return repo
 
 
-def list_recent_commits(repo: git.Repo, max_commits: int = 50) -> List[git.objects.Commit]:
-    """Obtiene los últimos N commits del HEAD."""
-    ensure_gitpython()
+def list_recent_commits(
+    repo: git.Repo, max_commits: int = 50, pathspecs: Sequence[str] = ()
+) -> List[CommitRecord]:
+    """Obtiene los últimos N commits del HEAD (metadatos leídos en bloque).
+
+    Con ``pathspecs`` solo se listan los commits que tocan esas rutas.
+    """
+    git = ensure_gitpython()
     try:
-        return list(repo.iter_commits(max_count=max_commits))
+        return list(iter_commit_records(repo, "HEAD", *_pathspec_args(pathspecs), max_count=max_commits))
     except git.GitCommandError:
         return []
 
 
-def analyze_commit_changes(repo: git.Repo, commit: git.objects.Commit) -> List[Tuple[str, str]]:
+def get_commit_record(repo: git.Repo, rev: str) -> Optional[CommitRecord]:
+    """Resuelve una ref o SHA a ``CommitRecord`` con el lector persistente del repositorio."""
+    ensure_gitpython()
+    return get_metadata_reader(repo).get(rev)
+
+
+def _build_change(estado: str, rutas: List[str]) -> Optional[Tuple[str, str]]:
+    """Convierte una entrada name-status (estado + rutas) en una tupla (tipo, path)."""
+    tipo = normalize_file_status(estado)
+
+    path = ""
+    if estado.startswith("R") or estado.startswith("C"):
+        if len(rutas) >= 2:
+            path = rutas[1]
+        elif len(rutas) >= 1:
+            path = rutas[0]
+    else:
+        if len(rutas) >= 1:
+            path = rutas[0]
+
+    if not path:
+        return None
+    return tipo, path
+
+
+def analyze_commit_changes(
+    repo: git.Repo, commit: git.objects.Commit, pathspecs: Sequence[str] = ()
+) -> List[Tuple[str, str]]:
     """Obtiene los archivos implicados en un commit con su tipo (Creado/Modificado/Eliminado)."""
     ensure_gitpython()
-    
-    salida = repo.git.show(commit.hexsha, "--name-status", "--pretty=format:")
+    native = _native(repo, pathspecs)
+    if native is not None:
+        try:
+            cambios = native.range_changes([commit.hexsha])[0][1]
+        except Exception as e:
+            logger.debug("pygit2 falló en %s, se usa git: %s", commit.hexsha[:7], e)
+        else:
+            if cambios is not None:
+                return cambios
+
+    salida = repo.git.show(commit.hexsha, "--name-status", "--pretty=format:", *_pathspec_args(pathspecs))
     cambios: List[Tuple[str, str]] = []
 
     for linea in salida.splitlines():
@@ -47,31 +142,277 @@ def analyze_commit_changes(repo: git.Repo, commit: git.objects.Commit) -> List[T
             continue
 
         partes = linea.split("\t")
-        estado = partes[0]
-        tipo = normalize_file_status(estado)
-
-        path = ""
-        if estado.startswith("R") or estado.startswith("C"):
-            if len(partes) >= 3:
-                path = partes[2]
-            elif len(partes) >= 2:
-                path = partes[1]
-        else:
-            if len(partes) >= 2:
-                path = partes[1]
-
-        if path:
-            cambios.append((tipo, path))
+        cambio = _build_change(partes[0], partes[1:])
+        if cambio:
+            cambios.append(cambio)
 
     cambios.sort(key=lambda x: x[1])
     return cambios
 
 
+# Marcador que precede al hash de cada commit en la salida de ``git log -z``.
+_COMMIT_MARKER = "\x01"
+
+
+def _iter_nul_tokens(stream, chunk_size: int = 65536) -> Iterator[str]:
+    """Lee un flujo binario por bloques y genera los campos separados por NUL."""
+    pendiente = b""
+    while True:
+        bloque = stream.read(chunk_size)
+        if not bloque:
+            break
+        partes = (pendiente + bloque).split(b"\0")
+        pendiente = partes.pop()
+        for parte in partes:
+            yield parte.decode("utf-8", errors="replace")
+    if pendiente:
+        yield pendiente.decode("utf-8", errors="replace")
+
+
+def iter_range_changes(
+    repo: git.Repo, commits: Iterable[git.objects.Commit], pathspecs: Sequence[str] = ()
+) -> Iterator[Tuple[str, List[Tuple[str, str]]]]:
+    """Genera (hexsha, cambios) para varios commits con una única invocación de ``git log``.
+
+    Equivale a llamar a ``analyze_commit_changes`` por cada commit, pero lee la
+    salida ``--name-status -z`` de un solo proceso de forma incremental. Los
+    commits que no tocan ``pathspecs`` no se generan.
+    """
+    ensure_gitpython()
+    hexshas = [c.hexsha for c in commits]
+    if not hexshas:
+        return
+    native = _native(repo, pathspecs)
+    if native is not None:
+        try:
+            resultado = native.range_changes(hexshas)
+        except Exception as e:
+            logger.debug("pygit2 falló al analizar el rango, se usa git: %s", e)
+        else:
+            # Los commits con renombrados que libgit2 no reproduce se piden a git
+            pendientes = [hexsha for hexsha, cambios in resultado if cambios is None]
+            desde_git = dict(_iter_git_range_changes(repo, pendientes, pathspecs)) if pendientes else {}
+            for hexsha, cambios in resultado:
+                yield hexsha, cambios if cambios is not None else desde_git.get(hexsha, [])
+            return
+
+    yield from _iter_git_range_changes(repo, hexshas, pathspecs)
+
+
+def _iter_git_range_changes(
+    repo: git.Repo, hexshas: Sequence[str], pathspecs: Sequence[str] = ()
+) -> Iterator[Tuple[str, List[Tuple[str, str]]]]:
+    """``iter_range_changes`` con un único ``git log --cc --name-status -z``."""
+    proc = repo.git.log(
+        "--stdin",
+        "--no-walk=unsorted",
+        "--cc",
+        "--name-status",
+        "-z",
+        f"--format={_COMMIT_MARKER}%H",
+        *_pathspec_args(pathspecs),
+        istream=subprocess.PIPE,
+        as_process=True,
+    )
+    proc.proc.stdin.write("\n".join(hexshas).encode("ascii") + b"\n")
+    proc.proc.stdin.close()
+
+    actual: Optional[str] = None
+    cambios: List[Tuple[str, str]] = []
+    estado: Optional[str] = None
+    rutas: List[str] = []
+
+    def cerrar_entrada() -> None:
+        nonlocal estado, rutas
+        if estado is not None:
+            cambio = _build_change(estado, rutas)
+            if cambio:
+                cambios.append(cambio)
+        estado = None
+        rutas = []
+
+    try:
+        for token in _iter_nul_tokens(proc.proc.stdout):
+            token = token.lstrip("\n")
+            if token.startswith(_COMMIT_MARKER):
+                cerrar_entrada()
+                if actual is not None:
+                    cambios.sort(key=lambda x: x[1])
+                    yield actual, cambios
+                actual = token[len(_COMMIT_MARKER):].strip()
+                cambios = []
+                continue
+
+            if not token:
+                continue
+
+            if estado is None:
+                estado = token
+                continue
+
+            rutas.append(token)
+            esperadas = 2 if estado.startswith(("R", "C")) else 1
+            if len(rutas) >= esperadas:
+                cerrar_entrada()
+
+        cerrar_entrada()
+        if actual is not None:
+            cambios.sort(key=lambda x: x[1])
+            yield actual, cambios
+    finally:
+        proc.proc.stdout.close()
+        proc.wait()
+
+
+def analyze_range_changes(
+    repo: git.Repo, commits: Iterable[git.objects.Commit], pathspecs: Sequence[str] = ()
+) -> Dict[str, List[Tuple[str, str]]]:
+    """Obtiene los archivos implicados en cada commit del rango en una sola pasada.
+
+    Devuelve el mismo mapeo ``{hexsha: [(tipo, path)]}`` que produciría
+    ``analyze_commit_changes`` commit a commit.
+    """
+    return dict(iter_range_changes(repo, commits, pathspecs))
+
+
+def _parse_numstat_entry(token: str) -> Tuple[Optional[str], LineStats]:
+    """Parsea una entrada ``--numstat -z`` (``añadidas\teliminadas\truta``).
+
+    Retorna (ruta, (añadidas, eliminadas)); la ruta es None en un renombrado,
+    cuyas rutas origen y destino llegan en los dos campos siguientes.
+    """
+    added, removed, path = token.split("\t", 2)
+    stats = (None, None) if added == "-" else (int(added), int(removed))
+    return (path or None), stats
+
+
+def _iter_numstat(tokens: Iterable[str]) -> Iterator[Tuple[Optional[str], str, LineStats]]:
+    """Genera (hexsha o None, ruta, estadísticas) a partir de los campos NUL de ``--numstat -z``.
+
+    El hexsha solo se informa si la salida lleva el marcador de commit de
+    ``git log --format=\x01%H``.
+    """
+    actual: Optional[str] = None
+    pendiente: Optional[LineStats] = None
+    rutas: List[str] = []
+
+    for token in tokens:
+        token = token.lstrip("\n")
+        if token.startswith(_COMMIT_MARKER):
+            actual = token[len(_COMMIT_MARKER):].strip()
+            pendiente, rutas = None, []
+            continue
+        if not token:
+            continue
+        if pendiente is not None:
+            rutas.append(token)
+            if len(rutas) == 2:
+                yield actual, rutas[1], pendiente
+                pendiente, rutas = None, []
+            continue
+        path, stats = _parse_numstat_entry(token)
+        if path is None:
+            pendiente = stats
+        else:
+            yield actual, path, stats
+
+
+def iter_range_numstat(
+    repo: git.Repo, commits: Iterable[git.objects.Commit], pathspecs: Sequence[str] = ()
+) -> Iterator[Tuple[str, Dict[str, LineStats]]]:
+    """Genera (hexsha, {ruta: (añadidas, eliminadas)}) de varios commits con un solo ``git log --numstat``.
+
+    Los merges se cuentan como en ``iter_range_changes`` (``--cc``).
+    """
+    ensure_gitpython()
+    hexshas = [c.hexsha for c in commits]
+    if not hexshas:
+        return
+
+    proc = repo.git.log(
+        "--stdin",
+        "--no-walk=unsorted",
+        "--cc",
+        "--numstat",
+        "-z",
+        f"--format={_COMMIT_MARKER}%H",
+        *_pathspec_args(pathspecs),
+        istream=subprocess.PIPE,
+        as_process=True,
+    )
+    proc.proc.stdin.write("\n".join(hexshas).encode("ascii") + b"\n")
+    proc.proc.stdin.close()
+
+    actual: Optional[str] = None
+    stats: Dict[str, LineStats] = {}
+    try:
+        for hexsha, path, lineas in _iter_numstat(_iter_nul_tokens(proc.proc.stdout)):
+            if hexsha != actual:
+                if actual is not None:
+                    yield actual, stats
+                actual, stats = hexsha, {}
+            stats[path] = lineas
+        if actual is not None:
+            yield actual, stats
+    finally:
+        proc.proc.stdout.close()
+        proc.wait()
+
+
+def get_commits_numstat(
+    repo: git.Repo, commits: Iterable[git.objects.Commit], pathspecs: Sequence[str] = ()
+) -> Dict[str, Dict[str, LineStats]]:
+    """Líneas añadidas/eliminadas por archivo de cada commit (commits sin cambios: dict vacío)."""
+    commits = list(commits)
+    resultado: Dict[str, Dict[str, LineStats]] = {c.hexsha: {} for c in commits}
+    resultado.update(iter_range_numstat(repo, commits, pathspecs))
+    return resultado
+
+
+def get_range_numstat(
+    repo: git.Repo,
+    origin: git.objects.Commit,
+    target: git.objects.Commit,
+    pathspecs: Sequence[str] = (),
+) -> Dict[str, LineStats]:
+    """Líneas añadidas/eliminadas por archivo entre dos commits (``git diff --numstat``), sin el patch."""
+    return dict(iter_diff_numstat(repo, origin, target, pathspecs))
+
+
+def iter_diff_numstat(
+    repo: git.Repo,
+    origin: git.objects.Commit,
+    target: git.objects.Commit,
+    pathspecs: Sequence[str] = (),
+) -> Iterator[Tuple[str, LineStats]]:
+    """Versión en streaming de ``get_range_numstat``: genera (ruta, líneas) según las emite Git."""
+    ensure_gitpython()
+    proc = repo.git.diff(
+        "--numstat", "-z", f"{origin.hexsha}..{target.hexsha}", *_pathspec_args(pathspecs), as_process=True
+    )
+    try:
+        for _, path, lineas in _iter_numstat(_iter_nul_tokens(proc.proc.stdout)):
+            yield path, lineas
+    finally:
+        proc.proc.stdout.close()
+        proc.wait()
+
+
 def classify_files_by_status(
-    repo: git.Repo, origin: git.objects.Commit, target: git.objects.Commit
+    repo: git.Repo,
+    origin: git.objects.Commit,
+    target: git.objects.Commit,
+    pathspecs: Sequence[str] = (),
 ) -> Dict[str, List[str]]:
     """Clasifica archivos afectados por tipo de cambio: creados/modificados/eliminados."""
     ensure_gitpython()
+    native = _native(repo, pathspecs) if origin.hexsha != target.hexsha else None
+    if native is not None:
+        try:
+            return native.classify_files(origin.hexsha, target.hexsha)
+        except Exception as e:
+            logger.debug("pygit2 falló al clasificar archivos, se usa git: %s", e)
+    paths = list(pathspecs) or None
     creados: set[str] = set()
     modificados: set[str] = set()
     eliminados: set[str] = set()
@@ -79,7 +420,7 @@ def classify_files_by_status(
     # Si origin y target son el mismo commit, mostrar los cambios de ese commit
     if origin.hexsha == target.hexsha:
         # Obtener los archivos cambiados en este commit específico
-        for d in origin.diff(origin.parents[0] if origin.parents else None):
+        for d in origin.diff(origin.parents[0] if origin.parents else None, paths=paths):
             if d.change_type == "A":
                 if d.b_path:
                     creados.add(d.b_path)
@@ -97,7 +438,7 @@ def classify_files_by_status(
         # Usar origin.diff(target) para mostrar cambios desde origin hacia target
         # "A" = archivos agregados en target (CREADOS)
         # "D" = archivos eliminados en target (ELIMINADOS)
-        diffs = list(origin.diff(target))
+        diffs = list(origin.diff(target, paths=paths))
         
         for d in diffs:
             if d.change_type == "A":
@@ -122,20 +463,163 @@ def classify_files_by_status(
 
 
 def get_commits_in_range(
-    repo: git.Repo, origin: git.objects.Commit, target: git.objects.Commit
-) -> List[git.objects.Commit]:
-    """Obtiene lista de commits entre origen (inclusivo) y destino (inclusivo)."""
+    repo: git.Repo,
+    origin: git.objects.Commit,
+    target: git.objects.Commit,
+    pathspecs: Sequence[str] = (),
+) -> List[CommitRecord]:
+    """Obtiene lista de commits entre origen (inclusivo) y destino (inclusivo).
+
+    Con ``pathspecs`` solo se incluyen los commits que tocan esas rutas
+    (el origen se incluye siempre).
+    """
+    return list(iter_commits_in_range(repo, origin, target, pathspecs))
+
+
+def iter_commits_in_range(
+    repo: git.Repo,
+    origin: git.objects.Commit,
+    target: git.objects.Commit,
+    pathspecs: Sequence[str] = (),
+) -> Iterator[CommitRecord]:
+    """Versión en streaming de ``get_commits_in_range`` (mismo orden: del más reciente al origen)."""
+    ensure_gitpython()
+    registros: Optional[Iterable[CommitRecord]] = None
+    native = _native(repo, pathspecs)
+    if native is not None:
+        try:
+            registros = native.commits_in_range(origin.hexsha, target.hexsha)
+        except Exception as e:
+            logger.debug("pygit2 falló al listar el rango, se usa git: %s", e)
+    if registros is None:
+        registros = iter_commit_records(repo, f"{origin.hexsha}..{target.hexsha}", *_pathspec_args(pathspecs))
+    ultimo: Optional[str] = None
+    for record in registros:
+        ultimo = record.hexsha
+        yield record
+    if ultimo != origin.hexsha:
+        yield CommitRecord.from_commit(origin)
+
+
+def get_new_commits(
+    repo: git.Repo,
+    since: git.objects.Commit,
+    target: git.objects.Commit,
+    pathspecs: Sequence[str] = (),
+) -> List[CommitRecord]:
+    """Obtiene los commits alcanzables desde destino que no lo son desde ``since`` (exclusivo)."""
+    ensure_gitpython()
+    return list(iter_commit_records(repo, f"{since.hexsha}..{target.hexsha}", *_pathspec_args(pathspecs)))
+
+
+def is_ancestor(repo: git.Repo, ancestor_hexsha: str, descendant_hexsha: str) -> bool:
+    """Indica si un commit es ancestro (o el mismo) de otro."""
+    git = ensure_gitpython()
+    try:
+        return repo.is_ancestor(ancestor_hexsha, descendant_hexsha)
+    except git.GitCommandError:
+        return False
+
+
+def get_changed_paths(
+    repo: git.Repo,
+    origin: git.objects.Commit,
+    target: git.objects.Commit,
+    pathspecs: Sequence[str] = (),
+) -> Set[str]:
+    """Rutas que cambian entre dos commits; un renombrado aporta la ruta antigua y la nueva."""
     ensure_gitpython()
-    commits = list(repo.iter_commits(f"{origin.hexsha}..{target.hexsha}"))
-    if not commits or commits[-1].hexsha != origin.hexsha:
-        commits.append(origin)
-    return commits
+    salida = repo.git.diff(
+        "--name-only", "--no-renames", "-z", f"{origin.hexsha}..{target.hexsha}", *_pathspec_args(pathspecs)
+    )
+    return {path for path in salida.split("\0") if path}
 
 
-def generate_diff(repo: git.Repo, origin: git.objects.Commit, target: git.objects.Commit) -> str:
+def get_renamed_paths(
+    repo: git.Repo,
+    origin: git.objects.Commit,
+    target: git.objects.Commit,
+    pathspecs: Sequence[str] = (),
+) -> List[Tuple[str, str]]:
+    """Pares (ruta antigua, ruta nueva) de los renombrados y copias que ve ``git diff``."""
+    ensure_gitpython()
+    salida = repo.git.diff(
+        "--name-status", "--diff-filter=RC", "-z", f"{origin.hexsha}..{target.hexsha}", *_pathspec_args(pathspecs)
+    )
+    tokens = [t for t in salida.split("\0") if t]
+    # Cada entrada son tres campos: estado (R100, C075...), ruta antigua y ruta nueva
+    return [(tokens[i + 1], tokens[i + 2]) for i in range(0, len(tokens) - 2, 3)]
+
+
+def generate_diff(
+    repo: git.Repo,
+    origin: git.objects.Commit,
+    target: git.objects.Commit,
+    pathspecs: Sequence[str] = (),
+) -> str:
     """Genera el texto diff completo entre dos commits."""
     ensure_gitpython()
-    return repo.git.diff(f"{origin.hexsha}..{target.hexsha}")
+    if _native(repo, pathspecs, patches=True) is not None:
+        texto = "".join(iter_diff_chunks(repo, origin, target))
+        # Como GitPython, sin el salto de línea final
+        return texto[:-1] if texto.endswith("\n") else texto
+    return repo.git.diff(f"{origin.hexsha}..{target.hexsha}", *_pathspec_args(pathspecs))
+
+
+def iter_diff_chunks(
+    repo: git.Repo,
+    origin: git.objects.Commit,
+    target: git.objects.Commit,
+    chunk_size: int = DIFF_CHUNK_SIZE,
+    pathspecs: Sequence[str] = (),
+) -> Iterator[str]:
+    """Genera el diff entre dos commits por bloques de texto, sin cargarlo entero en memoria."""
+    ensure_gitpython()
+    native = _native(repo, pathspecs, patches=True)
+    if native is not None:
+        try:
+            diff = native.range_diff(origin.hexsha, target.hexsha)
+        except Exception as e:
+            logger.debug("pygit2 falló al generar el diff, se usa git: %s", e)
+        else:
+            yield from _iter_native_diff_chunks(native, diff, chunk_size)
+            return
+
+    proc = repo.git.diff(f"{origin.hexsha}..{target.hexsha}", *_pathspec_args(pathspecs), as_process=True)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    try:
+        while True:
+            bloque = proc.proc.stdout.read(chunk_size)
+            if not bloque:
+                break
+            texto = decoder.decode(bloque)
+            if texto:
+                yield texto
+        resto = decoder.decode(b"", final=True)
+        if resto:
+            yield resto
+    finally:
+        proc.proc.stdout.close()
+        proc.wait()
+
+
+def _iter_native_diff_chunks(native: Pygit2Backend, diff, chunk_size: int) -> Iterator[str]:
+    """Agrupa los parches de pygit2 en bloques de texto de ``chunk_size`` bytes."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pendiente: List[bytes] = []
+    tamano = 0
+    for parche in native.iter_patches(diff):
+        pendiente.append(parche)
+        tamano += len(parche)
+        if tamano >= chunk_size:
+            texto = decoder.decode(b"".join(pendiente))
+            pendiente, tamano = [], 0
+            if texto:
+                yield texto
+    texto = decoder.decode(b"".join(pendiente), final=True)
+    if texto:
+        yield texto
 
 
 def get_commit_short_hash(commit: git.objects.Commit) -> str:
@@ -0,0 +1,122 @@
+"""Estado del modo incremental de Changelogger.
+
+Por cada commit de origen se guarda, junto a los Markdown generados
+(``.changelogger/.md/.state/<origen>.json``), el último destino procesado y los
+datos necesarios para regenerar el changelog: archivos por estado, commits con
+sus archivos (y sus líneas con ``--stats-only``), el ``.diff`` escrito y los
+análisis de IA de cada tramo. La
+siguiente ejecución solo analiza ``ultimo_destino..HEAD`` y fusiona el resultado.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+from .commit_metadata import CommitAuthor, CommitRecord
+from .git_operations import LineStats
+from .utils import ensure_directory_exists
+
+STATE_DIRNAME = ".state"
+
+STATE_VERSION = 1
+
+
+def get_state_path(md_dir: str, origin_hash: str, scope: Optional[str] = None) -> str:
+    """Ruta del archivo de estado incremental para un commit de origen.
+
+    Cada ``scope`` (filtro de rutas) tiene su propio estado.
+    """
+    nombre = f"{origin_hash}_{scope}" if scope else origin_hash
+    return os.path.join(md_dir, STATE_DIRNAME, f"{nombre}.json")
+
+
+def load_state(md_dir: str, origin_hash: str, scope: Optional[str] = None) -> Optional[Dict]:
+    """Carga el estado incremental del origen; None si no existe o no es válido."""
+    path = get_state_path(md_dir, origin_hash, scope)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            estado = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if estado.get("version") != STATE_VERSION or estado.get("origin") != origin_hash:
+        return None
+    return estado
+
+
+def save_state(
+    md_dir: str,
+    origin_hash: str,
+    target_hash: str,
+    md_path: str,
+    files_by_status: Dict[str, List[str]],
+    commits: List[CommitRecord],
+    files_by_commit: Dict[str, List[Tuple[str, str]]],
+    analyses: List[Dict[str, str]],
+    scope: Optional[str] = None,
+    diff_path: Optional[str] = None,
+    commit_stats: Optional[Dict[str, Dict[str, LineStats]]] = None,
+) -> None:
+    """Guarda el estado tras generar el changelog del rango origen..destino.
+
+    ``diff_path`` es el ``.diff`` del rango, que la siguiente ejecución
+    actualiza en lugar de regenerarlo (None con ``--stats-only``).
+    ``commit_stats`` son las líneas por archivo de cada commit (solo con
+    ``--stats-only``), para no volver a pedirlas a Git.
+    """
+    path = get_state_path(md_dir, origin_hash, scope)
+    ensure_directory_exists(os.path.dirname(path))
+    estado = {
+        "version": STATE_VERSION,
+        "origin": origin_hash,
+        "last_target": target_hash,
+        "md_path": md_path,
+        "diff_path": diff_path,
+        "files_by_status": files_by_status,
+        "commits": [
+            [
+                c.hexsha,
+                c.author.name,
+                c.author.email,
+                c.committed_date,
+                c.summary,
+                files_by_commit.get(c.hexsha, []),
+            ]
+            for c in commits
+        ],
+        "analyses": analyses,
+        "commit_stats": commit_stats or {},
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def state_commits(estado: Dict) -> Tuple[List[CommitRecord], Dict[str, List[Tuple[str, str]]]]:
+    """Reconstruye los commits y sus archivos guardados en el estado."""
+    commits: List[CommitRecord] = []
+    archivos: Dict[str, List[Tuple[str, str]]] = {}
+    for hexsha, nombre, email, fecha, summary, files in estado.get("commits", []):
+        commits.append(CommitRecord(hexsha, CommitAuthor(nombre, email), fecha, summary))
+        archivos[hexsha] = [(tipo, path) for tipo, path in files]
+    return commits, archivos
+
+
+def state_commit_stats(estado: Dict) -> Dict[str, Dict[str, LineStats]]:
+    """Líneas por archivo de los commits guardados en el estado (los que las tengan)."""
+    return {
+        hexsha: {path: (añadidas, eliminadas) for path, (añadidas, eliminadas) in archivos.items()}
+        for hexsha, archivos in estado.get("commit_stats", {}).items()
+    }
+
+
+def merge_files_by_status(
+    previos: Dict[str, List[str]], nuevos: Dict[str, List[str]]
+) -> Dict[str, List[str]]:
+    """Une los conjuntos de archivos por estado de dos tramos."""
+    return {
+        clave: sorted(set(previos.get(clave, [])) | set(nuevos.get(clave, [])))
+        for clave in ("creados", "modificados", "eliminados")
+    }
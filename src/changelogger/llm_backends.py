@@ -0,0 +1,467 @@
+"""Backends LLM intercambiables para el análisis con IA.
+
+El análisis no habla directamente con el SDK de OpenAI sino con un backend
+que expone ``complete()`` y ``close()``:
+
+- ``openai``: la API de OpenAI (``OPENAI_API_KEY``).
+- ``compatible``: cualquier endpoint compatible con OpenAI (gateway interno,
+  servidor local...) indicado en ``OPENAI_BASE_URL``; la API key es opcional.
+- ``fake``: simulación en proceso, sin red, con latencia, velocidad de
+  generación y tasa de errores configurables. ``start_fake_server()`` expone
+  la misma simulación por HTTP en localhost para probar el backend
+  ``compatible`` (``python -m changelogger.llm_backends``).
+
+El backend se elige con ``CHANGELOGGER_LLM_BACKEND`` (por defecto ``openai``).
+Además de ``complete()``, cada backend ofrece ``stream()``: un generador
+asíncrono con los fragmentos de texto a medida que llegan y, como último
+elemento, el ``Completion`` completo. Límites de ritmo, reintentos y timeouts
+se aplican por encima, en ``ai_client``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+if TYPE_CHECKING:  # pragma: no cover
+    from http.server import ThreadingHTTPServer
+
+from .utils import get_env_float, get_env_int
+
+BACKENDS = ("openai", "compatible", "fake")
+DEFAULT_BACKEND = "openai"
+
+# Valores por defecto de la simulación (backend ``fake``).
+DEFAULT_FAKE_LATENCY = 0.05
+DEFAULT_FAKE_COMPLETION_TOKENS = 60
+
+# Códigos HTTP con los que falla la simulación cuando se inyectan errores.
+_FAKE_ERROR_CODES = (429, 500, 503)
+
+
+def load_openai():
+    """Importa el SDK de OpenAI bajo demanda; retorna None si no está instalado.
+
+    ``openai`` arrastra httpx y pydantic, así que solo se importa cuando se va
+    a ejecutar el análisis con IA.
+    """
+    try:
+        import openai
+    except ModuleNotFoundError:
+        return None
+    return openai
+
+
+class LLMBackendError(Exception):
+    """Error de una petición al backend LLM.
+
+    ``status_code`` es el código HTTP si lo hay; ``transient`` marca errores
+    de red o timeouts sin código; ``retry_after`` son los segundos indicados
+    por el servidor (cabecera ``Retry-After``), si los hay.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        transient: bool = False,
+        retry_after: Optional[float] = None,
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.transient = transient
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        """Indica si conviene reintentar (429, 5xx, red o timeout)."""
+        if self.status_code is None:
+            return self.transient
+        return self.status_code == 429 or self.status_code >= 500
+
+
+class Completion:
+    """Respuesta de una petición de chat: texto, tokens consumidos y métricas.
+
+    ``ttft`` (segundos hasta el primer fragmento, None sin streaming) y
+    ``retries`` (reintentos necesarios) los rellena ``ai_client.AIClient``.
+    """
+
+    __slots__ = ("text", "prompt_tokens", "completion_tokens", "ttft", "retries")
+
+    def __init__(
+        self,
+        text: str,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+    ):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.ttft: Optional[float] = None
+        self.retries = 0
+
+
+def _retry_after(response) -> Optional[float]:
+    """Lee la cabecera ``Retry-After`` (en segundos) de una respuesta HTTP, si existe."""
+    valor = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+    try:
+        return float(valor) if valor else None
+    except ValueError:
+        return None
+
+
+class OpenAIBackend:
+    """Backend sobre ``openai.AsyncOpenAI``; con ``base_url`` sirve para endpoints compatibles.
+
+    Los reintentos propios del SDK se desactivan: los gestiona ``ai_client``.
+    """
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, timeout: Optional[float] = None):
+        self.openai = load_openai()
+        self.name = "compatible" if base_url else "openai"
+        # El SDK exige una API key aunque el endpoint compatible no la use.
+        self.client = self.openai.AsyncOpenAI(
+            api_key=api_key or "no-key",
+            base_url=base_url or None,
+            timeout=timeout,
+            max_retries=0,
+        )
+
+    def _translate_error(self, error: Exception) -> Optional[LLMBackendError]:
+        """Convierte los errores del SDK en ``LLMBackendError`` (None si no es del SDK)."""
+        if isinstance(error, self.openai.APIStatusError):
+            return LLMBackendError(str(error), error.status_code, retry_after=_retry_after(error.response))
+        if isinstance(error, (self.openai.APITimeoutError, self.openai.APIConnectionError)):
+            return LLMBackendError(str(error), transient=True)
+        return None
+
+    async def complete(
+        self, model: str, messages: List[Dict[str, str]], max_tokens: int, temperature: float
+    ) -> Completion:
+        """Envía una petición de chat y retorna la respuesta."""
+        try:
+            response = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+            )
+        except Exception as e:
+            error = self._translate_error(e)
+            if error is None:
+                raise
+            raise error from e
+
+        usage = getattr(response, "usage", None)
+        return Completion(
+            response.choices[0].message.content or "",
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", None),
+        )
+
+    async def stream(
+        self, model: str, messages: List[Dict[str, str]], max_tokens: int, temperature: float
+    ) -> AsyncIterator[Union[str, Completion]]:
+        """Envía una petición de chat en streaming (fragmentos y, al final, el ``Completion``)."""
+        extra = {}
+        if self.name == "openai":
+            # No todos los endpoints compatibles aceptan ``stream_options``.
+            extra["stream_options"] = {"include_usage": True}
+        partes: List[str] = []
+        usage = None
+        try:
+            respuesta = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                **extra,
+            )
+            async for chunk in respuesta:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        partes.append(delta)
+                        yield delta
+        except Exception as e:
+            error = self._translate_error(e)
+            if error is None:
+                raise
+            raise error from e
+
+        yield Completion(
+            "".join(partes),
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", None),
+        )
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+class FakeBackend:
+    """Simulación de un LLM sin red.
+
+    Cada petición tarda ``latency`` segundos más ``completion_tokens /
+    tokens_per_second`` (si ``tokens_per_second`` > 0) y falla con 429/500/503
+    con probabilidad ``error_rate``. La respuesta es determinista a partir del
+    prompt, así que también sirve con la caché de respuestas.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency: float = DEFAULT_FAKE_LATENCY,
+        tokens_per_second: float = 0.0,
+        error_rate: float = 0.0,
+        completion_tokens: int = DEFAULT_FAKE_COMPLETION_TOKENS,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.completion_tokens = completion_tokens
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def simulate(
+        self, messages: List[Dict[str, str]], max_tokens: int
+    ) -> Tuple[Completion, float, Optional[int]]:
+        """Calcula la respuesta simulada, su duración y el código de error inyectado (o None)."""
+        prompt_chars = sum(len(m.get("content") or "") for m in messages)
+        completion_tokens = min(max_tokens, self.completion_tokens)
+        duracion = self.latency
+        if self.tokens_per_second > 0:
+            duracion += completion_tokens / self.tokens_per_second
+
+        with self._lock:
+            falla = self.error_rate > 0 and self._random.random() < self.error_rate
+            codigo = self._random.choice(_FAKE_ERROR_CODES) if falla else None
+
+        texto = (
+            "- Resumen simulado del backend fake "
+            f"({prompt_chars} caracteres de prompt, {completion_tokens} tokens)"
+        )
+        return Completion(texto, prompt_chars // 4, completion_tokens), duracion, codigo
+
+    async def complete(
+        self, model: str, messages: List[Dict[str, str]], max_tokens: int, temperature: float
+    ) -> Completion:
+        """Simula una petición de chat."""
+        import asyncio
+
+        completion, duracion, codigo = self.simulate(messages, max_tokens)
+        await asyncio.sleep(duracion)
+        if codigo is not None:
+            raise LLMBackendError(f"Error simulado {codigo}", codigo)
+        return completion
+
+    def token_delay(self) -> float:
+        """Segundos entre fragmentos del streaming simulado."""
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    async def stream(
+        self, model: str, messages: List[Dict[str, str]], max_tokens: int, temperature: float
+    ) -> AsyncIterator[Union[str, Completion]]:
+        """Simula una petición en streaming: ``latency`` hasta el primer fragmento y luego uno por token."""
+        import asyncio
+
+        completion, _, codigo = self.simulate(messages, max_tokens)
+        await asyncio.sleep(self.latency)
+        if codigo is not None:
+            raise LLMBackendError(f"Error simulado {codigo}", codigo)
+        for parte in split_fake_text(completion.text, completion.completion_tokens):
+            yield parte
+            await asyncio.sleep(self.token_delay())
+        yield completion
+
+    async def close(self) -> None:
+        pass
+
+
+def split_fake_text(text: str, pieces: int) -> List[str]:
+    """Divide el texto simulado en ``pieces`` fragmentos para el streaming."""
+    pieces = max(1, min(pieces, len(text)))
+    tamano = -(-len(text) // pieces)
+    return [text[i:i + tamano] for i in range(0, len(text), tamano)]
+
+
+def load_backend_name() -> str:
+    """Retorna el backend configurado en ``CHANGELOGGER_LLM_BACKEND``."""
+    nombre = os.getenv("CHANGELOGGER_LLM_BACKEND", DEFAULT_BACKEND).strip().lower()
+    return nombre or DEFAULT_BACKEND
+
+
+def load_fake_backend() -> FakeBackend:
+    """Crea el backend ``fake`` con la configuración de ``CHANGELOGGER_FAKE_LLM_*``."""
+    semilla = os.getenv("CHANGELOGGER_FAKE_LLM_SEED", "").strip()
+    return FakeBackend(
+        latency=get_env_float("CHANGELOGGER_FAKE_LLM_LATENCY", DEFAULT_FAKE_LATENCY),
+        tokens_per_second=get_env_float("CHANGELOGGER_FAKE_LLM_TOKENS_PER_SECOND", 0.0),
+        error_rate=min(1.0, get_env_float("CHANGELOGGER_FAKE_LLM_ERROR_RATE", 0.0)),
+        completion_tokens=get_env_int(
+            "CHANGELOGGER_FAKE_LLM_COMPLETION_TOKENS", DEFAULT_FAKE_COMPLETION_TOKENS, minimum=1
+        ),
+        seed=int(semilla) if semilla.isdigit() else None,
+    )
+
+
+def check_backend(name: str, api_key: str) -> Optional[str]:
+    """Comprueba que el backend puede usarse; retorna el motivo si no, o None."""
+    if name not in BACKENDS:
+        return f"CHANGELOGGER_LLM_BACKEND desconocido: {name} (opciones: {', '.join(BACKENDS)})"
+    if name == "fake":
+        return None
+
+    if load_openai() is None:
+        return "OpenAI no está instalado"
+    if name == "compatible" and not os.getenv("OPENAI_BASE_URL", "").strip():
+        return "OPENAI_BASE_URL no está configurada"
+    if name == "openai" and not api_key.strip():
+        return "OPENAI_API_KEY no está configurada"
+    return None
+
+
+def create_backend(name: str, api_key: str, timeout: Optional[float] = None):
+    """Crea el backend indicado (ver ``BACKENDS``)."""
+    if name == "fake":
+        return load_fake_backend()
+    if name == "compatible":
+        return OpenAIBackend(api_key, os.getenv("OPENAI_BASE_URL", "").strip(), timeout)
+    # El SDK de OpenAI también respeta OPENAI_BASE_URL si está definida.
+    return OpenAIBackend(api_key, timeout=timeout)
+
+
+def start_fake_server(
+    backend: FakeBackend, host: str = "127.0.0.1", port: int = 0
+) -> ThreadingHTTPServer:
+    """Sirve ``backend`` en ``http://host:port/v1/chat/completions`` desde un hilo.
+
+    Con ``port=0`` se elige un puerto libre (``server.server_address[1]``).
+    La respuesta imita el formato de la API de chat de OpenAI, incluidos los
+    errores HTTP inyectados.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args) -> None:
+            pass
+
+        def responder(self, status: int, cuerpo: dict) -> None:
+            data = json.dumps(cuerpo).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def responder_stream(self, peticion: dict, completion: Completion) -> None:
+            """Envía la respuesta como eventos SSE (``chat.completion.chunk``)."""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+
+            def evento(choices: list, usage: Optional[dict] = None) -> None:
+                cuerpo = {
+                    "id": "fake-completion",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": peticion.get("model", "fake"),
+                    "choices": choices,
+                }
+                if usage is not None:
+                    cuerpo["usage"] = usage
+                self.wfile.write(b"data: " + json.dumps(cuerpo).encode("utf-8") + b"\n\n")
+                self.wfile.flush()
+
+            for parte in split_fake_text(completion.text, completion.completion_tokens):
+                evento([{"index": 0, "delta": {"role": "assistant", "content": parte}, "finish_reason": None}])
+                time.sleep(backend.token_delay())
+            evento([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            if (peticion.get("stream_options") or {}).get("include_usage"):
+                evento([], {
+                    "prompt_tokens": completion.prompt_tokens,
+                    "completion_tokens": completion.completion_tokens,
+                    "total_tokens": completion.prompt_tokens + completion.completion_tokens,
+                })
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def do_POST(self) -> None:
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.responder(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+                return
+            peticion = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            completion, duracion, codigo = backend.simulate(
+                peticion.get("messages", []), int(peticion.get("max_tokens") or 4000)
+            )
+            streaming = bool(peticion.get("stream"))
+            time.sleep(backend.latency if streaming else duracion)
+            if codigo is not None:
+                self.responder(codigo, {"error": {"message": f"Error simulado {codigo}", "type": "fake_error"}})
+                return
+            if streaming:
+                self.responder_stream(peticion, completion)
+                return
+            self.responder(200, {
+                "id": "fake-completion",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": peticion.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": completion.text},
+                }],
+                "usage": {
+                    "prompt_tokens": completion.prompt_tokens,
+                    "completion_tokens": completion.completion_tokens,
+                    "total_tokens": completion.prompt_tokens + completion.completion_tokens,
+                },
+            })
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Sirve el backend fake por HTTP hasta Ctrl+C."""
+    parser = argparse.ArgumentParser(
+        prog="python -m changelogger.llm_backends",
+        description="Servidor local compatible con OpenAI para pruebas de carga y latencia.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=DEFAULT_FAKE_LATENCY, help="segundos por petición")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="velocidad de generación (0 = instantánea)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="proporción de peticiones que fallan (0-1)")
+    parser.add_argument("--completion-tokens", type=int, default=DEFAULT_FAKE_COMPLETION_TOKENS)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    backend = FakeBackend(
+        args.latency, args.tokens_per_second, args.error_rate, args.completion_tokens, args.seed
+    )
+    server = start_fake_server(backend, args.host, args.port)
+    print(f"Backend fake en http://{args.host}:{server.server_address[1]}/v1 (Ctrl+C para salir)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
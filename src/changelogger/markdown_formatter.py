@@ -2,25 +2,54 @@
 
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+import io
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
+from .git_operations import LineStats
 from .utils import format_timestamp
 
 
-def format_file_list(title: str, files: List[str]) -> str:
-    """Formatea lista de archivos en Markdown."""
-    out: List[str] = []
-    out.append(f"- **{title}**")
-    if files:
-        for f in files:
-            out.append(f"  - {f}")
-    else:
-        out.append("  - Ninguno")
-    return "\n".join(out)
+def format_line_stats(stats: Optional[LineStats]) -> str:
+    """Sufijo con las líneas añadidas/eliminadas de un archivo (vacío si no hay datos)."""
+    if stats is None:
+        return ""
+    added, removed = stats
+    if added is None:
+        return " (binario)"
+    return f" (+{added} -{removed})"
+
+
+def format_file_list(
+    title: str, files: List[str], stats: Optional[Dict[str, LineStats]] = None
+) -> str:
+    """Formatea lista de archivos en Markdown (con sus líneas cambiadas si hay ``stats``)."""
+    return "\n".join(iter_file_list_lines(title, files, stats))
+
+
+def iter_file_list_lines(
+    title: str, files: Iterable[str], stats: Optional[Dict[str, LineStats]] = None
+) -> Iterator[str]:
+    """Genera las líneas de ``format_file_list`` una a una."""
+    yield f"- **{title}**"
+    vacia = True
+    for f in files:
+        vacia = False
+        yield f"  - {f}{format_line_stats(stats.get(f)) if stats else ''}"
+    if vacia:
+        yield "  - Ninguno"
 
 
-def format_commit_section(commit, files: List[Tuple[str, str]]) -> List[str]:
-    """Formatea la sección de un commit individual."""
+def format_total_stats(stats: Dict[str, LineStats]) -> str:
+    """Resumen tipo ``--shortstat``: archivos y líneas añadidas/eliminadas en total."""
+    added = sum(a for a, _ in stats.values() if a is not None)
+    removed = sum(r for a, r in stats.values() if a is not None)
+    return f"- **Total:** {len(stats)} archivos, +{added} -{removed} líneas"
+
+
+def format_commit_section(
+    commit, files: List[Tuple[str, str]], stats: Optional[Dict[str, LineStats]] = None
+) -> List[str]:
+    """Formatea la sección de un commit individual (con líneas cambiadas si hay ``stats``)."""
     lines: List[str] = []
     lines.append(f"- `{commit.hexsha[:7]}` | {format_timestamp(commit.committed_date)} | {commit.author.name}")
     lines.append(f"  - Mensaje: {commit.summary}")
@@ -28,7 +57,7 @@ def format_commit_section(commit, files: List[Tuple[str, str]]) -> List[str]:
     
     if files:
         for file_type, path in files:
-            lines.append(f"    - {file_type}: {path}")
+            lines.append(f"    - {file_type}: {path}{format_line_stats(stats.get(path)) if stats else ''}")
     else:
         lines.append("    - Ninguno")
     
@@ -48,50 +77,186 @@ def format_ai_section(ai_analysis: str) -> List[str]:
     return lines
 
 
-def format_changelog(
+def format_ai_history(analyses: List[Dict[str, str]]) -> str:
+    """Combina los análisis de IA de varios tramos (modo incremental), del más reciente al más antiguo."""
+    if len(analyses) == 1:
+        return analyses[0]["analysis"]
+
+    lines: List[str] = []
+    for entry in analyses:
+        lines.append(f"### {entry['origin'][:7]}..{entry['target'][:7]}")
+        lines.append("")
+        lines.append(entry["analysis"])
+        lines.append("")
+    return "\n".join(lines).rstrip()
+
+
+def format_path_scope(paths: Sequence[str]) -> str:
+    """Línea con las rutas incluidas y excluidas del changelog."""
+    incluidas = [p for p in paths if not p.startswith("!")]
+    excluidas = [p[1:] for p in paths if p.startswith("!")]
+    partes = []
+    if incluidas:
+        partes.append("solo " + ", ".join(f"`{p}`" for p in incluidas))
+    if excluidas:
+        partes.append("excluyendo " + ", ".join(f"`{p}`" for p in excluidas))
+    return f"**Rutas:** {'; '.join(partes)}"
+
+
+class MarkdownWriter:
+    """Escribe líneas Markdown en un flujo de texto según se generan.
+
+    Produce exactamente ``"\\n".join(lineas).rstrip() + "\\n"``: los espacios y
+    saltos de línea finales se retienen hasta saber si les sigue más texto.
+    """
+
+    def __init__(self, stream: IO[str]):
+        self.stream = stream
+        self._pending = ""
+
+    def write(self, text: str) -> None:
+        contenido = text.rstrip()
+        if contenido:
+            self.stream.write(self._pending)
+            self.stream.write(contenido)
+            self._pending = text[len(contenido):]
+        else:
+            self._pending += text
+
+    def line(self, text: str = "") -> None:
+        self.write(text + "\n")
+
+    def lines(self, lines: Iterable[str]) -> None:
+        for text in lines:
+            self.line(text)
+
+    def close(self) -> None:
+        """Termina el documento con un único salto de línea."""
+        self._pending = ""
+        self.stream.write("\n")
+
+
+def write_changelog(
+    stream: IO[str],
     origin_commit,
     target_commit,
     files_by_status: Dict[str, List[str]],
-    commits_in_range: List,
+    commits_in_range: Sequence,
     files_by_commit: Dict[str, List[Tuple[str, str]]],
     ai_analysis: str = None,
-) -> str:
-    """Genera el contenido Markdown estructurado en español."""
+    range_stats: Optional[Dict[str, LineStats]] = None,
+    commit_stats: Optional[Dict[str, Dict[str, LineStats]]] = None,
+    paths: Sequence[str] = (),
+) -> None:
+    """Escribe en ``stream`` el Markdown de ``format_changelog`` sección a sección.
+
+    No construye el documento en memoria: cada línea se escribe en cuanto se
+    genera, así que la memoria no crece con el número de commits y archivos.
+    """
+    out = MarkdownWriter(stream)
+    write_changelog_body(
+        out,
+        origin_commit,
+        target_commit,
+        files_by_status,
+        commits_in_range,
+        files_by_commit,
+        range_stats=range_stats,
+        commit_stats=commit_stats,
+        paths=paths,
+    )
+    write_ai_section(out, ai_analysis)
+
+
+def write_changelog_body(
+    out: MarkdownWriter,
+    origin_commit,
+    target_commit,
+    files_by_status: Dict[str, List[str]],
+    commits_in_range: Sequence,
+    files_by_commit: Dict[str, List[Tuple[str, str]]],
+    range_stats: Optional[Dict[str, LineStats]] = None,
+    commit_stats: Optional[Dict[str, Dict[str, LineStats]]] = None,
+    paths: Sequence[str] = (),
+) -> None:
+    """Escribe todo el changelog salvo el análisis de IA, que va al final.
+
+    Permite escribir el cuerpo mientras la IA sigue trabajando;
+    ``write_ai_section`` completa (y cierra) el documento.
+    """
     fecha_destino = format_timestamp(target_commit.committed_date)
 
-    out: List[str] = []
-    
     # Título principal
-    out.append(
+    out.line(
         f"# Cambios desde {origin_commit.hexsha[:7]} hasta {target_commit.hexsha[:7]} ({fecha_destino})"
     )
-    out.append("")
+    out.line()
+    if paths:
+        out.line(format_path_scope(paths))
+        out.line()
     
     # Sección de archivos afectados
-    out.append("## Archivos afectados")
-    out.append("")
+    out.line("## Archivos afectados")
+    out.line()
     
-    out.append(format_file_list("Creados", files_by_status.get("creados", [])))
-    out.append(format_file_list("Modificados", files_by_status.get("modificados", [])))
-    out.append(format_file_list("Eliminados", files_by_status.get("eliminados", [])))
-    out.append("")
+    out.lines(iter_file_list_lines("Creados", files_by_status.get("creados", []), range_stats))
+    out.lines(iter_file_list_lines("Modificados", files_by_status.get("modificados", []), range_stats))
+    out.lines(iter_file_list_lines("Eliminados", files_by_status.get("eliminados", []), range_stats))
+    if range_stats is not None:
+        out.line(format_total_stats(range_stats))
+    out.line()
     
     # Sección de commits
-    out.append("## Commits")
-    out.append("")
+    out.line("## Commits")
+    out.line()
     
     # Commits en orden cronológico inverso (más reciente primero)
     for commit in reversed(commits_in_range):
         commit_files = files_by_commit.get(commit.hexsha, [])
-        commit_lines = format_commit_section(commit, commit_files)
-        out.extend(commit_lines)
-    
-    # Sección de análisis con IA (si está disponible)
+        stats = commit_stats.get(commit.hexsha) if commit_stats else None
+        out.lines(format_commit_section(commit, commit_files, stats))
+
+
+def write_ai_section(out: MarkdownWriter, ai_analysis: Optional[str]) -> None:
+    """Escribe la sección de análisis con IA (si la hay) y cierra el documento."""
     if ai_analysis:
-        ai_lines = format_ai_section(ai_analysis)
-        out.extend(ai_lines)
-    
-    return "\n".join(out).rstrip() + "\n"
+        out.lines(format_ai_section(ai_analysis))
+
+    out.close()
+
+
+def format_changelog(
+    origin_commit,
+    target_commit,
+    files_by_status: Dict[str, List[str]],
+    commits_in_range: List,
+    files_by_commit: Dict[str, List[Tuple[str, str]]],
+    ai_analysis: str = None,
+    range_stats: Optional[Dict[str, LineStats]] = None,
+    commit_stats: Optional[Dict[str, Dict[str, LineStats]]] = None,
+    paths: Sequence[str] = (),
+) -> str:
+    """Genera el contenido Markdown estructurado en español.
+
+    ``range_stats`` (por archivo, del rango) y ``commit_stats`` (por commit y
+    archivo) añaden las líneas cambiadas a cada archivo listado. ``paths``
+    (filtro de rutas del usuario) se indica bajo el título. Para escribir
+    directamente en un archivo sin construir el texto, ver ``write_changelog``.
+    """
+    buffer = io.StringIO()
+    write_changelog(
+        buffer,
+        origin_commit,
+        target_commit,
+        files_by_status,
+        commits_in_range,
+        files_by_commit,
+        ai_analysis,
+        range_stats,
+        commit_stats,
+        paths,
+    )
+    return buffer.getvalue()
 
 
 def format_commit_selection_summary(origin_commit, target_commit) -> List[str]:
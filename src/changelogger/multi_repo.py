@@ -0,0 +1,323 @@
+"""Modo multi-repositorio: changelogs de muchos repositorios en paralelo.
+
+El trabajo de Git de cada repositorio (resolver rangos, volcar el diff y
+analizar los commits) se hace en un pool de procesos acotado. El proceso
+principal atiende en un único bucle asyncio el análisis de IA de cada rango en
+cuanto su repositorio termina, con un solo cliente LLM y un solo limitador de
+ritmo para todos, y escribe los Markdown y un índice agregado. El tiempo total
+queda acotado por el repositorio más lento y no por la suma.
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from .ai_analyzer import analyze_changes_shared, get_unavailable_message, load_openai_config
+from .ai_cache import open_ai_cache
+from .batch import DEFAULT_JOBS, resolve_ranges
+from .commit_metadata import close_metadata_reader
+from .git_operations import get_commit_record
+from .pipeline import PreparedRange, RunOptions, finish_changelog, iter_ai_diff, prepare_changelog
+from .utils import ensure_gitpython, format_timestamp
+
+# Nombre por defecto del índice agregado (en el directorio actual).
+DEFAULT_INDEX_NAME = "changelogger-index.md"
+
+
+@dataclass
+class RepoJob:
+    """Repositorio a procesar con sus rangos (``ORIGEN..DESTINO``) o últimas etiquetas."""
+
+    path: str
+    range_specs: Tuple[str, ...] = ()
+    last_tags: Optional[int] = None
+
+
+@dataclass
+class RangeOutcome:
+    """Resultado de un rango de un repositorio."""
+
+    origin_ref: str
+    target_ref: str
+    diff_path: Optional[str] = None
+    md_path: Optional[str] = None
+    commits: int = 0
+    files: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class RepoOutcome:
+    """Resultado de un repositorio: sus rangos o el error que impidió procesarlo."""
+
+    path: str
+    ranges: List[RangeOutcome] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def failed(self) -> int:
+        return (1 if self.error else 0) + sum(1 for r in self.ranges if r.error)
+
+
+def expand_repo_paths(patterns: Sequence[str]) -> List[str]:
+    """Expande rutas o globs de repositorios, sin duplicados y en orden estable.
+
+    Un patrón sin coincidencias se conserva tal cual para que su error se
+    informe al procesarlo.
+    """
+    rutas: List[str] = []
+    vistas = set()
+    for patron in patterns:
+        patron = os.path.expanduser(patron)
+        coincidencias = sorted(glob.glob(patron)) if glob.has_magic(patron) else [patron]
+        for ruta in coincidencias:
+            if glob.has_magic(patron) and not os.path.isdir(ruta):
+                continue
+            real = os.path.realpath(ruta)
+            if real not in vistas:
+                vistas.add(real)
+                rutas.append(ruta)
+    return rutas
+
+
+def parse_repos_file(path: str) -> List[Tuple[str, Tuple[str, ...]]]:
+    """Lee un archivo con una línea ``RUTA_O_GLOB [RANGO ...]`` por repositorio.
+
+    Las líneas vacías y las que empiezan por ``#`` se ignoran.
+    """
+    entradas: List[Tuple[str, Tuple[str, ...]]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for linea in f:
+            linea = linea.strip()
+            if not linea or linea.startswith("#"):
+                continue
+            partes = linea.split()
+            entradas.append((partes[0], tuple(partes[1:])))
+    return entradas
+
+
+def build_repo_jobs(
+    patterns: Sequence[str],
+    repos_file: Optional[str] = None,
+    range_specs: Sequence[str] = (),
+    last_tags: Optional[int] = None,
+) -> List[RepoJob]:
+    """Combina ``--repo`` y ``--repos-file`` en trabajos por repositorio.
+
+    Los rangos de una línea de ``repos_file`` sustituyen a los globales
+    (``range_specs``/``last_tags``) para esos repositorios.
+    """
+    entradas = [(patron, ()) for patron in patterns]
+    if repos_file:
+        entradas.extend(parse_repos_file(repos_file))
+
+    trabajos: List[RepoJob] = []
+    vistas = set()
+    for patron, rangos in entradas:
+        for ruta in expand_repo_paths([patron]):
+            real = os.path.realpath(ruta)
+            if real in vistas:
+                continue
+            vistas.add(real)
+            if rangos:
+                trabajos.append(RepoJob(ruta, rangos))
+            else:
+                trabajos.append(RepoJob(ruta, tuple(range_specs), last_tags))
+    return trabajos
+
+
+def prepare_repo(job: RepoJob, options: RunOptions) -> List[Tuple[str, str, object]]:
+    """Trabajo de Git de un repositorio (se ejecuta en un proceso del pool).
+
+    Retorna ``(origen, destino, PreparedRange o mensaje de error)`` por rango.
+    """
+    git = ensure_gitpython()
+    try:
+        repo = git.Repo(job.path)
+    except (git.NoSuchPathError, git.InvalidGitRepositoryError):
+        raise ValueError("no es un repositorio Git") from None
+    try:
+        resultados: List[Tuple[str, str, object]] = []
+        for origen, destino in resolve_ranges(repo, job.range_specs, job.last_tags, options.use_cache):
+            try:
+                commit_origen = get_commit_record(repo, origen)
+                commit_destino = get_commit_record(repo, destino)
+                if commit_origen is None or commit_destino is None:
+                    raise ValueError("referencia no encontrada")
+                resultados.append(
+                    (origen, destino, prepare_changelog(repo, commit_origen, commit_destino, options))
+                )
+            except Exception as e:
+                resultados.append((origen, destino, str(e) or type(e).__name__))
+        return resultados
+    finally:
+        close_metadata_reader(repo)
+        repo.close()
+
+
+async def _finish_range(
+    origen: str,
+    destino: str,
+    prepared: PreparedRange,
+    options: RunOptions,
+    client,
+    no_disponible: Optional[str],
+) -> RangeOutcome:
+    """Análisis de IA (cliente compartido) y Markdown de un rango ya preparado."""
+    analisis = None
+    if prepared.needs_ai:
+        analisis = no_disponible
+        if analisis is None:
+            repo = None
+            if prepared.base is not None:
+                # El diff del tramo incremental se lee del repositorio
+                repo = ensure_gitpython().Repo(prepared.repo_path)
+            ai_cache = open_ai_cache(prepared.repo_path) if options.use_cache else None
+            try:
+                analisis = await analyze_changes_shared(
+                    client,
+                    iter_ai_diff(repo, prepared),
+                    prepared.commits_summary,
+                    prepared.new_files_by_status,
+                    workers=options.ai_workers,
+                    cache=ai_cache,
+                )
+            finally:
+                if ai_cache is not None:
+                    ai_cache.close()
+                if repo is not None:
+                    repo.close()
+
+    diff_path, md_path = finish_changelog(prepared, analisis, options)
+    archivos = set()
+    for rutas in prepared.files_by_status.values():
+        archivos.update(rutas)
+    return RangeOutcome(
+        origen, destino, diff_path, md_path, commits=len(prepared.commits), files=len(archivos)
+    )
+
+
+async def _process_repo(
+    loop, pool, job: RepoJob, options: RunOptions, client, no_disponible: Optional[str]
+) -> RepoOutcome:
+    """Prepara un repositorio en el pool y termina sus rangos en el bucle principal."""
+    import asyncio
+
+    try:
+        preparados = await loop.run_in_executor(pool, prepare_repo, job, options)
+    except Exception as e:
+        return RepoOutcome(job.path, error=str(e) or type(e).__name__)
+
+    async def terminar(origen: str, destino: str, preparado) -> RangeOutcome:
+        if isinstance(preparado, str):
+            return RangeOutcome(origen, destino, error=preparado)
+        try:
+            return await _finish_range(origen, destino, preparado, options, client, no_disponible)
+        except Exception as e:
+            return RangeOutcome(origen, destino, error=str(e) or type(e).__name__)
+
+    rangos = await asyncio.gather(*(terminar(*p) for p in preparados))
+    if not rangos:
+        return RepoOutcome(job.path, error="no hay rangos que procesar")
+    return RepoOutcome(job.path, list(rangos))
+
+
+def print_repo_outcome(outcome: RepoOutcome) -> None:
+    """Muestra en consola el resultado de un repositorio según termina."""
+    if outcome.error:
+        print(f"❌ ERROR: {outcome.path}: {outcome.error}")
+        return
+    for rango in outcome.ranges:
+        etiqueta = f"{outcome.path}: {rango.origin_ref}..{rango.target_ref}"
+        if rango.error:
+            print(f"❌ ERROR: {etiqueta}: {rango.error}")
+            continue
+        print(f"✅ {etiqueta}")
+        if rango.diff_path:
+            print(f"- Diff: {rango.diff_path}")
+        print(f"- Markdown: {rango.md_path}")
+
+
+async def run_repos_async(
+    jobs: Sequence[RepoJob], options: RunOptions, workers: int = DEFAULT_JOBS
+) -> List[RepoOutcome]:
+    """Procesa todos los repositorios y retorna sus resultados en el orden de ``jobs``."""
+    import asyncio
+
+    from .ai_client import create_ai_client
+
+    loop = asyncio.get_running_loop()
+    no_disponible = get_unavailable_message() if not options.stats_only else None
+    client = None
+    if not options.stats_only and no_disponible is None:
+        client = create_ai_client(load_openai_config()[0])
+
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+            tareas = [
+                asyncio.ensure_future(_process_repo(loop, pool, job, options, client, no_disponible))
+                for job in jobs
+            ]
+            for siguiente in asyncio.as_completed(tareas):
+                print_repo_outcome(await siguiente)
+            return [tarea.result() for tarea in tareas]
+    finally:
+        if client is not None:
+            await client.close()
+
+
+def format_repo_index(outcomes: Sequence[RepoOutcome], index_dir: str) -> str:
+    """Markdown del índice agregado con un enlace al changelog de cada rango."""
+    rangos = sum(len(o.ranges) for o in outcomes)
+    out: List[str] = []
+    out.append(
+        f"# Changelogs de {len(outcomes)} repositorios "
+        f"({format_timestamp(datetime.now().timestamp())})"
+    )
+    out.append("")
+    out.append(f"- **Rangos:** {rangos}")
+    out.append(f"- **Fallidos:** {sum(o.failed for o in outcomes)}")
+    out.append("")
+    out.append("| Repositorio | Rango | Commits | Archivos | Changelog |")
+    out.append("|---|---|---|---|---|")
+    for outcome in outcomes:
+        nombre = os.path.basename(os.path.normpath(outcome.path)) or outcome.path
+        if outcome.error:
+            out.append(f"| {nombre} | - | - | - | ❌ {outcome.error} |")
+            continue
+        for rango in outcome.ranges:
+            etiqueta = f"`{rango.origin_ref}..{rango.target_ref}`"
+            if rango.error:
+                out.append(f"| {nombre} | {etiqueta} | - | - | ❌ {rango.error} |")
+                continue
+            enlace = os.path.relpath(rango.md_path, index_dir).replace(os.sep, "/")
+            out.append(
+                f"| {nombre} | {etiqueta} | {rango.commits} | {rango.files} "
+                f"| [{os.path.basename(rango.md_path)}]({enlace}) |"
+            )
+    return "\n".join(out) + "\n"
+
+
+def run_multi_repo(
+    jobs: Sequence[RepoJob],
+    options: Optional[RunOptions] = None,
+    workers: int = DEFAULT_JOBS,
+    index_path: str = DEFAULT_INDEX_NAME,
+) -> int:
+    """Genera los changelogs de todos los repositorios y el índice; retorna los fallidos."""
+    import asyncio
+
+    options = replace(options or RunOptions(), md_with_origin=True, stream_ai=False)
+    outcomes = asyncio.run(run_repos_async(jobs, options, workers))
+
+    index_path = os.path.abspath(index_path)
+    with open(index_path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(format_repo_index(outcomes, os.path.dirname(index_path)))
+    print(f"📇 Índice: {index_path}")
+
+    return sum(o.failed for o in outcomes)
@@ -0,0 +1,266 @@
+"""Exportación estructurada del changelog en NDJSON (un objeto JSON por línea).
+
+Cada registro lleva un campo ``type``:
+
+- ``range``: origen, destino, filtro de rutas y si hay estadísticas de líneas.
+- ``commit``: un registro por commit (sha, autor, fecha, resumen y archivos con
+  su tipo de cambio y, con estadísticas, sus líneas añadidas/eliminadas), en el
+  mismo orden que ``get_commits_in_range``.
+- ``files``: archivos creados/modificados/eliminados del rango y sus líneas.
+- ``analysis``: análisis de IA por tramo (si lo hay).
+
+``iter_range_records`` genera el flujo directamente desde Git por lotes de
+commits, con memoria acotada aunque el rango tenga cientos de miles de commits;
+``iter_changelog_records`` lo genera a partir de los datos ya calculados por el
+pipeline. El Markdown se puede reconstruir del flujo con
+``format_changelog_from_records``.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from datetime import datetime, timezone
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .commit_metadata import CommitAuthor, CommitRecord
+from .git_operations import (
+    LineStats,
+    build_pathspecs,
+    get_commit_record,
+    get_commits_numstat,
+    get_range_numstat,
+    iter_commits_in_range,
+    iter_range_changes,
+)
+from .markdown_formatter import format_ai_history, format_changelog
+
+RECORD_VERSION = 1
+
+# Commits cuyos archivos se consultan a Git en cada invocación de ``git log``.
+RECORD_BATCH_SIZE = 1000
+
+_STATUS_KEYS = {"Creado": "creados", "Modificado": "modificados", "Eliminado": "eliminados"}
+
+
+def commit_to_dict(commit) -> Dict:
+    """Metadatos de un commit (``CommitRecord`` o commit de GitPython) como dict JSON."""
+    return {
+        "sha": commit.hexsha,
+        "author": commit.author.name,
+        "email": commit.author.email,
+        "committed_date": commit.committed_date,
+        "date": datetime.fromtimestamp(commit.committed_date, timezone.utc).isoformat(),
+        "summary": commit.summary,
+    }
+
+
+def commit_from_dict(data: Dict) -> CommitRecord:
+    """Reconstruye el ``CommitRecord`` de un registro."""
+    return CommitRecord(
+        data["sha"],
+        CommitAuthor(data["author"], data.get("email", "")),
+        data["committed_date"],
+        data["summary"],
+    )
+
+
+def range_record(origin, target, paths: Sequence[str] = (), with_stats: bool = False) -> Dict:
+    return {
+        "type": "range",
+        "version": RECORD_VERSION,
+        "origin": commit_to_dict(origin),
+        "target": commit_to_dict(target),
+        "paths": list(paths),
+        "stats": with_stats,
+    }
+
+
+def commit_record(
+    commit, files: List[Tuple[str, str]], stats: Optional[Dict[str, LineStats]] = None
+) -> Dict:
+    """Registro de un commit; con ``stats`` cada archivo lleva ``added``/``removed``.
+
+    En archivos binarios ambos valores son ``null``.
+    """
+    archivos = []
+    for status, path in files:
+        archivo = {"status": status, "path": path}
+        if stats is not None and path in stats:
+            archivo["added"], archivo["removed"] = stats[path]
+        archivos.append(archivo)
+    return {"type": "commit", **commit_to_dict(commit), "files": archivos}
+
+
+def files_record(
+    files_by_status: Dict[str, List[str]], range_stats: Optional[Dict[str, LineStats]] = None
+) -> Dict:
+    return {
+        "type": "files",
+        "files_by_status": files_by_status,
+        "stats": {path: list(lineas) for path, lineas in range_stats.items()} if range_stats is not None else None,
+    }
+
+
+def analysis_record(analyses: List[Dict[str, str]]) -> Dict:
+    return {"type": "analysis", "analyses": analyses}
+
+
+def iter_changelog_records(
+    origin_commit,
+    target_commit,
+    files_by_status: Dict[str, List[str]],
+    commits_in_range: List,
+    files_by_commit: Dict[str, List[Tuple[str, str]]],
+    analyses: Optional[List[Dict[str, str]]] = None,
+    range_stats: Optional[Dict[str, LineStats]] = None,
+    commit_stats: Optional[Dict[str, Dict[str, LineStats]]] = None,
+    paths: Sequence[str] = (),
+) -> Iterator[Dict]:
+    """Genera los registros a partir de los mismos datos que recibe ``format_changelog``."""
+    yield range_record(origin_commit, target_commit, paths, range_stats is not None)
+    for commit in commits_in_range:
+        stats = commit_stats.get(commit.hexsha, {}) if commit_stats is not None else None
+        yield commit_record(commit, files_by_commit.get(commit.hexsha, []), stats)
+    yield files_record(files_by_status, range_stats)
+    if analyses:
+        yield analysis_record(analyses)
+
+
+def iter_range_records(
+    repo,
+    origin_commit,
+    target_commit,
+    paths: Sequence[str] = (),
+    with_stats: bool = False,
+    batch_size: int = RECORD_BATCH_SIZE,
+) -> Iterator[Dict]:
+    """Genera los registros del rango leyendo Git en streaming, sin análisis de IA.
+
+    Los commits se leen con un único ``git log`` y sus archivos (y líneas, con
+    ``with_stats``) se piden por lotes de ``batch_size``, así que la memoria
+    depende del lote y del número de archivos distintos, no del de commits.
+    """
+    pathspecs = build_pathspecs(paths)
+    yield range_record(origin_commit, target_commit, paths, with_stats)
+
+    por_estado: Dict[str, set] = {clave: set() for clave in _STATUS_KEYS.values()}
+
+    def emitir(lote: List[CommitRecord]) -> Iterator[Dict]:
+        cambios = dict(iter_range_changes(repo, lote, pathspecs))
+        lineas = get_commits_numstat(repo, lote, pathspecs) if with_stats else None
+        for commit in lote:
+            archivos = cambios.get(commit.hexsha, [])
+            for status, path in archivos:
+                if status in _STATUS_KEYS:
+                    por_estado[_STATUS_KEYS[status]].add(path)
+            yield commit_record(commit, archivos, lineas.get(commit.hexsha) if lineas is not None else None)
+
+    lote: List[CommitRecord] = []
+    for commit in iter_commits_in_range(repo, origin_commit, target_commit, pathspecs):
+        lote.append(commit)
+        if len(lote) >= batch_size:
+            yield from emitir(lote)
+            lote = []
+    if lote:
+        yield from emitir(lote)
+
+    range_stats = get_range_numstat(repo, origin_commit, target_commit, pathspecs) if with_stats else None
+    yield files_record({clave: sorted(rutas) for clave, rutas in por_estado.items()}, range_stats)
+
+
+def write_ndjson(stream: IO[str], records: Iterable[Dict]) -> int:
+    """Escribe los registros como NDJSON según se generan; retorna cuántos se escribieron."""
+    total = 0
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        total += 1
+    return total
+
+
+def write_ndjson_file(path: str, records: Iterable[Dict]) -> int:
+    """Escribe los registros en un archivo ``.ndjson`` UTF-8."""
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        return write_ndjson(f, records)
+
+
+def export_ranges(
+    repo,
+    ranges: Sequence[Tuple[str, str]],
+    stream: IO[str],
+    paths: Sequence[str] = (),
+    with_stats: bool = False,
+) -> int:
+    """Escribe en ``stream`` el flujo de cada rango, uno tras otro; retorna los rangos fallidos.
+
+    Los errores van a stderr para no mezclarse con el NDJSON.
+    """
+    fallidos = 0
+    for origen, destino in ranges:
+        commit_origen = get_commit_record(repo, origen)
+        commit_destino = get_commit_record(repo, destino)
+        if commit_origen is None or commit_destino is None:
+            fallidos += 1
+            print(f"❌ ERROR: {origen}..{destino}: referencia no encontrada", file=sys.stderr)
+            continue
+        write_ndjson(stream, iter_range_records(repo, commit_origen, commit_destino, paths, with_stats))
+        stream.flush()
+    return fallidos
+
+
+def read_ndjson(stream: IO[str]) -> Iterator[Dict]:
+    """Lee perezosamente los registros de un flujo NDJSON."""
+    for linea in stream:
+        linea = linea.strip()
+        if linea:
+            yield json.loads(linea)
+
+
+def format_changelog_from_records(records: Iterable[Dict]) -> str:
+    """Reconstruye el Markdown de ``format_changelog`` a partir del flujo de registros."""
+    origen = destino = None
+    paths: Sequence[str] = ()
+    con_stats = False
+    commits: List[CommitRecord] = []
+    files_by_commit: Dict[str, List[Tuple[str, str]]] = {}
+    commit_stats: Dict[str, Dict[str, LineStats]] = {}
+    files_by_status: Dict[str, List[str]] = {}
+    range_stats: Optional[Dict[str, LineStats]] = None
+    analyses: List[Dict[str, str]] = []
+
+    for record in records:
+        tipo = record.get("type")
+        if tipo == "range":
+            origen = commit_from_dict(record["origin"])
+            destino = commit_from_dict(record["target"])
+            paths = record.get("paths") or ()
+            con_stats = bool(record.get("stats"))
+        elif tipo == "commit":
+            commit = commit_from_dict(record)
+            commits.append(commit)
+            files_by_commit[commit.hexsha] = [(f["status"], f["path"]) for f in record["files"]]
+            if con_stats:
+                commit_stats[commit.hexsha] = {
+                    f["path"]: (f["added"], f["removed"]) for f in record["files"] if "added" in f
+                }
+        elif tipo == "files":
+            files_by_status = record["files_by_status"]
+            if record.get("stats") is not None:
+                range_stats = {path: tuple(lineas) for path, lineas in record["stats"].items()}
+        elif tipo == "analysis":
+            analyses = record["analyses"]
+
+    if origen is None or destino is None:
+        raise ValueError("el flujo no contiene un registro 'range'")
+
+    return format_changelog(
+        origen,
+        destino,
+        files_by_status,
+        commits,
+        files_by_commit,
+        ai_analysis=format_ai_history(analyses) if analyses else None,
+        range_stats=range_stats,
+        commit_stats=commit_stats if con_stats else None,
+        paths=paths,
+    )
@@ -0,0 +1,104 @@
+"""Ejecución de las fases de un rango como grafo de dependencias.
+
+Cada fase declara las fases de las que depende y recibe sus resultados como
+argumentos. ``PhaseGraph.run`` lanza cada fase en un pool de hilos en cuanto
+terminan sus dependencias, de modo que las independientes (volcar el diff a
+disco, listar y analizar los commits, contar líneas) se solapan. El trabajo
+pesado son procesos ``git`` y peticiones de red, que no retienen el GIL.
+Con ``--cprofile`` o ``--tracemalloc`` las fases se ejecutan en serie en el
+hilo que llama a ``run`` (ver ``profiling``).
+"""
+
+from __future__ import annotations
+
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .profiling import phase, serial_phases_required
+
+logger = logging.getLogger(__name__)
+
+# Fases que se ejecutan a la vez como máximo dentro de un rango.
+DEFAULT_PHASE_WORKERS = 4
+
+
+@dataclass
+class Phase:
+    """Fase del grafo: ``func`` recibe los resultados de ``deps`` en ese orden."""
+
+    name: str
+    func: Callable[..., Any]
+    deps: Tuple[str, ...] = ()
+
+
+class PhaseGraph:
+    """Grafo de fases de un rango; ``label`` etiqueta las fases en el perfil."""
+
+    def __init__(self, label: str = "") -> None:
+        self.label = label
+        self._phases: Dict[str, Phase] = {}
+
+    def add(self, name: str, func: Callable[..., Any], deps: Tuple[str, ...] = ()) -> None:
+        """Añade una fase; sus dependencias deben añadirse antes (evita ciclos)."""
+        if name in self._phases:
+            raise ValueError(f"fase duplicada: {name}")
+        faltan = [d for d in deps if d not in self._phases]
+        if faltan:
+            raise ValueError(f"la fase {name} depende de fases desconocidas: {', '.join(faltan)}")
+        self._phases[name] = Phase(name, func, tuple(deps))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._phases
+
+    def _run_phase(self, fase: Phase, args: Tuple[Any, ...]) -> Any:
+        with phase(fase.name, self.label):
+            return fase.func(*args)
+
+    def _run_serial(self) -> Dict[str, Any]:
+        """Ejecuta las fases una tras otra en el hilo actual (en orden de ``add``)."""
+        resultados: Dict[str, Any] = {}
+        for nombre, fase in self._phases.items():
+            resultados[nombre] = self._run_phase(fase, tuple(resultados[d] for d in fase.deps))
+        return resultados
+
+    def run(self, workers: int = DEFAULT_PHASE_WORKERS) -> Dict[str, Any]:
+        """Ejecuta todas las fases y retorna ``{nombre: resultado}``.
+
+        Si una fase falla no se lanzan más, se espera a las que estén en curso
+        y se propaga la primera excepción.
+        """
+        if serial_phases_required():
+            return self._run_serial()
+        pendientes = dict(self._phases)
+        resultados: Dict[str, Any] = {}
+        en_curso: Dict[Future, str] = {}
+        error: Optional[BaseException] = None
+
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="changelogger-phase") as pool:
+
+            def lanzar_listas() -> None:
+                for nombre, fase in list(pendientes.items()):
+                    if all(d in resultados for d in fase.deps):
+                        del pendientes[nombre]
+                        args = tuple(resultados[d] for d in fase.deps)
+                        en_curso[pool.submit(self._run_phase, fase, args)] = nombre
+
+            lanzar_listas()
+            while en_curso:
+                hechas, _ = wait(list(en_curso), return_when=FIRST_COMPLETED)
+                for futuro in hechas:
+                    nombre = en_curso.pop(futuro)
+                    try:
+                        resultados[nombre] = futuro.result()
+                    except BaseException as e:
+                        logger.debug("Fase %s fallida: %s", nombre, e)
+                        if error is None:
+                            error = e
+                if error is None:
+                    lanzar_listas()
+
+        if error is not None:
+            raise error
+        return resultados
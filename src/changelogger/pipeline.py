@@ -0,0 +1,598 @@
+"""Pipeline de generación de changelog para un rango de commits."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import IO, Dict, Iterator, List, Optional, Set, Tuple
+
+from .ai_analyzer import analyze_changes_with_gpt
+from .ai_cache import open_ai_cache
+from .artifact_store import (
+    is_diff_reference,
+    iter_file_patches,
+    merge_diff_reference,
+    merge_file_patches,
+    write_diff_reference,
+)
+from .commit_cache import load_commit_changes, open_commit_cache
+from .commit_metadata import CommitRecord
+from .file_operations import (
+    ensure_output_structure,
+    get_ndjson_path,
+    get_output_paths,
+    get_repository_working_path,
+    iter_diff_file,
+    write_diff_stream,
+)
+from .git_operations import (
+    build_pathspecs,
+    get_changed_paths,
+    get_commit_record,
+    get_commits_in_range,
+    get_commits_numstat,
+    get_new_commits,
+    get_range_numstat,
+    get_renamed_paths,
+    is_ancestor,
+    iter_diff_chunks,
+)
+from .incremental import load_state, merge_files_by_status, save_state, state_commit_stats, state_commits
+from .markdown_formatter import MarkdownWriter, format_ai_history, write_ai_section, write_changelog_body
+from .ndjson_export import iter_changelog_records, write_ndjson_file
+from .phase_graph import PhaseGraph
+from .prefetch import PrefetchedData
+from .profiling import phase
+from .utils import slugify
+
+
+@dataclass
+class RunOptions:
+    """Opciones de una ejecución del pipeline."""
+
+    use_cache: bool = True
+    ai_workers: Optional[int] = None
+    # Incluir el origen en el nombre del .md (modo batch: varios rangos por destino)
+    md_with_origin: bool = False
+    # Procesar solo los commits nuevos desde la última ejecución con el mismo origen
+    incremental: bool = False
+    # Mostrar en consola el análisis de la IA a medida que llega (modo interactivo)
+    stream_ai: bool = False
+    # Solo estadísticas de líneas (--numstat): sin .diff ni análisis de IA
+    stats_only: bool = False
+    # Patrones de rutas (``!`` delante excluye) a los que se limita el changelog
+    paths: Tuple[str, ...] = ()
+    # Escribir también el export NDJSON (``.ndjson`` junto al ``.md``)
+    ndjson: bool = False
+    # Guardar el diff en el almacén comprimido y deduplicado (el .diff es una referencia)
+    compress_diffs: bool = False
+
+
+def path_scope(paths: Tuple[str, ...]) -> Optional[str]:
+    """Sufijo de los archivos de salida para un filtro de rutas (None sin filtro).
+
+    Combina un slug legible con un hash corto de los patrones, para que
+    filtros distintos con el mismo slug (``a`` y ``!a``) no se pisen.
+    """
+    if not paths:
+        return None
+    huella = hashlib.sha1("\0".join(paths).encode("utf-8")).hexdigest()[:6]
+    return f"{slugify(' '.join(paths))[:40]}-{huella}"
+
+
+def _echo_token(texto: str) -> None:
+    """Escribe en consola un fragmento del análisis de la IA según llega."""
+    print(texto, end="", flush=True)
+
+
+def consolidate_files_by_status(
+    files_by_commit: Dict[str, List[Tuple[str, str]]]
+) -> Dict[str, List[str]]:
+    """Agrupa los archivos de todos los commits en creados/modificados/eliminados."""
+    todos_creados: set[str] = set()
+    todos_modificados: set[str] = set()
+    todos_eliminados: set[str] = set()
+
+    for commit_files in files_by_commit.values():
+        for file_type, path in commit_files:
+            if file_type == "Creado":
+                todos_creados.add(path)
+            elif file_type == "Modificado":
+                todos_modificados.add(path)
+            elif file_type == "Eliminado":
+                todos_eliminados.add(path)
+
+    return {
+        "creados": sorted(todos_creados),
+        "modificados": sorted(todos_modificados),
+        "eliminados": sorted(todos_eliminados),
+    }
+
+
+@dataclass
+class PreparedRange:
+    """Trabajo de Git ya hecho para un rango, a falta del análisis de IA y del Markdown.
+
+    Solo contiene datos serializables, así que puede prepararse en otro
+    proceso (modo multi-repositorio) y terminarse en el principal.
+    """
+
+    repo_path: str
+    diff_dir: str
+    md_dir: str
+    origin: CommitRecord
+    target: CommitRecord
+    scope: Optional[str]
+    pathspecs: List[str]
+    # None en modo --stats-only
+    diff_path: Optional[str]
+    # Último destino procesado (modo incremental) y su estado guardado
+    base: Optional[CommitRecord]
+    estado: Optional[Dict]
+    # Commits y archivos del tramo nuevo, que son los que analiza la IA
+    commits_summary: str
+    new_files_by_status: Dict[str, List[str]]
+    needs_ai: bool
+    # Rango completo (fusionado con el estado en modo incremental)
+    commits: List[CommitRecord] = field(default_factory=list)
+    files_by_status: Dict[str, List[str]] = field(default_factory=dict)
+    files_by_commit: Dict[str, List[Tuple[str, str]]] = field(default_factory=dict)
+    range_stats: Optional[Dict] = None
+    commit_stats: Optional[Dict] = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.origin.hexsha[:7]}..{self.target.hexsha[:7]}"
+
+
+# Rutas del tramo nuevo a partir de las cuales el .diff incremental se regenera entero.
+INCREMENTAL_DIFF_MAX_PATHS = 2000
+
+
+def _incremental_diff_paths(repo, prepared: PreparedRange) -> Optional[Set[str]]:
+    """Rutas cuyo parche en ``origen..destino`` puede diferir del de ``origen..base``.
+
+    Son las que cambian en ``base..destino`` más, por cierre, las parejas de los
+    renombrados que las implican en ambos diffs (un renombrado se regenera
+    entero). None si son demasiadas para pasarlas como pathspecs.
+    """
+    rutas = get_changed_paths(repo, prepared.base, prepared.target, prepared.pathspecs)
+    if len(rutas) > INCREMENTAL_DIFF_MAX_PATHS:
+        return None
+    if not rutas:
+        return rutas
+    parejas = get_renamed_paths(repo, prepared.origin, prepared.base, prepared.pathspecs)
+    parejas += get_renamed_paths(repo, prepared.origin, prepared.target, prepared.pathspecs)
+    cambiado = True
+    while cambiado:
+        cambiado = False
+        for antigua, nueva in parejas:
+            if (antigua in rutas) != (nueva in rutas):
+                rutas.update((antigua, nueva))
+                cambiado = True
+    return rutas if len(rutas) <= INCREMENTAL_DIFF_MAX_PATHS else None
+
+
+def _update_diff(repo, prepared: PreparedRange, diff_previo: str, compress: bool) -> bool:
+    """Modo incremental: escribe el ``.diff`` del rango a partir del de la ejecución anterior.
+
+    Solo se pide a Git el parche (``origen..destino``) de las rutas que toca el
+    tramo nuevo y se fusiona con los del ``.diff`` anterior. Retorna False si
+    hay que regenerarlo entero.
+    """
+    rutas = _incremental_diff_paths(repo, prepared)
+    if rutas is None:
+        return False
+    chunks: Iterator[str] = iter(())
+    if rutas:
+        literales = [f":(literal){ruta}" for ruta in sorted(rutas)]
+        chunks = iter_diff_chunks(repo, prepared.origin, prepared.target, pathspecs=literales)
+    if compress and is_diff_reference(diff_previo):
+        merge_diff_reference(prepared.diff_path, diff_previo, chunks, rutas)
+        return True
+    fusion = merge_file_patches(iter_file_patches(iter_diff_file(diff_previo)), iter_file_patches(chunks), rutas)
+    if compress:
+        write_diff_reference(prepared.diff_path, fusion)
+    else:
+        write_diff_stream(prepared.diff_path, fusion)
+    return True
+
+
+def _plan_changelog(
+    repo,
+    commit_origen,
+    commit_destino,
+    options: RunOptions,
+    prefetch: Optional[PrefetchedData] = None,
+) -> Tuple[PreparedRange, PhaseGraph]:
+    """Prepara el rango y el grafo con las fases de Git que lo completan.
+
+    Las fases independientes (diff a disco, lista de commits y, con
+    estadísticas, líneas del rango) arrancan a la vez. Cada fase rellena
+    campos distintos del ``PreparedRange`` y las dependencias ordenan las que
+    comparten datos. ``generate_changelog`` añade al mismo grafo la IA y el
+    Markdown.
+    """
+    commit_origen = CommitRecord.from_commit(commit_origen)
+    commit_destino = CommitRecord.from_commit(commit_destino)
+    pathspecs = build_pathspecs(options.paths)
+    scope = path_scope(options.paths)
+    if prefetch is not None and not prefetch.applies_to(commit_destino.hexsha, pathspecs):
+        prefetch = None
+
+    # Preparar estructura de salida
+    base_repo = get_repository_working_path(repo)
+    diff_dir, md_dir = ensure_output_structure(base_repo)
+    diff_path, _ = get_output_paths(
+        diff_dir,
+        md_dir,
+        commit_origen.hexsha,
+        commit_destino.hexsha,
+        commit_destino.summary,
+        datetime.fromtimestamp(commit_destino.committed_date),
+        options.md_with_origin,
+        scope,
+    )
+
+    # Modo incremental: partir del último destino procesado para este origen
+    estado = load_state(md_dir, commit_origen.hexsha, scope) if options.incremental else None
+    base = None
+    if estado is not None and is_ancestor(repo, estado["last_target"], commit_destino.hexsha):
+        base = get_commit_record(repo, estado["last_target"])
+        print(f"🔁 Modo incremental: analizando solo {base.hexsha[:7]}..{commit_destino.hexsha[:7]}")
+
+    prepared = PreparedRange(
+        repo_path=base_repo,
+        diff_dir=diff_dir,
+        md_dir=md_dir,
+        origin=commit_origen,
+        target=commit_destino,
+        scope=scope,
+        pathspecs=pathspecs,
+        diff_path=None if options.stats_only else diff_path,
+        base=base,
+        estado=estado,
+        commits_summary="",
+        new_files_by_status={},
+        needs_ai=False,
+    )
+    graph = PhaseGraph(prepared.label)
+
+    def volcar_diff() -> None:
+        diff_previo = estado.get("diff_path") if base is not None else None
+        if diff_previo and os.path.isfile(diff_previo):
+            if diff_previo == diff_path:
+                return  # mismo destino: el .diff ya está al día
+            if _update_diff(repo, prepared, diff_previo, options.compress_diffs):
+                return
+        # Volcar el diff a disco en streaming (memoria acotada)
+        chunks = iter_diff_chunks(repo, commit_origen, commit_destino, pathspecs=pathspecs)
+        if options.compress_diffs:
+            write_diff_reference(diff_path, chunks)
+        else:
+            write_diff_stream(diff_path, chunks)
+
+    def listar_commits() -> List[CommitRecord]:
+        if base is not None:
+            return get_new_commits(repo, base, commit_destino, pathspecs)
+        if prefetch is not None and commit_origen.hexsha in prefetch.ranges:
+            return list(prefetch.ranges[commit_origen.hexsha])
+        return get_commits_in_range(repo, commit_origen, commit_destino, pathspecs)
+
+    def analizar_commits(commits_rango: List[CommitRecord]) -> None:
+        # Los commits ya vistos en ejecuciones anteriores salen de la caché.
+        cache = open_commit_cache(base_repo) if options.use_cache and not pathspecs else None
+        try:
+            commits_rango, archivos_por_commit = load_commit_changes(
+                repo, commits_rango, cache, pathspecs, known=prefetch.changes if prefetch else None
+            )
+        finally:
+            if cache is not None:
+                cache.close()
+
+        # Consolidar todos los archivos de todos los commits
+        archivos_por_estado = consolidate_files_by_status(archivos_por_commit)
+
+        # Preparar resumen de commits para análisis de IA
+        prepared.commits_summary = "\n".join([
+            f"- {c.hexsha[:7]} | {c.summary}" 
+            for c in commits_rango
+        ])
+        prepared.new_files_by_status = archivos_por_estado
+        # En modo incremental solo se analiza el diff del tramo nuevo.
+        prepared.needs_ai = not options.stats_only and bool(commits_rango or base is None)
+
+        # Fusionar el tramo nuevo con lo ya procesado
+        if base is not None:
+            commits_previos, archivos_previos = state_commits(estado)
+            archivos_por_estado = merge_files_by_status(
+                estado["files_by_status"], archivos_por_estado
+            )
+            archivos_previos.update(archivos_por_commit)
+            archivos_por_commit = archivos_previos
+            commits_rango = commits_rango + commits_previos
+
+        prepared.commits = commits_rango
+        prepared.files_by_status = archivos_por_estado
+        prepared.files_by_commit = archivos_por_commit
+
+    # Líneas añadidas/eliminadas del rango y de cada commit, sin leer el patch
+    def lineas_rango() -> None:
+        prepared.range_stats = _load_range_stats(repo, commit_origen, commit_destino, pathspecs, prefetch)
+
+    def lineas_commits(commits_rango: List[CommitRecord]) -> None:
+        # Solo necesita la lista de commits: va en paralelo con su análisis
+        if base is None:
+            prepared.commit_stats = _load_commit_stats(repo, commits_rango, pathspecs, prefetch)
+            return
+        # Modo incremental: las líneas de los commits ya procesados salen del estado
+        previas = state_commit_stats(estado)
+        faltan = [c for c in state_commits(estado)[0] if c.hexsha not in previas]
+        commit_stats = _load_commit_stats(repo, commits_rango + faltan, pathspecs, prefetch)
+        commit_stats.update(previas)
+        prepared.commit_stats = commit_stats
+
+    if not options.stats_only:
+        graph.add("diff_generation", volcar_diff)
+    graph.add("commit_range", listar_commits)
+    graph.add("commit_analysis", analizar_commits, ("commit_range",))
+    if options.stats_only:
+        graph.add("range_stats", lineas_rango)
+        graph.add("line_stats", lineas_commits, ("commit_range",))
+    return prepared, graph
+
+
+def prepare_changelog(
+    repo,
+    commit_origen,
+    commit_destino,
+    options: Optional[RunOptions] = None,
+    prefetch: Optional[PrefetchedData] = None,
+) -> PreparedRange:
+    """Hace todo el trabajo de Git del rango: diff a disco, commits y archivos.
+
+    No llama a la IA ni escribe el Markdown (ver ``finish_changelog``). Lo que
+    haya en ``prefetch`` para este destino y filtro de rutas no se recalcula.
+    """
+    prepared, graph = _plan_changelog(repo, commit_origen, commit_destino, options or RunOptions(), prefetch)
+    graph.run()
+    return prepared
+
+
+def _load_range_stats(
+    repo,
+    commit_origen: CommitRecord,
+    commit_destino: CommitRecord,
+    pathspecs: List[str],
+    prefetch: Optional[PrefetchedData],
+) -> Dict:
+    """Líneas por archivo del rango, o las del precálculo si las hay."""
+    if prefetch is not None and prefetch.with_stats and commit_origen.hexsha in prefetch.range_stats:
+        return prefetch.range_stats[commit_origen.hexsha]
+    return get_range_numstat(repo, commit_origen, commit_destino, pathspecs)
+
+
+def _load_commit_stats(
+    repo, commits: List[CommitRecord], pathspecs: List[str], prefetch: Optional[PrefetchedData]
+) -> Dict:
+    """Líneas por archivo de cada commit; solo se piden a Git las que no estén precalculadas."""
+    conocidas = prefetch.commit_stats if prefetch is not None and prefetch.with_stats else {}
+    nuevas = get_commits_numstat(repo, [c for c in commits if c.hexsha not in conocidas], pathspecs)
+    return {
+        c.hexsha: conocidas[c.hexsha] if c.hexsha in conocidas else nuevas[c.hexsha] for c in commits
+    }
+
+
+def iter_ai_diff(repo, prepared: PreparedRange) -> Iterator[str]:
+    """Diff que se envía a la IA: el tramo nuevo en modo incremental o el ``.diff`` escrito."""
+    if prepared.base is not None:
+        return iter_diff_chunks(repo, prepared.base, prepared.target, pathspecs=prepared.pathspecs)
+    return iter_diff_file(prepared.diff_path)
+
+
+def _merge_analyses(prepared: PreparedRange, ai_analysis: Optional[str]) -> List[Dict[str, str]]:
+    """Historial de análisis: el del tramo nuevo delante de los guardados (modo incremental)."""
+    analyses = list(prepared.estado["analyses"]) if prepared.base is not None else []
+    if ai_analysis is not None:
+        origen_ia = prepared.base if prepared.base is not None else prepared.origin
+        analyses.insert(0, {
+            "origin": origen_ia.hexsha,
+            "target": prepared.target.hexsha,
+            "analysis": ai_analysis,
+        })
+    return analyses
+
+
+def _markdown_path(prepared: PreparedRange, options: RunOptions) -> str:
+    _, md_path = get_output_paths(
+        prepared.diff_dir,
+        prepared.md_dir,
+        prepared.origin.hexsha,
+        prepared.target.hexsha,
+        prepared.target.summary,
+        datetime.fromtimestamp(prepared.target.committed_date),
+        options.md_with_origin,
+        prepared.scope,
+    )
+    return md_path
+
+
+def _write_markdown_body(stream: IO[str], prepared: PreparedRange, options: RunOptions) -> MarkdownWriter:
+    """Escribe el Markdown salvo el análisis de IA; retorna el escritor para completarlo."""
+    out = MarkdownWriter(stream)
+    write_changelog_body(
+        out,
+        prepared.origin,
+        prepared.target,
+        prepared.files_by_status,
+        prepared.commits,
+        prepared.files_by_commit,
+        range_stats=prepared.range_stats,
+        commit_stats=prepared.commit_stats,
+        paths=options.paths,
+    )
+    return out
+
+
+def _write_side_outputs(
+    prepared: PreparedRange, md_path: str, analyses: List[Dict[str, str]], options: RunOptions
+) -> None:
+    """Export NDJSON y estado incremental, una vez escrito el Markdown."""
+    estado = prepared.estado
+    if options.ndjson:
+        write_ndjson_file(
+            get_ndjson_path(md_path),
+            iter_changelog_records(
+                prepared.origin,
+                prepared.target,
+                prepared.files_by_status,
+                prepared.commits,
+                prepared.files_by_commit,
+                analyses=analyses,
+                range_stats=prepared.range_stats,
+                commit_stats=prepared.commit_stats,
+                paths=options.paths,
+            ),
+        )
+
+    if options.incremental:
+        save_state(
+            prepared.md_dir,
+            prepared.origin.hexsha,
+            prepared.target.hexsha,
+            md_path,
+            prepared.files_by_status,
+            prepared.commits,
+            prepared.files_by_commit,
+            analyses,
+            prepared.scope,
+            prepared.diff_path,
+            prepared.commit_stats,
+        )
+        # El Markdown y el .diff anteriores del mismo origen quedan sustituidos por
+        # los nuevos. De un .diff comprimido solo se borra la referencia: los
+        # parches pueden compartirse y los recoge ``--gc``.
+        if estado:
+            md_anterior = estado.get("md_path")
+            if md_anterior and md_anterior != md_path and os.path.isfile(md_anterior):
+                os.remove(md_anterior)
+            diff_anterior = estado.get("diff_path")
+            if (
+                prepared.diff_path
+                and diff_anterior
+                and diff_anterior != prepared.diff_path
+                and os.path.isfile(diff_anterior)
+            ):
+                os.remove(diff_anterior)
+
+
+def finish_changelog(
+    prepared: PreparedRange, ai_analysis: Optional[str], options: Optional[RunOptions] = None
+) -> Tuple[Optional[str], str]:
+    """Escribe el Markdown (y el estado incremental) de un rango preparado.
+
+    ``ai_analysis`` es el análisis del tramo nuevo, o None si no se pidió.
+    """
+    options = options or RunOptions()
+    etiqueta = prepared.label
+    analyses = _merge_analyses(prepared, ai_analysis)
+    md_path = _markdown_path(prepared, options)
+
+    # Generar el Markdown con análisis de IA directamente en el archivo (el diff ya está en disco)
+    with phase("markdown_formatting", etiqueta):
+        with open(md_path, "w", encoding="utf-8", newline="\n") as f:
+            out = _write_markdown_body(f, prepared, options)
+            write_ai_section(out, format_ai_history(analyses) if analyses else None)
+
+    with phase("file_writes", etiqueta):
+        _write_side_outputs(prepared, md_path, analyses, options)
+
+    return prepared.diff_path, md_path
+
+
+def generate_changelog(
+    repo,
+    commit_origen,
+    commit_destino,
+    options: Optional[RunOptions] = None,
+    prefetch: Optional[PrefetchedData] = None,
+) -> Tuple[Optional[str], str]:
+    """Genera el par ``.diff``/``.md`` del rango origen..destino y retorna sus rutas.
+
+    Con ``options.stats_only`` no se genera el diff (su ruta es None) ni el
+    análisis de IA; el Markdown lleva las líneas cambiadas por archivo.
+
+    Todo el rango es un único grafo de fases: el diff a disco y el análisis de
+    los commits van a la vez, la IA arranca en cuanto tiene el diff, los
+    commits y los archivos, y el cuerpo del Markdown (que no depende de la IA)
+    se escribe mientras la petición está en curso.
+    """
+    options = options or RunOptions()
+    prepared, graph = _plan_changelog(repo, commit_origen, commit_destino, options, prefetch)
+    md_path = _markdown_path(prepared, options)
+    abiertos: List[IO[str]] = []
+
+    def analizar_ia(*_) -> Optional[str]:
+        # Analizar cambios con ChatGPT (las peticiones repetidas salen de la caché).
+        if not prepared.needs_ai:
+            return None
+        ai_cache = open_ai_cache(prepared.repo_path) if options.use_cache else None
+        try:
+            ai_analysis = analyze_changes_with_gpt(
+                iter_ai_diff(repo, prepared), 
+                prepared.commits_summary, 
+                prepared.new_files_by_status,
+                workers=options.ai_workers,
+                cache=ai_cache,
+                on_token=_echo_token if options.stream_ai else None,
+            )
+            if options.stream_ai:
+                print()
+            return ai_analysis
+        finally:
+            if ai_cache is not None:
+                ai_cache.close()
+
+    def escribir_cuerpo(*_) -> MarkdownWriter:
+        f = open(md_path, "w", encoding="utf-8", newline="\n")
+        abiertos.append(f)
+        return _write_markdown_body(f, prepared, options)
+
+    def escribir_ia(out: MarkdownWriter, ai_analysis: Optional[str]) -> List[Dict[str, str]]:
+        analyses = _merge_analyses(prepared, ai_analysis)
+        write_ai_section(out, format_ai_history(analyses) if analyses else None)
+        abiertos.pop().close()
+        return analyses
+
+    # En modo incremental la IA lee el diff del tramo nuevo de Git, no el .diff
+    deps_ia = ("commit_analysis",)
+    if "diff_generation" in graph and prepared.base is None:
+        deps_ia += ("diff_generation",)
+    deps_cuerpo = ("commit_analysis",)
+    if options.stats_only:
+        deps_cuerpo += ("range_stats", "line_stats")
+
+    graph.add("markdown_formatting", escribir_cuerpo, deps_cuerpo)
+    if options.stats_only:
+        graph.add("markdown_ai", lambda out: escribir_ia(out, None), ("markdown_formatting",))
+    else:
+        graph.add("ai_analysis", analizar_ia, deps_ia)
+        graph.add("markdown_ai", escribir_ia, ("markdown_formatting", "ai_analysis"))
+    # El estado incremental sustituye al .diff anterior, que puede seguir leyéndose
+    deps_salidas = ("markdown_ai",)
+    if "diff_generation" in graph:
+        deps_salidas += ("diff_generation",)
+    graph.add(
+        "file_writes",
+        lambda analyses, *_: _write_side_outputs(prepared, md_path, analyses, options),
+        deps_salidas,
+    )
+    try:
+        graph.run()
+    finally:
+        for f in abiertos:
+            f.close()
+
+    return prepared.diff_path, md_path
@@ -0,0 +1,252 @@
+"""Precálculo especulativo mientras el selector de commits está abierto.
+
+Mientras el usuario navega, un hilo en segundo plano calcula con Git los
+datos por commit que el pipeline necesitará para los candidatos visibles y el
+resaltado: archivos afectados (name-status), metadatos del rango y, con
+``--stats-only``, líneas por commit y del rango. Tras confirmar, el pipeline
+reutiliza lo ya calculado (``PrefetchedData``) y solo pide a Git lo que falte.
+
+El trabajo va por lotes pequeños y se reordena cada vez que cambia la vista:
+primero el rango del commit resaltado (cuando deja de moverse) y después los
+commits desde el destino hasta el último visible, hasta un máximo de
+``CHANGELOGGER_PREFETCH_MAX_COMMITS`` posiciones del historial.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Set
+
+from .commit_cache import CommitChanges, open_commit_cache
+from .commit_index import CommitIndex
+from .commit_metadata import CommitRecord
+from .file_operations import get_repository_working_path
+from .git_operations import (
+    LineStats,
+    analyze_range_changes,
+    get_commit_record,
+    get_commits_numstat,
+    iter_commits_in_range,
+    iter_diff_numstat,
+)
+from .utils import get_env_int
+
+if TYPE_CHECKING:  # pragma: no cover
+    import git
+
+logger = logging.getLogger(__name__)
+
+# Posiciones del historial (desde el destino) que se precalculan como máximo.
+DEFAULT_PREFETCH_MAX_COMMITS = 5000
+
+# Commits por invocación de Git; acota lo que hay que esperar al confirmar.
+PREFETCH_BATCH = 256
+
+# Segundos que el commit resaltado debe quedarse quieto antes de calcular su rango.
+HIGHLIGHT_DELAY = 0.25
+
+# Rangos de commits resaltados que se conservan.
+_MAX_RANGES = 8
+
+# Segundos que ``stop`` espera al hilo; después retorna lo calculado hasta entonces.
+STOP_TIMEOUT = 2.0
+
+
+def get_prefetch_max_commits() -> int:
+    """Lee el límite de CHANGELOGGER_PREFETCH_MAX_COMMITS (0 desactiva el precálculo)."""
+    return get_env_int("CHANGELOGGER_PREFETCH_MAX_COMMITS", DEFAULT_PREFETCH_MAX_COMMITS)
+
+
+@dataclass
+class PrefetchedData:
+    """Resultados del precálculo para un destino y un filtro de rutas concretos."""
+
+    target: str
+    pathspecs: List[str]
+    with_stats: bool
+    changes: Dict[str, CommitChanges] = field(default_factory=dict)
+    commit_stats: Dict[str, Dict[str, LineStats]] = field(default_factory=dict)
+    # Por SHA de origen: commits del rango origen..destino y sus líneas
+    ranges: Dict[str, List[CommitRecord]] = field(default_factory=dict)
+    range_stats: Dict[str, Dict[str, LineStats]] = field(default_factory=dict)
+
+    def applies_to(self, target_hexsha: str, pathspecs: Sequence[str]) -> bool:
+        """Indica si los datos sirven para un rango hacia ``target_hexsha`` con ``pathspecs``."""
+        return self.target == target_hexsha and list(pathspecs) == self.pathspecs
+
+
+class CommitPrefetcher:
+    """Hilo que precalcula los datos de los candidatos que muestra el selector.
+
+    ``focus`` se llama desde la UI con las posiciones visibles y la resaltada
+    (en ``index``); ``stop`` espera al lote en curso y retorna lo calculado.
+    """
+
+    def __init__(
+        self,
+        repo: git.Repo,
+        index: CommitIndex,
+        target: CommitRecord,
+        pathspecs: Sequence[str] = (),
+        with_stats: bool = False,
+        use_cache: bool = True,
+        max_commits: int = DEFAULT_PREFETCH_MAX_COMMITS,
+    ) -> None:
+        self.repo = repo
+        self.index = index
+        self.target = target
+        self.max_commits = max_commits
+        self.use_cache = use_cache and not pathspecs
+        self.data = PrefetchedData(target.hexsha, list(pathspecs), with_stats)
+        self._cacheados: Set[str] = set()
+        self._cond = threading.Condition()
+        self._visible_max = -1
+        self._resaltado: Optional[int] = None
+        self._resaltado_desde = 0.0
+        self._barrido = 0
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "CommitPrefetcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="changelogger-prefetch", daemon=True)
+            self._thread.start()
+        return self
+
+    def focus(self, visible: Sequence[int], highlighted: Optional[int] = None) -> None:
+        """Actualiza los candidatos de interés (barato: se llama en cada repintado)."""
+        with self._cond:
+            visible_max = max(visible, default=-1)
+            if highlighted is not None:
+                visible_max = max(visible_max, highlighted)
+            cambio = visible_max > self._visible_max or highlighted != self._resaltado
+            if highlighted != self._resaltado:
+                self._resaltado = highlighted
+                self._resaltado_desde = time.monotonic()
+            self._visible_max = max(self._visible_max, visible_max)
+            if cambio:
+                self._cond.notify_all()
+
+    def stop(self) -> PrefetchedData:
+        """Detiene el hilo y retorna los datos calculados.
+
+        El rango en curso se abandona en cuanto se pide parar; si aun así el
+        hilo no termina en ``STOP_TIMEOUT`` segundos (un lote de Git lento), se
+        retorna una copia de lo calculado y el hilo acaba por su cuenta.
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        data = self.data
+        if self._thread is not None:
+            self._thread.join(STOP_TIMEOUT)
+            if self._thread.is_alive():
+                logger.debug("Precálculo: el hilo sigue ocupado, se usa lo calculado hasta ahora")
+                data = replace(
+                    data,
+                    changes=dict(data.changes),
+                    commit_stats=dict(data.commit_stats),
+                    ranges=dict(data.ranges),
+                    range_stats=dict(data.range_stats),
+                )
+        logger.debug(
+            "Precálculo: %d commits analizados, %d en caché, %d rangos",
+            len(data.changes), len(self._cacheados), len(data.ranges),
+        )
+        return data
+
+    def _run(self) -> None:
+        cache = open_commit_cache(get_repository_working_path(self.repo)) if self.use_cache else None
+        try:
+            while True:
+                with self._cond:
+                    if self._stopped:
+                        return
+                    resaltado = self._resaltado
+                    quieto = time.monotonic() - self._resaltado_desde >= HIGHLIGHT_DELAY
+                    visible_max = self._visible_max
+                if self._step(cache, resaltado if quieto else None, visible_max):
+                    continue
+                with self._cond:
+                    if not self._stopped:
+                        # Reintentar al cumplirse el retardo del resaltado o al cambiar la vista
+                        self._cond.wait(HIGHLIGHT_DELAY if resaltado is not None and not quieto else None)
+        except Exception as e:
+            logger.debug("Precálculo interrumpido: %s", e)
+        finally:
+            if cache is not None:
+                cache.close()
+
+    def _step(self, cache, resaltado: Optional[int], visible_max: int) -> bool:
+        """Procesa el siguiente lote de trabajo; retorna False si no queda nada pendiente."""
+        if resaltado is not None and resaltado < min(self.max_commits, len(self.index)):
+            hexsha = self.index.fields(resaltado)[0]
+            rango = self.data.ranges.get(hexsha)
+            if rango is None:
+                # El registro del índice lleva el asunto de ``%s``; el rango
+                # necesita el mismo origen que resolverá el pipeline
+                origen = get_commit_record(self.repo, hexsha)
+                if origen is not None:
+                    self._load_range(origen)
+                return True
+            faltan = [c for c in rango if not self._known(c.hexsha)][:PREFETCH_BATCH]
+            if faltan:
+                self._analyze(cache, faltan)
+                return True
+
+        fin = min(visible_max + 1, self.max_commits, len(self.index))
+        if self._barrido < fin:
+            lote = [self.index.get(i) for i in range(self._barrido, min(fin, self._barrido + PREFETCH_BATCH))]
+            self._barrido += len(lote)
+            self._analyze(cache, [c for c in lote if not self._known(c.hexsha)])
+            return True
+        return False
+
+    def _known(self, hexsha: str) -> bool:
+        if self.data.with_stats and hexsha not in self.data.commit_stats:
+            return False
+        return hexsha in self.data.changes or hexsha in self._cacheados
+
+    def _load_range(self, origen: CommitRecord) -> None:
+        """Metadatos (y líneas, con estadísticas) del rango origen..destino.
+
+        Se lee en streaming y se abandona, sin guardar nada, si se pide parar.
+        """
+        pathspecs = self.data.pathspecs
+        commits: List[CommitRecord] = []
+        for record in iter_commits_in_range(self.repo, origen, self.target, pathspecs):
+            if self._stopped:
+                return
+            commits.append(record)
+        if self.data.with_stats:
+            lineas: Dict[str, LineStats] = {}
+            for path, stats in iter_diff_numstat(self.repo, origen, self.target, pathspecs):
+                if self._stopped:
+                    return
+                lineas[path] = stats
+            self.data.range_stats[origen.hexsha] = lineas
+        self.data.ranges[origen.hexsha] = commits
+        while len(self.data.ranges) > _MAX_RANGES:
+            descartado = next(iter(self.data.ranges))
+            del self.data.ranges[descartado]
+            self.data.range_stats.pop(descartado, None)
+
+    def _analyze(self, cache, commits: List[CommitRecord]) -> None:
+        """Archivos (y líneas, con estadísticas) de un lote; lo que ya está en caché no se recalcula."""
+        if not commits:
+            return
+        pendientes = commits
+        if cache is not None:
+            cacheados = cache.get_many([c.hexsha for c in commits])
+            self._cacheados.update(cacheados)
+            pendientes = [c for c in commits if c.hexsha not in cacheados]
+        pathspecs = self.data.pathspecs
+        if pendientes:
+            cambios = analyze_range_changes(self.repo, pendientes, pathspecs)
+            for c in pendientes:
+                self.data.changes[c.hexsha] = cambios.get(c.hexsha, [])
+        if self.data.with_stats:
+            self.data.commit_stats.update(get_commits_numstat(self.repo, commits, pathspecs))
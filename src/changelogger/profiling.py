@@ -0,0 +1,204 @@
+"""Instrumentación por fases y perfilado de Changelogger (``--profile``).
+
+Mide el tiempo de reloj de cada fase del pipeline (detección del repositorio,
+listado de commits, diff, análisis por commit, IA, Markdown y escritura), la
+memoria y los datos de cada petición a la IA (latencia, tiempo hasta el primer
+token y tokens). Sin un perfilador activo todas las funciones son no-ops.
+
+La memoria por fase (``tracemalloc``) es global del proceso y ``--cprofile``
+solo perfila el hilo principal, así que con cualquiera de los dos las fases de
+un rango y los rangos del modo batch se ejecutan en serie en el hilo que los
+lanza (``serial_phases_required``); los tiempos por fase son entonces los de
+una ejecución sin solapamiento.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None  # type: ignore[assignment]
+
+
+def _max_rss_mb() -> Optional[float]:
+    """Pico de memoria residente del proceso (MB), si la plataforma lo permite."""
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa en KB y macOS en bytes.
+    return round(maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 2)
+
+
+class Profiler:
+    """Recoge tiempos por fase, memoria y métricas de las peticiones a la IA."""
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.trace_memory = trace_memory
+        self.started = time.perf_counter()
+        self.phases: List[Dict] = []
+        self.ai_requests: List[Dict] = []
+        self._lock = threading.Lock()
+
+        if trace_memory:
+            import tracemalloc
+            tracemalloc.start()
+
+    @contextmanager
+    def phase(self, name: str, label: str = "") -> Iterator[None]:
+        """Mide una fase; ``label`` distingue fases de distintos rangos (modo batch)."""
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.reset_peak()
+
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            entrada: Dict = {
+                "phase": name,
+                "label": label,
+                "thread": threading.current_thread().name,
+                "start_s": round(inicio - self.started, 4),
+                "seconds": round(time.perf_counter() - inicio, 4),
+            }
+            if self.trace_memory:
+                import tracemalloc
+                actual, pico = tracemalloc.get_traced_memory()
+                entrada["python_mem_mb"] = round(actual / (1024 * 1024), 2)
+                entrada["python_peak_mb"] = round(pico / (1024 * 1024), 2)
+            with self._lock:
+                self.phases.append(entrada)
+
+    def record_ai_request(
+        self,
+        kind: str,
+        latency: float,
+        ttft: Optional[float] = None,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        cached: bool = False,
+        retries: int = 0,
+    ) -> None:
+        """Registra una petición a la IA (``kind``: single, map o reduce)."""
+        with self._lock:
+            self.ai_requests.append({
+                "kind": kind,
+                "cached": cached,
+                "latency_s": round(latency, 4),
+                "ttft_s": round(ttft, 4) if ttft is not None else None,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "retries": retries,
+            })
+
+    def summary(self) -> Dict:
+        """Informe completo como diccionario serializable a JSON."""
+        enviados = [r for r in self.ai_requests if not r["cached"]]
+        ttfts = [r["ttft_s"] for r in enviados if r["ttft_s"] is not None]
+        return {
+            "total_seconds": round(time.perf_counter() - self.started, 4),
+            "max_rss_mb": _max_rss_mb(),
+            "phases": self.phases,
+            "ai": {
+                "requests": len(self.ai_requests),
+                "cached": len(self.ai_requests) - len(enviados),
+                "prompt_tokens": sum(r["prompt_tokens"] or 0 for r in enviados),
+                "completion_tokens": sum(r["completion_tokens"] or 0 for r in enviados),
+                "retries": sum(r["retries"] for r in enviados),
+                "first_ttft_s": min(ttfts) if ttfts else None,
+                "max_latency_s": max((r["latency_s"] for r in enviados), default=None),
+                "detail": self.ai_requests,
+            },
+        }
+
+    def format_text(self) -> str:
+        """Informe legible para la consola."""
+        datos = self.summary()
+        lines: List[str] = []
+        lines.append("=" * 35)
+        lines.append("Perfil de ejecución")
+        lines.append("=" * 35)
+        for fase in datos["phases"]:
+            nombre = f"{fase['phase']} [{fase['label']}]" if fase["label"] else fase["phase"]
+            memoria = f"  pico {fase['python_peak_mb']} MB" if "python_peak_mb" in fase else ""
+            lines.append(f"{nombre:<45} {fase['seconds']:>9.3f} s{memoria}")
+        lines.append(f"{'total':<45} {datos['total_seconds']:>9.3f} s")
+        if datos["max_rss_mb"] is not None:
+            lines.append(f"{'memoria residente máxima':<45} {datos['max_rss_mb']:>9} MB")
+
+        ia = datos["ai"]
+        if ia["requests"]:
+            lines.append("")
+            lines.append(
+                f"IA: {ia['requests']} peticiones ({ia['cached']} desde caché, {ia['retries']} reintentos), "
+                f"tokens prompt/respuesta: {ia['prompt_tokens']}/{ia['completion_tokens']}"
+            )
+            if ia["first_ttft_s"] is not None:
+                lines.append(
+                    f"IA: primer token a los {ia['first_ttft_s']:.3f} s, "
+                    f"petición más lenta {ia['max_latency_s']:.3f} s"
+                )
+        return "\n".join(lines)
+
+    def format(self, fmt: str) -> str:
+        """Informe en ``text`` o ``json``."""
+        if fmt == "json":
+            return json.dumps(self.summary(), indent=2, ensure_ascii=False)
+        return self.format_text()
+
+    def dump_tracemalloc(self, path: str) -> None:
+        """Guarda una instantánea de tracemalloc (se analiza con ``tracemalloc.Snapshot.load``)."""
+        import tracemalloc
+        if tracemalloc.is_tracing():
+            tracemalloc.take_snapshot().dump(path)
+
+
+_active: Optional[Profiler] = None
+# Activado por ``--cprofile`` (ver ``require_serial_phases``).
+_serial = False
+
+
+def start_profiling(trace_memory: bool = False) -> Profiler:
+    """Activa el perfilador global y lo retorna."""
+    global _active
+    _active = Profiler(trace_memory=trace_memory)
+    return _active
+
+
+def require_serial_phases() -> None:
+    """Obliga a ejecutar las fases en el hilo que las lanza (p. ej. con cProfile activo)."""
+    global _serial
+    _serial = True
+
+
+def serial_phases_required() -> bool:
+    """Indica si las fases deben ejecutarse en serie: con cProfile o con tracemalloc por fase."""
+    return _serial or (_active is not None and _active.trace_memory)
+
+
+def get_profiler() -> Optional[Profiler]:
+    """Perfilador activo o None."""
+    return _active
+
+
+@contextmanager
+def phase(name: str, label: str = "") -> Iterator[None]:
+    """Mide una fase si hay perfilador activo; si no, no hace nada."""
+    if _active is None:
+        yield
+        return
+    with _active.phase(name, label):
+        yield
+
+
+def record_ai_request(kind: str, latency: float, **metrics) -> None:
+    """Registra una petición a la IA si hay perfilador activo."""
+    if _active is not None:
+        _active.record_ai_request(kind, latency, **metrics)
@@ -0,0 +1,440 @@
+"""Resolución rápida de rangos por etiqueta y por fecha.
+
+Antes de resolver los rangos se asegura que exista el commit-graph de Git
+(``objects/info/commit-graph``): con él ``git log`` y ``git merge-base``
+recorren el historial sin descomprimir cada commit, y sus números de
+generación permiten descartar sin lanzar Git que un commit sea ancestro de
+otro. Si falta se escribe una vez con ``git commit-graph write --reachable``
+(salvo ``CHANGELOGGER_COMMIT_GRAPH=0`` o ``core.commitGraph``/
+``gc.writeCommitGraph`` desactivados).
+
+Además se mantiene en ``.changelogger/.cache/range-index.json`` un índice
+pequeño con:
+
+- las etiquetas y la generación de su commit, ordenadas para buscar por
+  bisección la más reciente que es ancestro de un destino (``tag:PATRÓN``);
+- un muestreo de la cadena de primeros padres del destino (un commit de cada
+  ``DATE_INDEX_STEP``) con su fecha acumulada, para localizar por bisección el
+  último commit anterior a una fecha (``since:FECHA``) recorriendo como mucho
+  ``DATE_INDEX_STEP`` commits. El índice se amplía con los commits nuevos en
+  lugar de reconstruirse.
+"""
+
+from __future__ import annotations
+
+import bisect
+import fnmatch
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from .file_operations import get_cache_dir, get_repository_working_path
+from .git_operations import is_ancestor
+from .utils import ensure_gitpython, get_env_int
+
+if TYPE_CHECKING:  # pragma: no cover
+    import git
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "range-index.json"
+
+INDEX_VERSION = 1
+
+# Commits de la cadena de primeros padres entre dos entradas del índice de fechas.
+DATE_INDEX_STEP = 256
+
+# Prefijos de origen que se resuelven con el índice.
+TAG_PREFIX = "tag:"
+SINCE_PREFIX = "since:"
+
+_GRAPH_SIGNATURE = b"CGPH"
+_CHUNK_OIDF = b"OIDF"
+_CHUNK_OIDL = b"OIDL"
+_CHUNK_CDAT = b"CDAT"
+_HASH_LENGTHS = {1: 20, 2: 32}
+
+
+def commit_graph_enabled() -> bool:
+    """Indica si se permite escribir el commit-graph (CHANGELOGGER_COMMIT_GRAPH=0 lo desactiva)."""
+    return get_env_int("CHANGELOGGER_COMMIT_GRAPH", 1) > 0
+
+
+def _objects_info_dir(repo: git.Repo) -> str:
+    return os.path.join(repo.common_dir, "objects", "info")
+
+
+def commit_graph_files(repo: git.Repo) -> List[str]:
+    """Archivos del commit-graph del repositorio (único o cadena de ``--split``)."""
+    info = _objects_info_dir(repo)
+    unico = os.path.join(info, "commit-graph")
+    if os.path.isfile(unico):
+        return [unico]
+    cadena = os.path.join(info, "commit-graphs", "commit-graph-chain")
+    try:
+        with open(cadena, "r", encoding="ascii") as f:
+            hashes = [linea.strip() for linea in f if linea.strip()]
+    except OSError:
+        return []
+    return [os.path.join(info, "commit-graphs", f"graph-{h}.graph") for h in hashes]
+
+
+def _git_config_disabled(repo: git.Repo, key: str) -> bool:
+    git = ensure_gitpython()
+    try:
+        return repo.git.config("--type=bool", "--get", key).strip() == "false"
+    except git.GitCommandError:
+        return False
+
+
+def ensure_commit_graph(repo: git.Repo) -> bool:
+    """Escribe el commit-graph si falta y está permitido; retorna si está disponible."""
+    if commit_graph_files(repo):
+        return True
+    if not commit_graph_enabled():
+        return False
+    if _git_config_disabled(repo, "core.commitGraph") or _git_config_disabled(repo, "gc.writeCommitGraph"):
+        logger.debug("commit-graph desactivado en la configuración de Git")
+        return False
+    git = ensure_gitpython()
+    print("🗂️  Generando el commit-graph de Git (solo la primera vez)...")
+    try:
+        repo.git.commit_graph("write", "--reachable")
+    except git.GitCommandError as e:
+        logger.debug("No se pudo escribir el commit-graph: %s", e)
+        return False
+    return bool(commit_graph_files(repo))
+
+
+class _GraphFile:
+    """Un archivo del commit-graph abierto con ``mmap``."""
+
+    __slots__ = ("_map", "_hash_len", "_fanout", "_oidl", "_cdat", "count")
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        datos = self._map
+        if datos[:4] != _GRAPH_SIGNATURE or datos[4] != 1 or datos[5] not in _HASH_LENGTHS:
+            raise ValueError(f"commit-graph no soportado: {path}")
+        self._hash_len = _HASH_LENGTHS[datos[5]]
+        chunks: Dict[bytes, int] = {}
+        for i in range(datos[6]):
+            inicio = 8 + 12 * i
+            chunks[bytes(datos[inicio:inicio + 4])] = struct.unpack_from(">Q", datos, inicio + 4)[0]
+        if not all(c in chunks for c in (_CHUNK_OIDF, _CHUNK_OIDL, _CHUNK_CDAT)):
+            raise ValueError(f"commit-graph incompleto: {path}")
+        self._fanout = chunks[_CHUNK_OIDF]
+        self._oidl = chunks[_CHUNK_OIDL]
+        self._cdat = chunks[_CHUNK_CDAT]
+        self.count = struct.unpack_from(">I", datos, self._fanout + 255 * 4)[0]
+
+    def generation(self, oid: bytes) -> Optional[int]:
+        """Nivel topológico del commit (1 para las raíces) o None si no está en el archivo."""
+        datos, n = self._map, self._hash_len
+        primero = oid[0]
+        bajo = struct.unpack_from(">I", datos, self._fanout + (primero - 1) * 4)[0] if primero else 0
+        alto = struct.unpack_from(">I", datos, self._fanout + primero * 4)[0]
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            inicio = self._oidl + medio * n
+            actual = datos[inicio:inicio + n]
+            if actual < oid:
+                bajo = medio + 1
+            elif actual > oid:
+                alto = medio
+            else:
+                # CDAT: árbol, dos padres (4 bytes cada uno) y generación/fecha (8 bytes)
+                palabra = struct.unpack_from(">I", datos, self._cdat + medio * (n + 16) + n + 8)[0]
+                return (palabra >> 2) or None
+        return None
+
+    def close(self) -> None:
+        self._map.close()
+
+
+class CommitGraph:
+    """Números de generación leídos del commit-graph de Git.
+
+    Solo se usa el nivel topológico: si ``A`` tiene un nivel mayor o igual que
+    ``B`` (y son distintos), ``A`` no puede ser ancestro de ``B``.
+    """
+
+    def __init__(self, files: Sequence[_GraphFile]) -> None:
+        self._files = list(files)
+
+    def __len__(self) -> int:
+        return sum(f.count for f in self._files)
+
+    def generation(self, hexsha: str) -> Optional[int]:
+        """Generación del commit; None si no está en el commit-graph (p. ej. es posterior)."""
+        try:
+            oid = bytes.fromhex(hexsha)
+        except ValueError:
+            return None
+        for archivo in self._files:
+            gen = archivo.generation(oid)
+            if gen is not None:
+                return gen
+        return None
+
+    def close(self) -> None:
+        for archivo in self._files:
+            archivo.close()
+        self._files = []
+
+
+def load_commit_graph(repo: git.Repo) -> Optional[CommitGraph]:
+    """Abre el commit-graph del repositorio; None si no existe o no se puede leer."""
+    archivos: List[_GraphFile] = []
+    try:
+        for path in commit_graph_files(repo):
+            archivos.append(_GraphFile(path))
+    except (OSError, ValueError, struct.error) as e:
+        logger.debug("commit-graph ilegible: %s", e)
+        for archivo in archivos:
+            archivo.close()
+        return None
+    return CommitGraph(archivos) if archivos else None
+
+
+def graph_is_ancestor(
+    repo: git.Repo, graph: Optional[CommitGraph], ancestor_hexsha: str, descendant_hexsha: str
+) -> bool:
+    """``is_ancestor`` que descarta sin lanzar Git los casos imposibles por generación."""
+    if ancestor_hexsha == descendant_hexsha:
+        return True
+    if graph is not None:
+        gen_a = graph.generation(ancestor_hexsha)
+        gen_d = graph.generation(descendant_hexsha)
+        if gen_a is not None and gen_d is not None and gen_a >= gen_d:
+            return False
+    return is_ancestor(repo, ancestor_hexsha, descendant_hexsha)
+
+
+def parse_since_date(text: str) -> int:
+    """Fecha Unix de ``AAAA-MM-DD[ HH:MM[:SS]]`` (hora local) o de un número de segundos."""
+    valor = text.strip()
+    if valor.isdigit():
+        return int(valor)
+    try:
+        return int(datetime.fromisoformat(valor).timestamp())
+    except ValueError:
+        raise ValueError(f"fecha no válida: {text!r} (usa AAAA-MM-DD o AAAA-MM-DD HH:MM)") from None
+
+
+class RangeIndex:
+    """Índice de etiquetas y fechas de un repositorio, persistido en la caché."""
+
+    def __init__(self, repo: git.Repo, path: Optional[str] = None, graph: Optional[CommitGraph] = None) -> None:
+        self.repo = repo
+        self.path = path
+        self.graph = graph
+        self._data: Dict = self._load()
+        self._dirty = False
+
+    def _load(self) -> Dict:
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return datos if datos.get("version") == INDEX_VERSION else {}
+
+    def save(self) -> None:
+        """Guarda el índice si ha cambiado (escritura atómica)."""
+        if self.path is None or not self._dirty:
+            return
+        self._data["version"] = INDEX_VERSION
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.debug("No se pudo guardar el índice de rangos: %s", e)
+        self._dirty = False
+
+    def close(self) -> None:
+        self.save()
+        if self.graph is not None:
+            self.graph.close()
+
+    # --- Etiquetas ---------------------------------------------------------
+
+    def _refs_fingerprint(self) -> str:
+        """Huella de las etiquetas (packed-refs, refs sueltas) y del commit-graph."""
+        partes: List[str] = []
+        common = self.repo.common_dir
+        for path in [os.path.join(common, "packed-refs"), *commit_graph_files(self.repo)]:
+            try:
+                st = os.stat(path)
+                partes.append(f"{path}:{st.st_mtime_ns}:{st.st_size}")
+            except OSError:
+                pass
+        for raiz, _, archivos in os.walk(os.path.join(common, "refs", "tags")):
+            for nombre in archivos:
+                path = os.path.join(raiz, nombre)
+                try:
+                    partes.append(f"{path}:{os.stat(path).st_mtime_ns}")
+                except OSError:
+                    pass
+        return hashlib.sha1("\n".join(sorted(partes)).encode("utf-8")).hexdigest()
+
+    def tags(self) -> List[List]:
+        """``[generación, fecha, nombre, sha]`` por etiqueta, ordenadas por generación y fecha.
+
+        La generación es 0 para los commits que no están en el commit-graph.
+        """
+        huella = self._refs_fingerprint()
+        guardadas = self._data.get("tags")
+        if guardadas and guardadas.get("fingerprint") == huella:
+            return guardadas["entries"]
+        entradas: List[List] = []
+        salida = self.repo.git.for_each_ref(
+            "--format=%(objectname)%09%(*objectname)%09%(committerdate:unix)%09%(*committerdate:unix)"
+            "%09%(objecttype)%09%(*objecttype)%09%(refname:short)",
+            "refs/tags",
+        )
+        for linea in salida.splitlines():
+            objeto, destino, fecha, fecha_destino, tipo, tipo_destino, nombre = linea.split("\t", 6)
+            if (tipo_destino or tipo) != "commit":
+                continue
+            sha = destino or objeto
+            gen = self.graph.generation(sha) if self.graph is not None else None
+            entradas.append([gen or 0, int(fecha_destino or fecha or 0), nombre, sha])
+        entradas.sort()
+        self._data["tags"] = {"fingerprint": huella, "entries": entradas}
+        self._dirty = True
+        return entradas
+
+    def latest_tag(self, pattern: str, target_hexsha: str) -> Optional[str]:
+        """Commit de la etiqueta más reciente que cumple ``pattern`` y es ancestro del destino.
+
+        Se retorna el sha del commit (ya desreferenciado en las etiquetas
+        anotadas), sin contar el propio destino.
+        """
+        candidatas = [e for e in self.tags() if fnmatch.fnmatchcase(e[2], pattern) and e[3] != target_hexsha]
+        sin_generacion = sorted((e for e in candidatas if not e[0]), key=lambda e: e[1], reverse=True)
+        con_generacion = [e for e in candidatas if e[0]]
+        gen_destino = self.graph.generation(target_hexsha) if self.graph is not None else None
+        if gen_destino is not None:
+            # Las de generación mayor o igual que la del destino no pueden ser ancestros
+            corte = bisect.bisect_left([e[0] for e in con_generacion], gen_destino)
+            con_generacion = con_generacion[:corte]
+        # Las que no están en el commit-graph son posteriores a él: se prueban primero
+        for _, _, _, sha in sin_generacion + con_generacion[::-1]:
+            if graph_is_ancestor(self.repo, self.graph, sha, target_hexsha):
+                return sha
+        return None
+
+    # --- Fechas ------------------------------------------------------------
+
+    def _first_parent_log(self, *args: str):
+        """``(sha, primer padre, fecha)`` de ``git log --first-parent --reverse``, en streaming."""
+        proc = self.repo.git.log("--first-parent", "--reverse", "--format=%H %ct %P", *args, as_process=True)
+        try:
+            for linea in proc.proc.stdout:
+                partes = linea.decode("ascii").split()
+                if len(partes) >= 2:
+                    yield partes[0], (partes[2] if len(partes) > 2 else ""), int(partes[1])
+        finally:
+            proc.proc.stdout.close()
+            proc.proc.wait()
+
+    def _build_dates(self, target_hexsha: str, base: Optional[Dict]) -> Dict:
+        """Índice de fechas del destino, ampliando ``base`` si su punta está en su cadena."""
+        if base is not None:
+            entradas = [e for e in base["entries"] if e[0] % DATE_INDEX_STEP == 0]
+            profundidad, sha_previo, acumulada = base["depth"], base["tip"], base["entries"][-1][2]
+            log = self._first_parent_log(f"{base['tip']}..{target_hexsha}")
+        else:
+            entradas, profundidad, sha_previo, acumulada = [], -1, "", 0
+            log = self._first_parent_log(target_hexsha)
+        primero = True
+        for sha, padre, fecha in log:
+            if primero and base is not None and padre != sha_previo:
+                # La punta anterior no está en la cadena de primeros padres
+                log.close()
+                return self._build_dates(target_hexsha, None)
+            primero = False
+            profundidad += 1
+            acumulada = max(acumulada, fecha)
+            sha_previo = sha
+            if profundidad % DATE_INDEX_STEP == 0:
+                entradas.append([profundidad, sha, acumulada])
+        if not entradas or entradas[-1][1] != sha_previo:
+            entradas.append([profundidad, sha_previo, acumulada])
+        return {"tip": target_hexsha, "depth": profundidad, "entries": entradas}
+
+    def dates(self, target_hexsha: str) -> Dict:
+        """Índice de fechas de la cadena de primeros padres del destino.
+
+        Cada entrada es ``[profundidad desde la raíz, sha, fecha acumulada]``,
+        donde la fecha acumulada es la máxima hasta ese commit (no decrece, así
+        que admite bisección aunque haya fechas desordenadas).
+        """
+        guardado = self._data.get("dates")
+        if guardado and guardado.get("tip") == target_hexsha:
+            return guardado
+        base = None
+        if guardado and graph_is_ancestor(self.repo, self.graph, guardado["tip"], target_hexsha):
+            base = guardado
+        indice = self._build_dates(target_hexsha, base)
+        self._data["dates"] = indice
+        self._dirty = True
+        return indice
+
+    def commit_before(self, timestamp: int, target_hexsha: str) -> str:
+        """Último commit de la cadena de primeros padres del destino anterior a ``timestamp``.
+
+        Si todos son posteriores retorna la raíz; si ninguno lo es, el propio destino.
+        """
+        entradas = self.dates(target_hexsha)["entries"]
+        k = bisect.bisect_left([e[2] for e in entradas], timestamp)
+        if k == len(entradas):
+            return target_hexsha
+        if k == 0:
+            return entradas[0][1]
+        (prof_bajo, sha_previo, acumulada), (prof_alto, sha_alto, _) = entradas[k - 1], entradas[k]
+        # Como mucho DATE_INDEX_STEP commits entre las dos entradas
+        for sha, _, fecha in self._first_parent_log(f"--max-count={prof_alto - prof_bajo}", sha_alto):
+            acumulada = max(acumulada, fecha)
+            if acumulada >= timestamp:
+                return sha_previo
+            sha_previo = sha
+        return sha_previo
+
+    def resolve_origin(self, spec: str, target_hexsha: str) -> str:
+        """Resuelve ``tag:PATRÓN`` y ``since:FECHA`` al sha de un commit; el resto de refs se retornan tal cual."""
+        if spec.startswith(TAG_PREFIX):
+            patron = spec[len(TAG_PREFIX):] or "*"
+            sha = self.latest_tag(patron, target_hexsha)
+            if sha is None:
+                raise ValueError(f"ninguna etiqueta '{patron}' es anterior al destino")
+            return sha
+        if spec.startswith(SINCE_PREFIX):
+            return self.commit_before(parse_since_date(spec[len(SINCE_PREFIX):]), target_hexsha)
+        return spec
+
+
+def needs_range_index(origin_ref: str) -> bool:
+    """Indica si el origen de un rango se resuelve con el índice."""
+    return origin_ref.startswith((TAG_PREFIX, SINCE_PREFIX))
+
+
+def open_range_index(repo: git.Repo, use_cache: bool = True) -> RangeIndex:
+    """Prepara el commit-graph y abre el índice (en memoria con ``use_cache=False``)."""
+    ensure_commit_graph(repo)
+    path = None
+    if use_cache:
+        path = os.path.join(get_cache_dir(get_repository_working_path(repo)), INDEX_FILENAME)
+    return RangeIndex(repo, path, load_commit_graph(repo))
@@ -2,102 +2,200 @@
 
 from __future__ import annotations
 
-import sys
-from typing import List
+from typing import Callable, Optional, Sequence
 
-try:
-    import git
-except ModuleNotFoundError:  # pragma: no cover
-    git = None  # type: ignore[assignment]
+from .utils import get_numeric_input, is_tty_available, print_title
+from .commit_index import CommitIndex, CommitView
 
-from .utils import ensure_gitpython, format_timestamp, get_numeric_input, is_tty_available, print_title
-from .git_operations import format_commit_info
+# Intervalo (s) de refresco del selector mientras se carga el índice o avanza una búsqueda.
+_PICKER_REFRESH = 0.2
 
+# Aviso de la vista del selector: posiciones visibles en el índice y la resaltada.
+ViewCallback = Callable[[Sequence[int], Optional[int]], None]
 
-def select_commit_tui(commits: List[git.objects.Commit], per_page: int = 10) -> int:
-    """UI interactiva (TUI) para seleccionar un commit con teclas de flecha.
 
-    Usa radiolist_dialog para el mismo estilo visual que la confirmación Sí/No.
+def pick_commit_tui(
+    index: CommitIndex, per_page: int = 15, on_view: Optional[ViewCallback] = None
+) -> int:
+    """Selector a pantalla completa sobre el historial completo.
+
+    Lo que se escribe filtra la lista al vuelo (prefijo de SHA, mensaje, autor,
+    etiqueta o fecha); ↑/↓ mueven la selección, RePág/AvPág cambian de página
+    en ambos sentidos, Ctrl+Inicio/Ctrl+Fin saltan al principio o al final de
+    lo cargado, Enter elige y Esc sale. Retorna la posición en ``index``.
+
+    ``on_view`` recibe en cada repintado las posiciones visibles y la resaltada.
     """
-    ensure_gitpython()
     try:
-        from prompt_toolkit.shortcuts import radiolist_dialog
+        from prompt_toolkit.application import Application
+        from prompt_toolkit.buffer import Buffer
+        from prompt_toolkit.key_binding import KeyBindings
+        from prompt_toolkit.layout import HSplit, Layout, Window
+        from prompt_toolkit.layout.controls import BufferControl, FormattedTextControl
     except ModuleNotFoundError:
         raise RuntimeError("prompt_toolkit no está instalado")
 
-    total = len(commits)
-    paginas_total = max(1, (total + per_page - 1) // per_page)
-    pagina = 0
-
-    while True:
-        inicio = pagina * per_page
-        fin = min(inicio + per_page, total)
-        
-        # Preparar valores para el diálogo
-        valores = []
-        for i in range(inicio, fin):
-            c = commits[i]
-            texto = f"[{i}] {format_commit_info(c)} | {c.summary}"
-            valores.append((i, texto))
-        
-        # Título del diálogo con información de paginación
-        titulo = f"Seleccionar commit (página {pagina + 1}/{paginas_total})"
-        texto = f"Mostrando commits {inicio}-{fin - 1} de {total} commits totales"
-        
-        # Mostrar diálogo de selección
-        resultado = radiolist_dialog(
-            title=titulo,
-            text=texto,
-            values=valores,
-        ).run()
-        
-        # Si el usuario cancela (Esc), salir
-        if resultado is None:
-            print("Saliendo.")
-            raise SystemExit(0)
-        
-        # Si el usuario seleccionó un commit, devolver el índice
-        if isinstance(resultado, int):
-            return resultado
-        
-        # Navegación de páginas - ciclo simple
-        if pagina + 1 >= paginas_total:
-            pagina = 0
+    vista = CommitView(index)
+    estado = {"fila": 0, "inicio": 0}
+
+    def mover(delta: int) -> None:
+        total = len(vista)
+        if total:
+            estado["fila"] = max(0, min(total - 1, estado["fila"] + delta))
+
+    def al_cambiar_texto(buffer) -> None:
+        vista.set_query(buffer.text)
+        estado["fila"] = estado["inicio"] = 0
+
+    buscador = Buffer(multiline=False, on_text_changed=al_cambiar_texto)
+
+    def filas():
+        vista.refresh()
+        total = len(vista)
+        fila = min(estado["fila"], max(0, total - 1))
+        estado["fila"] = fila
+        if fila < estado["inicio"]:
+            estado["inicio"] = fila
+        elif fila >= estado["inicio"] + per_page:
+            estado["inicio"] = fila - per_page + 1
+
+        lineas = []
+        visibles = []
+        for i in range(estado["inicio"], min(total, estado["inicio"] + per_page)):
+            estilo = "reverse" if i == fila else ""
+            visibles.append(vista.position(i))
+            lineas.append((estilo, f"[{i}] {index.format_entry(visibles[-1])}\n"))
+        if not total:
+            lineas.append(("italic", "(sin coincidencias)\n" if vista.complete else "(cargando…)\n"))
+        if on_view is not None:
+            on_view(visibles, vista.position(fila) if total else None)
+        return lineas
+
+    def barra_estado():
+        total = len(vista)
+        cargando = "" if index.done else " (cargando…)"
+        if vista.search.active:
+            if vista.complete:
+                busqueda = ""
+            elif vista.search.fuzzy:
+                busqueda = ", buscando aproximadas"
+            else:
+                busqueda = f", buscando en {vista.search.scanned}"
+            texto = f"{total} coincidencias de {len(index)} commits{busqueda}{cargando}"
         else:
-            pagina += 1
+            texto = f"Commit {min(estado['fila'] + 1, total)} de {total}{cargando}"
+        return [("reverse", f" {texto} · Enter elegir · Esc salir ")]
+
+    kb = KeyBindings()
+
+    @kb.add("up", eager=True)
+    def _(event) -> None:
+        mover(-1)
+
+    @kb.add("down", eager=True)
+    def _(event) -> None:
+        mover(1)
+
+    @kb.add("pageup", eager=True)
+    def _(event) -> None:
+        mover(-per_page)
+
+    @kb.add("pagedown", eager=True)
+    def _(event) -> None:
+        mover(per_page)
+
+    @kb.add("c-home", eager=True)
+    def _(event) -> None:
+        estado["fila"] = 0
+
+    @kb.add("c-end", eager=True)
+    def _(event) -> None:
+        mover(len(vista))
+
+    @kb.add("enter", eager=True)
+    def _(event) -> None:
+        if len(vista):
+            event.app.exit(result=vista.position(estado["fila"]))
+
+    @kb.add("escape", eager=True)
+    @kb.add("c-c", eager=True)
+    def _(event) -> None:
+        event.app.exit(result=None)
+
+    layout = Layout(
+        HSplit(
+            [
+                Window(FormattedTextControl([("bold", "Seleccionar commit de origen")]), height=1),
+                Window(
+                    BufferControl(buffer=buscador),
+                    height=1,
+                    get_line_prefix=lambda *_: [("bold", "Buscar: ")],
+                ),
+                Window(height=1, char="─"),
+                Window(FormattedTextControl(filas), height=per_page),
+                Window(FormattedTextControl(barra_estado), height=1),
+            ]
+        ),
+        focused_element=buscador,
+    )
+    app = Application(layout=layout, key_bindings=kb, refresh_interval=_PICKER_REFRESH)
+    resultado = app.run()
+
+    if resultado is None:
+        print("Saliendo.")
+        raise SystemExit(0)
+    return resultado
 
 
-def select_commit_fallback(commits: List[git.objects.Commit], per_page: int = 10) -> int:
-    """Fallback modo texto para selección de commits."""
-    if not commits:
-        print("No hay commits en este repositorio.")
-        raise SystemExit(0)
+def pick_commit_fallback(
+    index: CommitIndex, per_page: int = 10, on_view: Optional[ViewCallback] = None
+) -> int:
+    """Fallback modo texto del selector sobre el historial completo.
 
-    total = len(commits)
+    Las páginas se cargan según se piden; ``/texto`` filtra por prefijo de SHA,
+    mensaje, autor, etiqueta o fecha y ``/`` sin texto quita el filtro.
+    Retorna la posición en ``index``.
+    """
+    vista = CommitView(index)
     pagina = 0
 
     while True:
         inicio = pagina * per_page
-        fin = min(inicio + per_page, total)
+        disponibles = vista.ensure(inicio + per_page)
+        fin = min(inicio + per_page, disponibles)
 
-        print_title(f"Últimos {total} commits (página {pagina + 1})")
+        if vista.search.active:
+            print_title(f"Commits que coinciden con «{vista.search.query}» (página {pagina + 1})")
+        else:
+            print_title(f"Historial de commits (página {pagina + 1})")
 
         for i in range(inicio, fin):
-            c = commits[i]
-            print(f"[{i}] {format_commit_info(c)} | {c.summary}")
+            print(f"[{i}] {index.format_entry(vista.position(i))}")
+        if inicio >= fin:
+            print("(sin coincidencias)" if vista.search.active else "(sin commits)")
+        if on_view is not None:
+            on_view([vista.position(i) for i in range(inicio, fin)], None)
 
         print("")
         print("Opciones:")
         print("  n - siguiente página")
         print("  p - página anterior")
         print("  x - elegir commit por índice")
+        print("  /texto - buscar (/ para ver todo el historial)")
         print("  q - salir")
         print("")
 
-        opcion = input("Selecciona opción (n/p/x/q): ").strip().lower()
+        opcion = input("Selecciona opción (n/p/x//texto/q): ").strip()
+
+        if opcion.startswith("/"):
+            vista.set_query(opcion[1:])
+            pagina = 0
+            continue
+
+        opcion = opcion.lower()
 
         if opcion == "n":
-            if fin >= total:
+            if vista.ensure(fin + 1) <= fin:
                 print("Ya estás en la última página.")
             else:
                 pagina += 1
@@ -115,27 +213,40 @@ def select_commit_fallback(commits: List[git.objects.Commit], per_page: int = 10
             raise SystemExit(0)
 
         if opcion == "x":
-            return get_numeric_input(
-                f"Introduce índice de commit (0 - {total - 1}): ", 0, total - 1
+            if not disponibles:
+                print("No hay commits que elegir.")
+                continue
+            # Acepta cualquier fila ya vista o cargada, no solo las de esta página
+            fila = get_numeric_input(
+                f"Introduce índice de commit (0 - {len(vista) - 1}): ", 0, len(vista) - 1
             )
+            return vista.position(fila)
 
         print("Opción no válida.")
 
 
-def select_commit(commits: List[git.objects.Commit], per_page: int = 10) -> int:
-    """Selecciona un commit usando TUI si está disponible, sino fallback texto."""
-    if not commits:
+def pick_commit(
+    index: CommitIndex, per_page: int = 10, on_view: Optional[ViewCallback] = None
+) -> int:
+    """Selecciona un commit del índice con TUI si está disponible, sino fallback texto.
+
+    Retorna la posición del commit elegido en ``index``. ``on_view`` se avisa
+    de los candidatos que se están mostrando (p. ej. para precalcularlos).
+    """
+    if not index.wait_for(1):
         print("No hay commits en este repositorio.")
         raise SystemExit(0)
 
     if is_tty_available():
         try:
-            return select_commit_tui(commits, per_page=per_page)
+            return pick_commit_tui(index, per_page=max(per_page, 15), on_view=on_view)
+        except SystemExit:
+            raise
         except Exception:
             # Si falla la TUI, usar fallback
             pass
 
-    return select_commit_fallback(commits, per_page=per_page)
+    return pick_commit_fallback(index, per_page=per_page, on_view=on_view)
 
 
 def confirm_action(question: str) -> bool:
@@ -6,22 +6,38 @@ import os
 import re
 import sys
 from datetime import datetime
-from typing import List, Tuple
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
-try:
+if TYPE_CHECKING:  # pragma: no cover
     import git
-except ModuleNotFoundError:  # pragma: no cover
-    git = None  # type: ignore[assignment]
 
 
-def ensure_gitpython() -> None:
-    """Verifica que GitPython esté instalado antes de ejecutar lógica que lo requiera."""
+def load_gitpython() -> Optional["git"]:
+    """Importa GitPython bajo demanda; retorna None si no está instalado.
+
+    La importación se hace la primera vez que se necesita para no penalizar
+    el arranque del CLI (``--help``, selector de commits, etc.).
+    """
+    try:
+        import git
+    except ModuleNotFoundError:  # pragma: no cover
+        return None
+    return git
+
+
+def ensure_gitpython() -> "git":
+    """Verifica que GitPython esté instalado antes de ejecutar lógica que lo requiera.
+
+    Retorna el módulo ``git`` ya importado.
+    """
+    git = load_gitpython()
     if git is None:
         print(
             "Error: no se ha encontrado la dependencia GitPython. "
             "Instala el paquete con 'pip install -e .' o 'pip install GitPython'."
         )
         raise SystemExit(1)
+    return git
 
 
 def print_title(text: str) -> None:
@@ -90,6 +106,28 @@ def ensure_directory_exists(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
 
+def get_env_int(name: str, default: int, minimum: int = 0) -> int:
+    """Lee un entero de una variable de entorno, usando ``default`` si falta o es inválido."""
+    valor = os.getenv(name, "").strip()
+    if not valor:
+        return default
+    try:
+        return max(minimum, int(valor))
+    except ValueError:
+        return default
+
+
+def get_env_float(name: str, default: float, minimum: float = 0.0) -> float:
+    """Lee un número real de una variable de entorno, usando ``default`` si falta o es inválido."""
+    valor = os.getenv(name, "").strip()
+    if not valor:
+        return default
+    try:
+        return max(minimum, float(valor))
+    except ValueError:
+        return default
+
+
 def normalize_file_status(status_code: str) -> str:
     """Convierte el código de estado de Git (A/M/D/...) a un tipo en español."""
     if status_code.startswith("A"):
@@ -0,0 +1,64 @@
+"""Fixtures comunes: repositorios Git pequeños creados con ``git`` en un tmp_path."""
+
+from __future__ import annotations
+
+import os
+import subprocess
+from typing import Dict, Optional
+
+import pytest
+
+_GIT_ENV = {
+    "GIT_AUTHOR_NAME": "Ana",
+    "GIT_AUTHOR_EMAIL": "ana@example.com",
+    "GIT_COMMITTER_NAME": "Ana",
+    "GIT_COMMITTER_EMAIL": "ana@example.com",
+    "GIT_CONFIG_NOSYSTEM": "1",
+    "HOME": os.devnull,
+}
+
+
+def git(cwd: str, *args: str, fecha: int = 1700000000) -> str:
+    """Ejecuta ``git`` en ``cwd`` con identidad y fechas fijas; retorna stdout."""
+    env = dict(os.environ, **_GIT_ENV)
+    env["GIT_AUTHOR_DATE"] = env["GIT_COMMITTER_DATE"] = f"@{fecha} +0000"
+    return subprocess.run(
+        ["git", *args], cwd=cwd, env=env, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def commit_files(cwd: str, files: Dict[str, Optional[str]], mensaje: str, fecha: int) -> str:
+    """Escribe ``files`` (ruta -> contenido; None borra) y hace commit; retorna el SHA."""
+    for ruta, contenido in files.items():
+        path = os.path.join(cwd, ruta)
+        if contenido is None:
+            os.remove(path)
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            f.write(contenido)
+    git(cwd, "add", "-A")
+    git(cwd, "commit", "-q", "-m", mensaje, fecha=fecha)
+    return git(cwd, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def tagged_repo(tmp_path) -> str:
+    """Repositorio lineal de cinco commits con las etiquetas anotadas v1..v4.
+
+    ``v1``-``v4`` apuntan a los commits 1-4; el quinto (HEAD) no tiene etiqueta.
+    """
+    path = str(tmp_path / "repo")
+    os.makedirs(path)
+    git(path, "init", "-q", "-b", "main")
+    for i in range(1, 6):
+        fecha = 1700000000 + i * 3600
+        commit_files(
+            path,
+            {"app.py": "".join(f"linea {n}\n" for n in range(i * 3)), f"mod{i}.py": f"x = {i}\n"},
+            f"feat: cambio {i}\n\nCuerpo del cambio {i}.",
+            fecha,
+        )
+        if i < 5:
+            git(path, "tag", "-a", f"v{i}", "-m", f"versión {i}", fecha=fecha)
+    return path
@@ -0,0 +1,46 @@
+"""Análisis map-reduce del diff y su caché de respuestas."""
+
+from __future__ import annotations
+
+import asyncio
+
+from changelogger.ai_analyzer import _map_chunks
+from changelogger.ai_client import AIClient
+from changelogger.llm_backends import Completion
+
+
+class _Eco:
+    name = "prueba"
+
+    def __init__(self):
+        self.peticiones = 0
+
+    async def complete(self, model, messages, max_tokens, temperature):
+        self.peticiones += 1
+        return Completion(f"resumen {self.peticiones}")
+
+    async def close(self):
+        pass
+
+
+class _Cache:
+    def __init__(self):
+        self.datos = {}
+
+    def get(self, key):
+        return self.datos.get(key)
+
+    def put(self, key, value):
+        self.datos[key] = value
+
+
+def test_map_cache_does_not_depend_on_chunk_position():
+    backend, cache = _Eco(), _Cache()
+    cliente = AIClient(backend, stream=False)
+
+    primera = asyncio.run(_map_chunks(cliente, "m", ["diff b\n", "diff c\n"], 2, cache))
+    # Un fragmento nuevo delante desplaza a los demás, que siguen en la caché
+    segunda = asyncio.run(_map_chunks(cliente, "m", ["diff a\n", "diff b\n", "diff c\n"], 2, cache))
+
+    assert backend.peticiones == 3
+    assert segunda[1:] == primera
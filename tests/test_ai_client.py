@@ -0,0 +1,96 @@
+"""Límites de concurrencia y entrega de texto del cliente de la IA."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+from changelogger.ai_client import AIClient, RateLimiter
+from changelogger.llm_backends import Completion
+
+
+def test_slots_are_granted_in_arrival_order():
+    async def escenario():
+        limiter = RateLimiter(max_concurrency=1)
+        orden = []
+
+        async def peticion(nombre):
+            await limiter.acquire(0)
+            orden.append(nombre)
+            await asyncio.sleep(0)
+            limiter.release(0)
+
+        await limiter.acquire(0)
+        tareas = [asyncio.create_task(peticion(n)) for n in "abcd"]
+        await asyncio.sleep(0.01)
+        assert orden == []
+        limiter.release(0)
+        await asyncio.gather(*tareas)
+        return orden
+
+    assert asyncio.run(escenario()) == list("abcd")
+
+
+def test_slot_is_handed_to_a_waiter_on_another_loop():
+    limiter = RateLimiter(max_concurrency=1)
+    esperando = threading.Event()
+    obtenido = threading.Event()
+
+    async def ocupar():
+        await limiter.acquire(0)
+
+    async def esperar():
+        tarea = asyncio.create_task(limiter.acquire(0))
+        await asyncio.sleep(0.01)
+        esperando.set()
+        await tarea
+        obtenido.set()
+        limiter.release(0)
+
+    asyncio.run(ocupar())
+    hilo = threading.Thread(target=asyncio.run, args=(esperar(),))
+    hilo.start()
+    assert esperando.wait(5)
+    assert not obtenido.is_set()
+    limiter.release(0)
+    hilo.join(5)
+    assert obtenido.is_set()
+
+
+def test_cancelled_waiter_does_not_keep_the_slot():
+    async def escenario():
+        limiter = RateLimiter(max_concurrency=1)
+        await limiter.acquire(0)
+        cancelada = asyncio.create_task(limiter.acquire(0))
+        siguiente = asyncio.create_task(limiter.acquire(0))
+        await asyncio.sleep(0.01)
+        cancelada.cancel()
+        limiter.release(0)
+        await asyncio.wait_for(siguiente, 1)
+        limiter.release(0)
+        # El hueco vuelve a estar libre
+        await asyncio.wait_for(limiter.acquire(0), 1)
+
+    asyncio.run(escenario())
+
+
+class _SinStreaming:
+    name = "prueba"
+
+    async def complete(self, model, messages, max_tokens, temperature):
+        return Completion("respuesta completa", 10, 2)
+
+    async def close(self):
+        pass
+
+
+def test_on_token_receives_text_without_streaming():
+    recibidos = []
+
+    async def escenario():
+        cliente = AIClient(_SinStreaming(), RateLimiter(), stream=True)
+        assert not cliente.stream
+        return await cliente.complete("m", [{"role": "user", "content": "hola"}], 10, 0.0, recibidos.append)
+
+    assert asyncio.run(escenario()).text == "respuesta completa"
+    assert recibidos == ["respuesta completa"]
@@ -0,0 +1,61 @@
+"""Almacén de parches comprimidos de los ``.diff``."""
+
+from __future__ import annotations
+
+import os
+import threading
+
+from changelogger.artifact_store import find_blob, put_blob, write_diff_reference
+from changelogger.file_operations import iter_diff_file
+
+DIFF = (
+    "diff --git a/a.txt b/a.txt\n"
+    "index 1111111..2222222 100644\n"
+    "--- a/a.txt\n"
+    "+++ b/a.txt\n"
+    "@@ -1 +1 @@\n"
+    "-hola\n"
+    "+adiós\n"
+    "diff --git a/b.txt b/b.txt\n"
+    "new file mode 100644\n"
+    "index 0000000..3333333\n"
+    "--- /dev/null\n"
+    "+++ b/b.txt\n"
+    "@@ -0,0 +1 @@\n"
+    "+nuevo\n"
+)
+
+
+def test_reference_round_trip(tmp_path):
+    diff_path = str(tmp_path / "rango.diff")
+    contadores = write_diff_reference(diff_path, [DIFF[:50], DIFF[50:]], codec="gzip")
+
+    assert contadores == {"patches": 2, "new": 2, "bytes": len(DIFF.encode("utf-8"))}
+    assert "".join(iter_diff_file(diff_path)) == DIFF
+
+
+def test_put_blob_from_concurrent_threads(tmp_path):
+    store_dir = str(tmp_path / "store")
+    data = b"".join(b"%d %s\n" % (i, DIFF.encode("utf-8")) for i in range(20000))
+    barrera = threading.Barrier(8)
+    errores = []
+
+    def worker() -> None:
+        barrera.wait()
+        try:
+            put_blob(store_dir, data, "gzip")
+        except Exception as e:  # pragma: no cover - el fallo que se comprueba
+            errores.append(repr(e))
+
+    hilos = [threading.Thread(target=worker) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert errores == []
+    digest, nuevo = put_blob(store_dir, data, "gzip")
+    assert not nuevo
+    blob = find_blob(store_dir, digest)
+    assert blob is not None
+    assert not [n for n in os.listdir(os.path.dirname(blob)) if n.endswith(".tmp")]
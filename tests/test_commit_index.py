@@ -0,0 +1,91 @@
+"""Índice del historial y búsqueda del selector de commits."""
+
+from __future__ import annotations
+
+import os
+
+import git as gitpython
+import pytest
+
+from changelogger.commit_index import (
+    CommitIndex,
+    CommitSearch,
+    entry_matches,
+    entry_matches_fuzzy,
+    fuzzy_pattern,
+    parse_query,
+)
+
+from conftest import commit_files, git
+
+MENSAJES = [
+    "Refactor parser module",
+    "Fix config loader",
+    "Add docs for module61",
+    "Update module62 build",
+    "Release notes",
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = str(tmp_path / "repo")
+    os.makedirs(path)
+    git(path, "init", "-q")
+    for i, mensaje in enumerate(MENSAJES):
+        commit_files(path, {f"f{i}.txt": mensaje}, mensaje, 1700000000 + i * 60)
+    git(path, "tag", "-a", "v1.0", "-m", "v1.0")
+    indice = CommitIndex(gitpython.Repo(path)).start()
+    indice.wait_for(len(MENSAJES))
+    yield indice
+    indice.close()
+
+
+def buscar(indice: CommitIndex, consulta: str):
+    busqueda = CommitSearch(indice)
+    busqueda.set_query(consulta)
+    return [indice.get(i).summary for i in busqueda.run()], busqueda.exact_count
+
+
+def buscar_posiciones(indice: CommitIndex, consulta: str):
+    busqueda = CommitSearch(indice)
+    busqueda.set_query(consulta)
+    return busqueda.run()
+
+
+def test_exact_matches_any_order_and_sha_prefix(index):
+    assert buscar(index, "module parser")[0] == ["Refactor parser module"]
+    assert buscar(index, "v1.0")[0] == ["Release notes"]
+    sha = index.get(2).hexsha
+    assert entry_matches(index.entry(2), parse_query(sha[:6].upper()))
+    assert not entry_matches(index.entry(2), parse_query(sha[6:12]))
+
+
+def test_fuzzy_matches_come_after_exact_ones(index):
+    # «confg» (letra omitida) y «lodaer» (letras intercambiadas)
+    assert buscar(index, "confg lodaer") == (["Fix config loader"], 0)
+    assert buscar(index, "refactr") == (["Refactor parser module"], 0)
+    # «module» exacta en tres commits; «modle» solo aproximada
+    resumenes, exactas = buscar(index, "modle")
+    assert exactas == 0 and len(resumenes) == 3
+    resumenes, exactas = buscar(index, "notes")
+    assert (resumenes, exactas) == (["Release notes"], 1)
+
+
+def test_short_and_numeric_tokens_are_exact_only(index):
+    assert fuzzy_pattern("fxi") is None
+    assert fuzzy_pattern("module61") is None
+    assert buscar(index, "module61")[0] == ["Add docs for module61"]
+    assert not entry_matches_fuzzy(index.entry(0), parse_query("fxi"))
+
+
+@pytest.mark.parametrize(
+    "anterior, nueva",
+    [("modu", "module6"), ("conf", "confg"), ("rel", "rele"), ("upd", "upda"), ("fix", "fix lodaer")],
+)
+def test_refined_query_matches_a_fresh_search(index, anterior, nueva):
+    busqueda = CommitSearch(index)
+    busqueda.set_query(anterior)
+    busqueda.run()
+    busqueda.set_query(nueva)
+    assert busqueda.run() == buscar_posiciones(index, nueva)
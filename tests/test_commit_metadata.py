@@ -0,0 +1,76 @@
+"""Lector persistente de metadatos (``git cat-file --batch``)."""
+
+from __future__ import annotations
+
+import threading
+
+import git as gitpython
+
+from changelogger.commit_metadata import close_metadata_reader, get_metadata_reader
+from changelogger.git_operations import get_commit_record
+
+from conftest import git
+
+
+def test_annotated_tag_resolves_to_its_commit(tagged_repo):
+    repo = gitpython.Repo(tagged_repo)
+    try:
+        record = get_commit_record(repo, "v2")
+        assert record is not None
+        assert record.hexsha == git(tagged_repo, "rev-parse", "v2^{commit}")
+        assert record.summary == "feat: cambio 2"
+        assert record.author.name == "Ana"
+    finally:
+        close_metadata_reader(repo)
+
+
+def test_get_many_mixes_tags_shas_and_missing_refs(tagged_repo):
+    repo = gitpython.Repo(tagged_repo)
+    try:
+        head = git(tagged_repo, "rev-parse", "HEAD")
+        records = get_metadata_reader(repo).get_many(["v1", head, "no-existe", "HEAD^{tree}", "v4"])
+        assert [r.summary if r else None for r in records] == [
+            "feat: cambio 1",
+            "feat: cambio 5",
+            None,
+            None,
+            "feat: cambio 4",
+        ]
+    finally:
+        close_metadata_reader(repo)
+
+
+def test_each_repo_object_has_its_own_reader(tagged_repo):
+    repo_a = gitpython.Repo(tagged_repo)
+    repo_b = gitpython.Repo(tagged_repo)
+    assert repo_a == repo_b
+    lector_a = get_metadata_reader(repo_a)
+    lector_b = get_metadata_reader(repo_b)
+    assert lector_a is not lector_b
+
+    close_metadata_reader(repo_a)
+    # Cerrar el lector de un Repo no afecta al de otro Repo del mismo repositorio
+    assert lector_b.get("v3").summary == "feat: cambio 3"
+    close_metadata_reader(repo_b)
+
+
+def test_concurrent_workers_close_their_readers(tagged_repo):
+    errores = []
+
+    def worker(tag: str) -> None:
+        repo = gitpython.Repo(tagged_repo)
+        try:
+            for _ in range(20):
+                if get_commit_record(repo, tag) is None:
+                    errores.append(f"{tag} sin resolver")
+        except Exception as e:  # pragma: no cover - el fallo que se comprueba
+            errores.append(repr(e))
+        finally:
+            close_metadata_reader(repo)
+
+    hilos = [threading.Thread(target=worker, args=(f"v{1 + i % 4}",)) for i in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert errores == []
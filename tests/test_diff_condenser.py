@@ -0,0 +1,52 @@
+"""Condensación del diff que se envía a la IA."""
+
+from __future__ import annotations
+
+from changelogger.diff_condenser import condense_diff, estimate_tokens, iter_diff_hunks
+
+
+def diff_archivo(path, lineas):
+    return [
+        f"diff --git a/{path} b/{path}\n",
+        "index 1111111..2222222 100644\n",
+        f"--- a/{path}\n",
+        f"+++ b/{path}\n",
+        f"@@ -1,1 +1,{len(lineas)} @@\n",
+        *lineas,
+    ]
+
+
+def test_skipped_files_count_lines_without_storing_them():
+    lineas = [f"+paquete-{i}@1.0.0\n" for i in range(1000)] + ["-viejo@0.9\n"]
+    hunks = list(iter_diff_hunks(diff_archivo("web/package-lock.json", lineas)))
+
+    assert len(hunks) == 1
+    hunk, motivo = hunks[0]
+    assert motivo == "lockfile"
+    assert (hunk.added, hunk.removed, hunk.lines) == (1000, 1, [])
+
+    salida = "".join(condense_diff(diff_archivo("web/package-lock.json", lineas), 1000))
+    assert "paquete-" not in salida
+    assert "web/package-lock.json (+1000 -1)" in salida
+
+
+def test_single_hunk_larger_than_budget_is_truncated():
+    lineas = [f"+    resultado_{i} = calcular({i})\n" for i in range(2000)]
+    salida = "".join(condense_diff(diff_archivo("app/core.py", lineas), 500))
+
+    cuerpo, _, resumen = salida.partition("# Contenido omitido del diff:")
+    assert cuerpo.startswith("diff --git a/app/core.py b/app/core.py\n")
+    assert "+    resultado_0 = calcular(0)\n" in cuerpo
+    assert 0 < estimate_tokens(cuerpo) <= 500
+    conservadas = cuerpo.count("\n+    resultado_")
+    assert f"# ... hunk recortado: {2000 - conservadas} líneas omitidas\n" in cuerpo
+    assert f"app/core.py (+{2000 - conservadas} -0)" in resumen
+
+
+def test_truncated_hunk_keeps_priority_over_smaller_ones():
+    grande = diff_archivo("app/core.py", [f"+    resultado_{i} = calcular({i})\n" for i in range(2000)])
+    pequeño = diff_archivo("docs/notas.md", ["+nota\n"])
+    salida = "".join(condense_diff(pequeño + grande, 500))
+
+    assert "+    resultado_0 = calcular(0)\n" in salida
+    assert "docs/notas.md (+1 -0)" in salida
@@ -0,0 +1,193 @@
+"""Backends de Git: registro por objeto ``git.Repo`` y paridad de GitPython con pygit2.
+
+La paridad solo se comprueba si ``pygit2`` está instalado (``pip install -e .[pygit2]``).
+"""
+
+from __future__ import annotations
+
+import gc
+import subprocess
+
+import git as gitpython
+import pytest
+
+from changelogger import git_backends, git_operations as ops
+from changelogger.commit_metadata import close_metadata_reader
+from changelogger.git_backends import check_backend_parity, get_native_backend, select_git_backend
+
+from conftest import commit_files, git
+
+VEINTE = "".join(f"{n}\n" for n in range(1, 21))
+
+
+def cambiar_linea(texto, linea, nuevo):
+    lineas = texto.splitlines(keepends=True)
+    lineas[linea - 1] = f"{nuevo}\n"
+    return "".join(lineas)
+
+
+@pytest.fixture
+def history_repo(tmp_path):
+    """Historial con etiqueta anotada, renombrados (con cambios y exacto) y tres tipos de merge.
+
+    - ``merge-ours``: el resultado coincide con uno de los padres en todas las rutas.
+    - ``merge-auto``: ``a.txt`` se fusiona sin conflicto con cambios de ambos lados.
+    - ``merge-conflict``: ``c.txt`` se resuelve a mano; ``solo-lado.txt`` viene de un padre.
+    """
+    path = str(tmp_path / "repo")
+    git(str(tmp_path), "init", "-q", "-b", "main", path)
+    fecha = iter(range(1700000000, 1700100000, 600))
+    largo = "".join(f"línea de contenido {n}\n" for n in range(40))
+    base = {"a.txt": VEINTE, "b.txt": "b\n", "c.txt": "c\n", "f.txt": "f\n", "viejo.txt": largo}
+    commit_files(path, base, "base", next(fecha))
+    git(path, "tag", "-a", "v1", "-m", "v1", fecha=next(fecha))
+    # Renombrado con cambios: la similitud de Git decide, así que se pide a git
+    commit_files(path, {"viejo.txt": None, "nuevo/ruta.txt": largo + "fin\n"}, "renombrado", next(fecha))
+    git(path, "tag", "renombrado")
+    # Renombrado exacto: libgit2 lo reproduce
+    commit_files(path, {"f.txt": None, "docs/f.txt": "f\n"}, "renombrado exacto", next(fecha))
+    commit_files(path, {"b.txt": "b2\n", "d.txt": "d\n"}, "lineal", next(fecha))
+
+    def merge(rama, nombre, conflicto=None):
+        try:
+            git(path, "merge", "--no-ff", "-q", "-m", nombre, rama, fecha=next(fecha))
+        except subprocess.CalledProcessError:
+            commit_files(path, conflicto, nombre, next(fecha))
+        git(path, "tag", nombre)
+
+    # Resultado igual a un padre: el lado fusionado ya está en main
+    git(path, "checkout", "-q", "-b", "lado-ours")
+    commit_files(path, {"b.txt": "b3\n"}, "lado ours", next(fecha))
+    git(path, "checkout", "-q", "main")
+    commit_files(path, {"b.txt": "b3\n", "e.txt": "e\n"}, "main ours", next(fecha))
+    merge("lado-ours", "merge-ours")
+
+    # Fusión automática con cambios de ambos lados en la misma ruta
+    git(path, "checkout", "-q", "-b", "lado-auto")
+    commit_files(path, {"a.txt": cambiar_linea(VEINTE, 2, "dos")}, "lado auto", next(fecha))
+    git(path, "checkout", "-q", "main")
+    commit_files(path, {"a.txt": cambiar_linea(VEINTE, 19, "diecinueve")}, "main auto", next(fecha))
+    merge("lado-auto", "merge-auto")
+
+    # Conflicto resuelto a mano y ruta que solo viene de un lado
+    git(path, "checkout", "-q", "-b", "lado-conflicto")
+    commit_files(path, {"c.txt": "lado\n", "solo-lado.txt": "s\n"}, "lado conflicto", next(fecha))
+    git(path, "checkout", "-q", "main")
+    commit_files(path, {"c.txt": "main\n"}, "main conflicto", next(fecha))
+    merge("lado-conflicto", "merge-conflict", {"c.txt": "resuelto\n"})
+
+    commit_files(path, {"d.txt": "d2\n"}, "final", next(fecha))
+    git(path, "tag", "-a", "v2", "-m", "v2", fecha=next(fecha))
+    return path
+
+
+@pytest.fixture
+def open_repo():
+    abiertos = []
+
+    def abrir(path, backend):
+        repo = gitpython.Repo(path)
+        abiertos.append(repo)
+        select_git_backend(repo, backend)
+        return repo
+
+    yield abrir
+    for repo in abiertos:
+        close_metadata_reader(repo)
+        repo.close()
+
+
+def test_backend_is_per_repo_object(tmp_path, monkeypatch):
+    git(str(tmp_path), "init", "-q", str(tmp_path))
+    nativo = object()
+    monkeypatch.setattr(git_backends, "create_backend", lambda repo, name: nativo if name == "pygit2" else None)
+    repo_cli, repo_nativo = gitpython.Repo(str(tmp_path)), gitpython.Repo(str(tmp_path))
+    assert repo_cli == repo_nativo
+
+    select_git_backend(repo_cli, "gitpython")
+    select_git_backend(repo_nativo, "pygit2")
+    assert get_native_backend(repo_cli) is None
+    assert get_native_backend(repo_nativo) is nativo
+
+    clave = id(repo_nativo)
+    repo_nativo.close()
+    del repo_nativo
+    gc.collect()
+    assert clave not in git_backends._backends
+
+
+def test_parity_check_reports_missing_pygit2(history_repo, monkeypatch):
+    monkeypatch.setattr(git_backends, "load_pygit2", lambda: None)
+    assert check_backend_parity(history_repo, "v1", "v2") == ["pygit2 no está disponible"]
+
+
+@pytest.mark.parametrize(
+    "merge, esperado",
+    [
+        ("merge-ours", []),
+        ("merge-auto", [("Modificado", "a.txt")]),
+        ("merge-conflict", [("Modificado", "c.txt")]),
+    ],
+)
+def test_merge_changes_follow_git_cc(history_repo, open_repo, merge, esperado):
+    repo = open_repo(history_repo, "gitpython")
+    commit = ops.get_commit_record(repo, merge)
+    assert ops.analyze_commit_changes(repo, commit) == esperado
+    assert dict(ops.iter_range_changes(repo, [commit])).get(commit.hexsha, []) == esperado
+
+
+@pytest.fixture
+def backends(history_repo, open_repo):
+    pytest.importorskip("pygit2")
+    cli, nativo = open_repo(history_repo, "gitpython"), open_repo(history_repo, "pygit2")
+    if get_native_backend(nativo) is None:
+        pytest.skip("pygit2 no puede abrir el repositorio")
+    assert get_native_backend(cli) is None
+    return cli, nativo
+
+
+@pytest.mark.parametrize(
+    "origen, destino",
+    [
+        ("v1", "v2"),
+        ("v1", "merge-ours"),
+        ("merge-ours", "merge-auto"),
+        ("merge-auto", "merge-conflict"),
+        ("v1", "HEAD~1"),
+        ("renombrado", "v2"),
+    ],
+)
+def test_backend_parity(history_repo, backends, origen, destino):
+    assert check_backend_parity(history_repo, origen, destino) == []
+
+
+def test_backend_parity_per_commit(backends):
+    cli, nativo = backends
+    origen, destino = ops.get_commit_record(cli, "v1"), ops.get_commit_record(cli, "v2")
+    commits = ops.get_commits_in_range(cli, origen, destino)
+    assert [c.hexsha for c in ops.get_commits_in_range(nativo, origen, destino)] == [c.hexsha for c in commits]
+    for commit in commits:
+        assert ops.analyze_commit_changes(nativo, commit) == ops.analyze_commit_changes(cli, commit), commit.summary
+    assert dict(ops.iter_range_changes(nativo, commits)) == dict(ops.iter_range_changes(cli, commits))
+    assert ops.generate_diff(nativo, origen, destino) == ops.generate_diff(cli, origen, destino)
+    assert ops.classify_files_by_status(nativo, nativo.commit(origen.hexsha), nativo.commit(destino.hexsha)) == (
+        ops.classify_files_by_status(cli, cli.commit(origen.hexsha), cli.commit(destino.hexsha))
+    )
+
+
+def test_only_similarity_renames_fall_back_to_git(history_repo, backends):
+    cli, nativo = backends
+    native = get_native_backend(nativo)
+    origen, destino = ops.get_commit_record(cli, "v1"), ops.get_commit_record(cli, "v2")
+    commits = ops.get_commits_in_range(cli, origen, destino)
+
+    pendientes = [c.summary for c in commits if dict(native.range_changes([c.hexsha]))[c.hexsha] is None]
+    assert pendientes == ["renombrado"]
+    exacto = next(c for c in commits if c.summary == "renombrado exacto")
+    assert native.commit_changes(exacto.hexsha) == [("Modificado", "docs/f.txt")]
+    assert ops.analyze_commit_changes(cli, exacto) == [("Modificado", "docs/f.txt")]
+
+    with pytest.raises(git_backends.RenamesNotReproducible):
+        native.range_diff(origen.hexsha, destino.hexsha)
+    diff = native.range_diff(git(history_repo, "rev-parse", "renombrado"), destino.hexsha)
+    assert [d.status_char() for d in diff.deltas if d.new_file.path == "docs/f.txt"] == ["R"]
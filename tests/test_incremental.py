@@ -0,0 +1,69 @@
+"""Modo incremental: solo se procesan los commits nuevos desde la última ejecución."""
+
+from __future__ import annotations
+
+import os
+
+import git as gitpython
+import pytest
+
+from changelogger import pipeline
+from changelogger.commit_metadata import close_metadata_reader
+from changelogger.file_operations import iter_diff_file
+from changelogger.git_operations import get_commit_record
+from changelogger.incremental import load_state
+from changelogger.pipeline import RunOptions, generate_changelog
+
+from conftest import git
+
+
+@pytest.fixture
+def repo(tagged_repo, monkeypatch):
+    monkeypatch.setenv("CHANGELOGGER_LLM_BACKEND", "fake")
+    monkeypatch.setenv("CHANGELOGGER_FAKE_LLM_LATENCY", "0")
+    repo = gitpython.Repo(tagged_repo)
+    yield repo
+    close_metadata_reader(repo)
+    repo.close()
+
+
+def generar(repo, origen, destino, **opciones):
+    opciones = RunOptions(use_cache=False, incremental=True, **opciones)
+    return generate_changelog(repo, get_commit_record(repo, origen), get_commit_record(repo, destino), opciones)
+
+
+def archivos(directorio):
+    return sorted(n for n in os.listdir(directorio) if os.path.isfile(os.path.join(directorio, n)))
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_previous_outputs_are_replaced(repo, tagged_repo, compress):
+    diff_previo, md_previo = generar(repo, "v1", "v3", compress_diffs=compress)
+    diff_path, md_path = generar(repo, "v1", "HEAD", compress_diffs=compress)
+
+    assert diff_path != diff_previo and md_path != md_previo
+    assert archivos(os.path.dirname(diff_path)) == [os.path.basename(diff_path)]
+    assert archivos(os.path.dirname(md_path)) == [os.path.basename(md_path)]
+    esperado = git(tagged_repo, "diff", "v1..HEAD")
+    assert "".join(iter_diff_file(diff_path)).rstrip("\n") == esperado
+
+
+def test_stats_only_reads_line_stats_of_new_commits_only(repo, tagged_repo, monkeypatch):
+    _, md_previo = generar(repo, "v1", "v3", stats_only=True)
+
+    pedidos = []
+    numstat = pipeline.get_commits_numstat
+
+    def contar(repo, commits, pathspecs=()):
+        commits = list(commits)
+        pedidos.extend(c.summary for c in commits)
+        return numstat(repo, commits, pathspecs)
+
+    monkeypatch.setattr(pipeline, "get_commits_numstat", contar)
+    _, md_path = generar(repo, "v1", "HEAD", stats_only=True)
+
+    assert pedidos == ["feat: cambio 5", "feat: cambio 4"]
+    estado = load_state(os.path.dirname(md_path), git(tagged_repo, "rev-parse", "v1^{commit}"))
+    assert len(estado["commit_stats"]) == len(estado["commits"]) == 5
+    hexsha = git(tagged_repo, "rev-parse", "v3^{commit}")
+    assert estado["commit_stats"][hexsha] == {"app.py": [3, 0], "mod3.py": [1, 0]}
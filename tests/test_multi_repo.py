@@ -0,0 +1,27 @@
+"""Trabajo de Git por repositorio del modo multi-repositorio."""
+
+from __future__ import annotations
+
+from changelogger.multi_repo import RepoJob, prepare_repo
+from changelogger.pipeline import PreparedRange, RunOptions
+
+from conftest import git
+
+
+def test_prepare_repo_resolves_annotated_tag_ranges(tagged_repo):
+    resultados = prepare_repo(RepoJob(tagged_repo, ("v1..v3",)), RunOptions(use_cache=False))
+
+    assert len(resultados) == 1
+    origen, destino, prepared = resultados[0]
+    assert (origen, destino) == ("v1", "v3")
+    assert isinstance(prepared, PreparedRange), prepared
+    assert prepared.origin.hexsha == git(tagged_repo, "rev-parse", "v1^{commit}")
+    assert prepared.target.hexsha == git(tagged_repo, "rev-parse", "v3^{commit}")
+    assert [c.summary for c in prepared.commits] == ["feat: cambio 3", "feat: cambio 2", "feat: cambio 1"]
+
+
+def test_prepare_repo_last_tags(tagged_repo):
+    resultados = prepare_repo(RepoJob(tagged_repo, last_tags=3), RunOptions(use_cache=False, stats_only=True))
+
+    assert [(o, d) for o, d, _ in resultados] == [("v2", "v3"), ("v3", "v4")]
+    assert all(isinstance(p, PreparedRange) for _, _, p in resultados)
@@ -0,0 +1,31 @@
+"""Export NDJSON de rangos (``--ndjson-stdout``)."""
+
+from __future__ import annotations
+
+import io
+
+import git as gitpython
+
+from changelogger.commit_metadata import close_metadata_reader
+from changelogger.ndjson_export import export_ranges, read_ndjson
+
+from conftest import git
+
+
+def test_export_ranges_with_annotated_tags(tagged_repo, capsys):
+    repo = gitpython.Repo(tagged_repo)
+    stream = io.StringIO()
+    try:
+        fallidos = export_ranges(repo, [("v2", "v4"), ("v4", "no-existe")], stream, with_stats=True)
+    finally:
+        close_metadata_reader(repo)
+
+    assert fallidos == 1
+    assert "no-existe: referencia no encontrada" in capsys.readouterr().err
+    registros = list(read_ndjson(io.StringIO(stream.getvalue())))
+    rango = registros[0]
+    assert rango["type"] == "range"
+    assert rango["origin"]["sha"] == git(tagged_repo, "rev-parse", "v2^{commit}")
+    assert rango["target"]["sha"] == git(tagged_repo, "rev-parse", "v4^{commit}")
+    commits = [r for r in registros if r["type"] == "commit"]
+    assert [c["summary"] for c in commits] == ["feat: cambio 4", "feat: cambio 3", "feat: cambio 2"]
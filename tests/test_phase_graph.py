@@ -0,0 +1,63 @@
+"""Grafo de fases de un rango."""
+
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from changelogger import profiling
+from changelogger.phase_graph import PhaseGraph
+
+
+def grafo(hilos):
+    g = PhaseGraph("v1..v2")
+
+    def fase(valor):
+        def ejecutar(*deps):
+            hilos.append(threading.current_thread())
+            return valor + sum(deps)
+        return ejecutar
+
+    g.add("diff", fase(1))
+    g.add("commits", fase(10))
+    g.add("analisis", fase(100), ("commits",))
+    g.add("markdown", fase(1000), ("diff", "analisis"))
+    return g
+
+
+def test_results_follow_dependencies():
+    hilos = []
+    assert grafo(hilos).run() == {"diff": 1, "commits": 10, "analisis": 110, "markdown": 1111}
+    assert threading.current_thread() not in hilos
+
+
+def test_failed_phase_propagates_and_stops_dependents():
+    g = PhaseGraph()
+    ejecutadas = []
+    g.add("falla", lambda: 1 / 0)
+    g.add("despues", lambda _: ejecutadas.append("despues"), ("falla",))
+    with pytest.raises(ZeroDivisionError):
+        g.run()
+    assert ejecutadas == []
+
+
+@pytest.mark.parametrize("trace_memory", [False, True])
+def test_profiling_runs_phases_serially_in_caller_thread(monkeypatch, trace_memory):
+    monkeypatch.setattr(profiling, "_active", None)
+    monkeypatch.setattr(profiling, "_serial", False)
+    if trace_memory:
+        perfil = profiling.start_profiling(trace_memory=True)
+    else:
+        profiling.require_serial_phases()
+    try:
+        hilos = []
+        assert grafo(hilos).run()["markdown"] == 1111
+        assert hilos == [threading.current_thread()] * 4
+        if trace_memory:
+            assert [f["phase"] for f in perfil.phases] == ["diff", "commits", "analisis", "markdown"]
+            assert all("python_peak_mb" in f for f in perfil.phases)
+    finally:
+        if trace_memory:
+            import tracemalloc
+            tracemalloc.stop()
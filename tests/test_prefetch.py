@@ -0,0 +1,75 @@
+"""Precálculo en segundo plano del selector de commits."""
+
+from __future__ import annotations
+
+import os
+import time
+
+import git as gitpython
+import pytest
+
+from changelogger import prefetch as prefetch_module
+from changelogger.commit_index import CommitIndex
+from changelogger.commit_metadata import close_metadata_reader
+from changelogger.git_operations import get_commit_record
+from changelogger.prefetch import CommitPrefetcher
+
+from conftest import commit_files, git
+
+
+@pytest.fixture
+def repo(tmp_path):
+    path = str(tmp_path / "repo")
+    os.makedirs(path)
+    git(path, "init", "-q")
+    # Primer párrafo de dos líneas: ``%s`` las une, el resumen es solo la primera
+    commit_files(path, {"a.txt": "1\n"}, "feat: origen\ncontinúa el asunto\n\nCuerpo.", 1700000000)
+    for i in range(2, 5):
+        commit_files(path, {"a.txt": f"{i}\n", f"b{i}.txt": "x\n"}, f"fix: cambio {i}", 1700000000 + i * 60)
+    repo = gitpython.Repo(path)
+    yield repo
+    close_metadata_reader(repo)
+
+
+def esperar(condicion, timeout: float = 5.0) -> None:
+    limite = time.monotonic() + timeout
+    while not condicion():
+        assert time.monotonic() < limite, "tiempo de espera agotado"
+        time.sleep(0.02)
+
+
+def test_highlighted_range_uses_commit_record_summary(repo):
+    indice = CommitIndex(repo).start()
+    indice.wait_for(10)
+    destino = get_commit_record(repo, "HEAD")
+    prefetcher = CommitPrefetcher(repo, indice, destino, use_cache=False).start()
+    origen = len(indice) - 1
+    assert indice.get(origen).summary == "feat: origen continúa el asunto"
+
+    prefetcher.focus([origen], origen)
+    esperar(lambda: prefetcher.data.ranges)
+    datos = prefetcher.stop()
+    indice.close()
+
+    (rango,) = datos.ranges.values()
+    assert [c.summary for c in rango] == ["fix: cambio 4", "fix: cambio 3", "fix: cambio 2", "feat: origen"]
+
+
+def test_stop_does_not_wait_for_a_long_range(repo, monkeypatch):
+    def rango_interminable(*args, **kwargs):
+        while True:
+            time.sleep(0.01)
+            yield get_commit_record(repo, "HEAD")
+
+    monkeypatch.setattr(prefetch_module, "iter_commits_in_range", rango_interminable)
+    indice = CommitIndex(repo).start()
+    indice.wait_for(10)
+    prefetcher = CommitPrefetcher(repo, indice, get_commit_record(repo, "HEAD"), use_cache=False).start()
+    prefetcher.focus([1], 1)
+    time.sleep(prefetch_module.HIGHLIGHT_DELAY + 0.2)
+
+    inicio = time.monotonic()
+    datos = prefetcher.stop()
+    indice.close()
+    assert time.monotonic() - inicio < 1.0
+    assert datos.ranges == {}
@@ -0,0 +1,73 @@
+"""Resolución de orígenes ``tag:PATRÓN`` y ``since:FECHA`` con el índice de rangos."""
+
+from __future__ import annotations
+
+import git as gitpython
+import pytest
+
+from changelogger.batch import process_range, resolve_ranges
+from changelogger.pipeline import RunOptions
+from changelogger.range_index import open_range_index
+
+from conftest import commit_files, git
+
+
+@pytest.fixture
+def repo(tagged_repo):
+    repo = gitpython.Repo(tagged_repo)
+    yield repo
+    repo.close()
+
+
+def sha(path, rev):
+    return git(path, "rev-parse", f"{rev}^{{commit}}")
+
+
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_tag_origin_is_peeled_commit(repo, tagged_repo, use_cache):
+    indice = open_range_index(repo, use_cache)
+    try:
+        assert indice.resolve_origin("tag:v*", sha(tagged_repo, "HEAD")) == sha(tagged_repo, "v4")
+        # Una etiqueta en el propio destino no cuenta
+        assert indice.resolve_origin("tag:v*", sha(tagged_repo, "v3")) == sha(tagged_repo, "v2")
+        assert indice.resolve_origin("tag:v1", sha(tagged_repo, "HEAD")) == sha(tagged_repo, "v1")
+        with pytest.raises(ValueError):
+            indice.resolve_origin("tag:v*", sha(tagged_repo, "v1"))
+    finally:
+        indice.close()
+
+
+def test_tag_origin_skips_tags_outside_history(repo, tagged_repo):
+    git(tagged_repo, "checkout", "-q", "-b", "rama", "v2")
+    commit_files(tagged_repo, {"rama.py": "y = 1\n"}, "feat: rama", 1700100000)
+    git(tagged_repo, "tag", "-a", "v9", "-m", "rama")
+    git(tagged_repo, "checkout", "-q", "main")
+
+    indice = open_range_index(repo, use_cache=False)
+    try:
+        assert indice.resolve_origin("tag:v*", sha(tagged_repo, "main")) == sha(tagged_repo, "v4")
+        assert indice.resolve_origin("tag:v*", sha(tagged_repo, "rama")) == sha(tagged_repo, "v2")
+    finally:
+        indice.close()
+
+
+def test_since_origin(repo, tagged_repo):
+    indice = open_range_index(repo, use_cache=False)
+    try:
+        destino = sha(tagged_repo, "HEAD")
+        # Los commits i tienen fecha 1700000000 + i * 3600
+        assert indice.resolve_origin("since:1700009000", destino) == sha(tagged_repo, "v2")
+        assert indice.resolve_origin("since:1700000000", destino) == sha(tagged_repo, "v1")
+        assert indice.resolve_origin("since:1800000000", destino) == destino
+    finally:
+        indice.close()
+
+
+def test_tag_origin_range_generates_changelog(repo, tagged_repo):
+    rangos = resolve_ranges(repo, ["tag:v*..HEAD"], use_cache=False)
+    assert rangos == [(sha(tagged_repo, "v4"), "HEAD")]
+
+    origen, destino = rangos[0]
+    _, md_path = process_range(tagged_repo, origen, destino, RunOptions(use_cache=False, stats_only=True))
+    with open(md_path, encoding="utf-8") as f:
+        assert "feat: cambio 5" in f.read()